@@ -0,0 +1,843 @@
+#!/usr/bin/env python
+import argparse
+import html
+import http.cookies
+import http.server
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+
+import driverbrainz
+import parse_wikipedia_chapters
+
+logger = logging.getLogger(__name__)
+
+# The pauses in seconds that the keyboard-driven MusicBrainz work flow waited after each step, regardless of how long the page actually took.
+LEGACY_MUSICBRAINZ_WORK_SLEEPS = {
+    "create": 15 + 0.1 * 4,
+    "artist": 0.75 + 0.1 * 4 + 1 + 0.2,
+    "series": 0.2 + 0.25 + 1 + 0.2,
+    "translation": 0.2 + 0.1 * 3 + 0.25 + 1 + (0.1 + 0.2) * 3,
+    "link": 0.4 + 0.4,
+    "submit": 18,
+    "alias": 0.1 + 0.2 + 0.2 + 0.1 + 12 + 0.1 + 0.1 + 12 + 0.1 + 0.1,
+    "tags": 0.1 + 0.2 + 0.2 + 0.1 + 12,
+}
+
+LEGACY_MUSICBRAINZ_RELEASE_GROUP_SLEEPS = {
+    "fields": 0.1 * 8,
+    "credit": 1 + 0.1 * 5 + 1,
+    "series": 0.2 + 0.25 + 1 + 0.2,
+    "link": 0.75 + 0.25 + 0.1 + 0.1,
+    "submit": 15,
+}
+
+
+# The fixed time the keyboard-driven flow spent sleeping for a work.
+def legacy_musicbrainz_work_budget(work: dict) -> float:
+    budget = LEGACY_MUSICBRAINZ_WORK_SLEEPS["create"]
+    budget += LEGACY_MUSICBRAINZ_WORK_SLEEPS["submit"]
+    for relationship in work["relationships"]:
+        if relationship["target_type"] == "artist":
+            budget += LEGACY_MUSICBRAINZ_WORK_SLEEPS["artist"]
+        elif relationship["target_type"] == "series":
+            budget += LEGACY_MUSICBRAINZ_WORK_SLEEPS["series"]
+        else:
+            budget += LEGACY_MUSICBRAINZ_WORK_SLEEPS["translation"]
+    budget += LEGACY_MUSICBRAINZ_WORK_SLEEPS["link"] * len(work["links"])
+    budget += LEGACY_MUSICBRAINZ_WORK_SLEEPS["alias"] * len(work["aliases"])
+    if work["tags"]:
+        budget += LEGACY_MUSICBRAINZ_WORK_SLEEPS["tags"]
+    return budget
+
+
+# The fixed time the keyboard-driven flow spent sleeping for a release group.
+def legacy_musicbrainz_release_group_budget(release_group: dict) -> float:
+    budget = LEGACY_MUSICBRAINZ_RELEASE_GROUP_SLEEPS["fields"]
+    budget += LEGACY_MUSICBRAINZ_RELEASE_GROUP_SLEEPS["submit"]
+    budget += LEGACY_MUSICBRAINZ_RELEASE_GROUP_SLEEPS["credit"] * len(
+        release_group["credits"]
+    )
+    budget += LEGACY_MUSICBRAINZ_RELEASE_GROUP_SLEEPS["series"] * len(
+        release_group["series"]
+    )
+    budget += LEGACY_MUSICBRAINZ_RELEASE_GROUP_SLEEPS["link"] * len(
+        release_group["links"]
+    )
+    return budget
+
+
+STAND_IN_PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>{title}</title></head>
+<body>
+{body}
+<script>
+const DELAY = {delay};
+function later(f) {{ setTimeout(f, DELAY * 1000); }}
+{script}
+</script>
+</body>
+</html>
+"""
+
+STAND_IN_LOGIN = """
+<form method="post">
+  <input id="id-username" name="username">
+  <input id="id-password" name="password" type="password">
+  <div><button type="submit">Log in</button></div>
+</form>
+"""
+
+STAND_IN_WORK_EDITOR = """
+<form method="post">
+  <input id="id-edit-work.name" name="edit-work.name">
+  <input id="id-edit-work.comment" name="edit-work.comment">
+  <select id="id-edit-work.type_id" name="edit-work.type_id">
+    <option value=""></option><option value="1">Prose</option><option value="2">Song</option>
+  </select>
+  <select id="id-edit-work.languages.0" name="edit-work.languages.0">
+    <option value=""></option><option value="eng">English</option><option value="jpn">Japanese</option>
+  </select>
+  <button type="button" class="add-item">Add relationship</button>
+  <ul id="relationships"></ul>
+  <div class="relationship-dialog" style="display: none">
+    <select class="entity-type">
+      <option value="artist">Artist</option><option value="series">Series</option><option value="work">Work</option>
+    </select>
+    <input class="relationship-type">
+    <ul role="listbox"></ul>
+    <input class="relationship-target">
+    <input class="entity-credit">
+    <button type="button" class="change-direction">Change direction</button>
+    <label><input type="checkbox"> translated</label>
+    <input class="attribute-text-value">
+    <button type="button" class="positive">Done</button>
+  </div>
+  <table id="external-links-editor"><tr><td><input class="value" type="url"></td></tr></table>
+  <textarea id="id-edit-work.edit_note" name="edit-work.edit_note"></textarea>
+  <button type="submit" class="submit positive">Enter edit</button>
+</form>
+"""
+
+STAND_IN_WORK_EDITOR_SCRIPT = """
+const dialog = document.querySelector(".relationship-dialog");
+const linkType = dialog.querySelector("input.relationship-type");
+const listbox = dialog.querySelector("ul[role=listbox]");
+const target = dialog.querySelector("input.relationship-target");
+document.querySelector("button.add-item").addEventListener("click", () => {
+  for (const input of dialog.querySelectorAll("input")) { input.value = ""; input.checked = false; }
+  target.classList.remove("lookup-performed");
+  later(() => { dialog.style.display = "block"; });
+});
+linkType.addEventListener("input", () => {
+  const text = linkType.value;
+  later(() => {
+    if (linkType.value !== text) return;
+    listbox.innerHTML = "";
+    const option = document.createElement("li");
+    option.setAttribute("role", "option");
+    option.textContent = text;
+    option.addEventListener("click", () => { listbox.innerHTML = ""; });
+    listbox.appendChild(option);
+  });
+});
+target.addEventListener("input", () => {
+  const text = target.value;
+  later(() => { if (target.value === text) target.classList.add("lookup-performed"); });
+});
+dialog.querySelector("button.positive").addEventListener("click", () => {
+  const item = document.createElement("li");
+  item.textContent = linkType.value + " " + target.value;
+  document.getElementById("relationships").appendChild(item);
+  later(() => { dialog.style.display = "none"; });
+});
+document.getElementById("external-links-editor").addEventListener("input", (event) => {
+  const rows = document.querySelectorAll("#external-links-editor input.value");
+  if (event.target !== rows[rows.length - 1]) return;
+  later(() => {
+    const row = document.createElement("tr");
+    row.innerHTML = '<td><input class="value" type="url"></td>';
+    document.getElementById("external-links-editor").appendChild(row);
+  });
+});
+"""
+
+STAND_IN_ALIAS_EDITOR = """
+<form method="post">
+  <input id="id-edit-alias.name" name="edit-alias.name">
+  <input id="id-edit-alias.sort_name" name="edit-alias.sort_name">
+  <button type="button" class="guesscase-sortname">Guess</button>
+  <button type="button" class="sortname-copy">Copy name</button>
+  <select id="id-edit-alias.locale" name="edit-alias.locale">
+    <option value=""></option><option value="en">English</option><option value="ja">Japanese</option>
+  </select>
+  <input id="id-edit-alias.primary_for_locale" type="checkbox" name="edit-alias.primary_for_locale">
+  <select id="id-edit-alias.type_id" name="edit-alias.type_id">
+    <option value=""></option><option value="1">Work name</option><option value="2">Search hint</option>
+  </select>
+  <button type="submit" class="submit positive">Enter edit</button>
+</form>
+"""
+
+STAND_IN_ALIAS_EDITOR_SCRIPT = """
+const name = document.getElementById("id-edit-alias.name");
+const sortName = document.getElementById("id-edit-alias.sort_name");
+document.querySelector("button.sortname-copy").addEventListener("click", () => { sortName.value = name.value; });
+document.querySelector("button.guesscase-sortname").addEventListener("click", () => { sortName.value = name.value; });
+"""
+
+STAND_IN_TAGS = """
+<form id="tag-form">
+  <textarea></textarea>
+  <button type="submit">Submit tags</button>
+</form>
+<ul class="tag-list"></ul>
+"""
+
+STAND_IN_TAGS_SCRIPT = """
+document.getElementById("tag-form").addEventListener("submit", (event) => {
+  event.preventDefault();
+  const tags = document.querySelector("#tag-form textarea").value.split(",");
+  later(() => {
+    for (const tag of tags) {
+      const item = document.createElement("li");
+      const link = document.createElement("a");
+      link.href = "/tag/" + encodeURIComponent(tag.trim());
+      link.textContent = tag.trim();
+      item.appendChild(link);
+      document.querySelector("ul.tag-list").appendChild(item);
+    }
+  });
+});
+"""
+
+STAND_IN_RELEASE_GROUP_EDITOR = """
+<form method="post">
+  <input id="id-edit-release-group.name" name="edit-release-group.name" value="{name}">
+  <table id="external-links-editor">{links}</table>
+  <button type="submit" class="submit positive">Enter edit</button>
+</form>
+"""
+
+STAND_IN_EXTERNAL_LINK = """
+<tr><td><a href="{url}">{url}</a></td><td><select>
+  <option value=""></option><option value="1">discography entry</option><option value="2">purchase for download</option>
+</select></td></tr>
+"""
+
+
+# The release group editor seeded from the query string of the request.
+def stand_in_release_group_editor(query: dict) -> str:
+    links = []
+    index = 0
+    while f"urls.{index}.url" in query:
+        links.append(
+            STAND_IN_EXTERNAL_LINK.format(
+                url=html.escape(query[f"urls.{index}.url"][0])
+            )
+        )
+        index += 1
+    return STAND_IN_RELEASE_GROUP_EDITOR.format(
+        name=html.escape(query.get("edit-release-group.name", [""])[0]),
+        links="".join(links),
+    )
+
+
+# A local stand-in for the parts of the MusicBrainz website used to create works and release groups.
+#
+# Every response is delayed by the page latency and every client-side update, such as an autocomplete lookup, is delayed by the script latency.
+class StandInMusicBrainzHandler(http.server.BaseHTTPRequestHandler):
+    page_latency = 0.3
+    script_latency = 0.1
+    alias_failure_rate = 0.0
+    page_loads = 0
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _logged_in(self) -> bool:
+        cookies = http.cookies.SimpleCookie(self.headers.get("Cookie", ""))
+        return driverbrainz.MUSICBRAINZ_SESSION_COOKIE in cookies
+
+    def _redirect(self, location: str, cookie=None):
+        self.send_response(303)
+        self.send_header("Location", location)
+        if cookie is not None:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+
+    def _page(self, title: str, body: str, script: str = ""):
+        content = STAND_IN_PAGE.format(
+            title=title, body=body, script=script, delay=self.script_latency
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self):
+        time.sleep(self.page_latency)
+        type(self).page_loads += 1
+        url = urllib.parse.urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if url.path == "/login":
+            self._page("Log in", STAND_IN_LOGIN)
+        elif not self._logged_in():
+            self._redirect(f"/login?returnto={urllib.parse.quote(self.path)}")
+        elif url.path == "/work/create":
+            self._page("Add work", STAND_IN_WORK_EDITOR, STAND_IN_WORK_EDITOR_SCRIPT)
+        elif url.path == "/release-group/create":
+            self._page(
+                "Add release group",
+                stand_in_release_group_editor(urllib.parse.parse_qs(url.query)),
+            )
+        elif len(parts) == 3 and parts[0] == "work" and parts[2] == "add-alias":
+            self._page("Add alias", STAND_IN_ALIAS_EDITOR, STAND_IN_ALIAS_EDITOR_SCRIPT)
+        elif len(parts) == 3 and parts[0] == "work" and parts[2] == "tags":
+            self._page("Tags", STAND_IN_TAGS, STAND_IN_TAGS_SCRIPT)
+        elif parts[0] in ["work", "release-group"]:
+            self._page(parts[0], f"<h1>{url.path}</h1>")
+        else:
+            self._page("MusicBrainz", "<h1>MusicBrainz</h1>")
+
+    def do_POST(self):
+        time.sleep(self.page_latency)
+        type(self).page_loads += 1
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        url = urllib.parse.urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        if url.path == "/login":
+            returnto = urllib.parse.parse_qs(url.query).get("returnto", ["/"])[0]
+            self._redirect(
+                returnto,
+                cookie=f"{driverbrainz.MUSICBRAINZ_SESSION_COOKIE}={uuid.uuid4()}; Path=/",
+            )
+        elif url.path == "/work/create":
+            self._redirect(f"/work/{uuid.uuid4()}")
+        elif url.path == "/release-group/create":
+            self._redirect(f"/release-group/{uuid.uuid4()}")
+        elif len(parts) == 3 and parts[0] == "work" and parts[2] == "add-alias":
+            if random.random() < self.alias_failure_rate:
+                self._page(
+                    "Add alias",
+                    STAND_IN_ALIAS_EDITOR.replace(
+                        "</form>", '<ul class="errors"><li>Try again</li></ul></form>'
+                    ),
+                    STAND_IN_ALIAS_EDITOR_SCRIPT,
+                )
+            else:
+                self._redirect(f"/work/{parts[1]}/aliases")
+        else:
+            self.send_error(404)
+
+
+def start_stand_in_musicbrainz(
+    page_latency: float, script_latency: float, alias_failure_rate: float = 0.0
+):
+    handler = type(
+        "Handler",
+        (StandInMusicBrainzHandler,),
+        {
+            "page_latency": page_latency,
+            "script_latency": script_latency,
+            "alias_failure_rate": alias_failure_rate,
+        },
+    )
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, handler
+
+
+# A work with the same shape as a typical translated light novel chapter.
+def benchmark_musicbrainz_work(i: int) -> dict:
+    return {
+        "name": f"Chapter {i}",
+        "disambiguation": "light novel, English",
+        "type": "Prose",
+        "language": "English",
+        "relationships": [
+            {
+                "target_type": "artist",
+                "link_type": "writer",
+                "target": str(uuid.UUID(int=1)),
+            },
+            {
+                "target_type": "artist",
+                "link_type": "translator",
+                "target": str(uuid.UUID(int=2)),
+            },
+            {
+                "target_type": "series",
+                "link_type": "part of",
+                "target": str(uuid.UUID(int=3)),
+                "number": str(i),
+            },
+            {
+                "target_type": "work",
+                "link_type": "later versions / version of",
+                "target": str(uuid.UUID(int=4)),
+                "backward": True,
+                "attributes": ["translated"],
+            },
+        ],
+        "links": [f"https://bookbrainz.org/work/{uuid.UUID(int=i)}"],
+        "aliases": [
+            {
+                "text": f"Chapter {i}",
+                "sort": "COPY",
+                "language": "English",
+                "primary": True,
+            },
+            {
+                "text": f"Dai {i}-wa",
+                "sort": "GUESS",
+                "language": "Japanese",
+                "primary": False,
+            },
+        ],
+        "tags": ["light novel"],
+        "edit_note": "",
+    }
+
+
+# Create works in the stand-in MusicBrainz editor with the condition-based waits and compare the time per work with the fixed sleeps of the keyboard-driven flow.
+def run_musicbrainz_work_benchmark(args) -> dict:
+    server, _ = start_stand_in_musicbrainz(
+        args.page_latency, args.script_latency, args.alias_failure_rate
+    )
+    driverbrainz.MUSICBRAINZ_SERVER = f"http://127.0.0.1:{server.server_address[1]}"
+    driver = driverbrainz.create_driver(
+        headless=not args.no_headless, browser=args.browser
+    )
+    try:
+        # Log in before timing anything.
+        driverbrainz.musicbrainz_log_in_session(driver, "benchmark")
+        latencies = []
+        budgets = []
+        for i in range(1, args.works + 1):
+            work = benchmark_musicbrainz_work(i)
+            start = time.monotonic()
+            driverbrainz.musicbrainz_create_work(driver, work, username="benchmark")
+            latencies.append(time.monotonic() - start)
+            budgets.append(legacy_musicbrainz_work_budget(work))
+            print(f"{i}: {latencies[-1]:.2f} s")
+    finally:
+        driver.quit()
+        server.shutdown()
+    return {
+        "works": args.works,
+        "page_latency": args.page_latency,
+        "script_latency": args.script_latency,
+        "condition_waits": {
+            "mean": statistics.mean(latencies),
+            "median": statistics.median(latencies),
+            "max": max(latencies),
+        },
+        "fixed_sleeps": {"mean": statistics.mean(budgets)},
+        "speedup": statistics.mean(budgets) / statistics.mean(latencies),
+    }
+
+
+# A release group with the same shape as a typical audiobook of a light novel volume.
+def benchmark_musicbrainz_release_group(i: int) -> dict:
+    return {
+        "name": f"Volume {i}",
+        "disambiguation": "light novel, English, unabridged",
+        "primary_type": "Other",
+        "secondary_types": ["Audiobook"],
+        "credits": [
+            {
+                "id": str(uuid.UUID(int=1)),
+                "credited_as": "Writer",
+                "join_phrase": " read by ",
+            },
+            {"id": str(uuid.UUID(int=2))},
+        ],
+        "series": [{"id": str(uuid.UUID(int=3)), "number": str(i)}],
+        "links": [
+            {
+                "url": f"https://audiobooks.example/volume-{i}",
+                "type": "discography entry",
+            }
+        ],
+        "tags": [],
+        "edit_note": "",
+    }
+
+
+# Create release groups by seeding the stand-in MusicBrainz release group editor and compare the time per release group with the fixed sleeps of the keyboard-driven flow.
+def run_musicbrainz_release_group_benchmark(args) -> dict:
+    server, handler = start_stand_in_musicbrainz(args.page_latency, args.script_latency)
+    driverbrainz.MUSICBRAINZ_SERVER = f"http://127.0.0.1:{server.server_address[1]}"
+    driver = driverbrainz.create_driver(
+        headless=not args.no_headless, browser=args.browser
+    )
+    try:
+        # Log in before timing anything.
+        driverbrainz.musicbrainz_log_in_session(driver, "benchmark")
+        handler.page_loads = 0
+        latencies = []
+        budgets = []
+        for i in range(1, args.works + 1):
+            release_group = benchmark_musicbrainz_release_group(i)
+            start = time.monotonic()
+            driverbrainz.musicbrainz_create_release_group(
+                driver, release_group, username="benchmark"
+            )
+            latencies.append(time.monotonic() - start)
+            budgets.append(legacy_musicbrainz_release_group_budget(release_group))
+            print(f"{i}: {latencies[-1]:.2f} s")
+    finally:
+        driver.quit()
+        server.shutdown()
+    return {
+        "release_groups": args.works,
+        "page_latency": args.page_latency,
+        "requests_per_release_group": handler.page_loads / args.works,
+        "seeded": {
+            "mean": statistics.mean(latencies),
+            "median": statistics.median(latencies),
+            "max": max(latencies),
+        },
+        "fixed_sleeps": {"mean": statistics.mean(budgets)},
+        "speedup": statistics.mean(budgets) / statistics.mean(latencies),
+    }
+
+
+# Create the same works in the stand-in MusicBrainz editor with each browser backend.
+#
+# Reports the time to start a session, the latency of each work, and the memory of the browser's process tree after the last work.
+# Backends whose WebDriver executable isn't installed are reported as skipped.
+def run_browser_backend_benchmark(args) -> dict:
+    report = {
+        "works": args.works,
+        "page_latency": args.page_latency,
+        "script_latency": args.script_latency,
+        "backends": {},
+    }
+    for browser in args.browsers:
+        executable = driverbrainz.BROWSER_BACKENDS[browser][1]
+        if shutil.which(executable) is None:
+            report["backends"][browser] = {"skipped": f"{executable} not found in PATH"}
+            continue
+        server, _ = start_stand_in_musicbrainz(
+            args.page_latency, args.script_latency, args.alias_failure_rate
+        )
+        driverbrainz.MUSICBRAINZ_SERVER = f"http://127.0.0.1:{server.server_address[1]}"
+        start = time.monotonic()
+        driver = driverbrainz.create_driver(
+            headless=not args.no_headless, browser=browser
+        )
+        startup = time.monotonic() - start
+        try:
+            driverbrainz.musicbrainz_log_in_session(driver, "benchmark")
+            latencies = []
+            for i in range(1, args.works + 1):
+                start = time.monotonic()
+                driverbrainz.musicbrainz_create_work(
+                    driver, benchmark_musicbrainz_work(i), username="benchmark"
+                )
+                latencies.append(time.monotonic() - start)
+                print(f"{browser} {i}: {latencies[-1]:.2f} s")
+            rss = driverbrainz.browser_rss(driver)
+        finally:
+            driver.quit()
+            server.shutdown()
+        report["backends"][browser] = {
+            "startup": startup,
+            "work": {
+                "mean": statistics.mean(latencies),
+                "median": statistics.median(latencies),
+                "max": max(latencies),
+            },
+            "rss_mib": None if rss is None else rss / 1_048_576,
+        }
+    return report
+
+
+# Measure how long it takes to import DriverBrainz in a fresh interpreter with -X importtime.
+#
+# Each run also reports whether Selenium or Requests were imported, which should only happen once a command drives a browser or calls a web service.
+# The import of the browser modules on first use is measured separately.
+def import_time(statement: str) -> dict:
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import sys; {statement}; print(sorted({{m.split('.')[0] for m in sys.modules}} & {{'selenium', 'requests'}}))",
+        ],
+        cwd=os.path.dirname(os.path.realpath(__file__)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Unindented lines of the report are the outermost imports, with their cumulative time in microseconds.
+    # Everything imported after DriverBrainz itself was imported on first use.
+    startup = 0.0
+    first_use = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, total, name = line.split("|")
+        if not total.strip().isdigit() or name.startswith("  "):
+            continue
+        if name.strip() == "driverbrainz":
+            startup = int(total) / 1_000_000
+        elif startup:
+            first_use += int(total) / 1_000_000
+    return {
+        "startup": startup,
+        "first_use": first_use,
+        "heavy": result.stdout.strip(),
+    }
+
+
+def run_import_time_benchmark(args) -> dict:
+    # Compile the bytecode first so that the runs don't include compiling the script.
+    import_time("import driverbrainz")
+    startup = [import_time("import driverbrainz") for _ in range(args.runs)]
+    browser = [
+        import_time("import driverbrainz; driverbrainz.webdriver.Firefox")
+        for _ in range(args.runs)
+    ]
+    return {
+        "runs": args.runs,
+        "startup": {
+            "median": statistics.median(run["startup"] for run in startup),
+            "max": max(run["startup"] for run in startup),
+            "heavy_imports": startup[-1]["heavy"],
+        },
+        "browser": {
+            "median": statistics.median(run["first_use"] for run in browser),
+            "heavy_imports": browser[-1]["heavy"],
+        },
+    }
+
+
+# The wikitext of a chapter list article with the same shape as the large ones on Wikipedia.
+#
+# Every chapter has a Nihongo template and a footnote, and every volume has a release date and a summary with templates of their own.
+def chapter_list_article(chapters: int, chapters_per_volume: int) -> str:
+    lines = ["Lead.", "== Volume list =="]
+    for volume in range(math.ceil(chapters / chapters_per_volume)):
+        lines.append("{{Graphic novel list")
+        lines.append(f"| VolumeNumber = {volume + 1}")
+        lines.append("| OriginalRelDate = {{Start date|2020|1|1}}")
+        lines.append("| ChapterList =")
+        for chapter in range(
+            volume * chapters_per_volume + 1,
+            min((volume + 1) * chapters_per_volume, chapters) + 1,
+        ):
+            lines.append(
+                f'* {chapter}. {{{{Nihongo|"Chapter Title {chapter}"|第{chapter}話の題名|Dai {chapter}-wa no Daimei}}}}{{{{efn|Note {chapter}}}}}'
+            )
+        lines.append(
+            f"| Summary = The story continues.{{{{efn|A note on volume {volume + 1}}}}}"
+        )
+        lines.append("}}")
+    return "\n".join(lines)
+
+
+# The wikitext of a chapter list article which lists the chapters of each volume in its own Numbered list, as smaller articles do.
+def numbered_list_article(chapters: int, chapters_per_volume: int) -> str:
+    lines = ["Lead."]
+    for volume in range(math.ceil(chapters / chapters_per_volume)):
+        lines.append(f"== Volume {volume + 1} ==")
+        lines.append("{{Numbered list")
+        for chapter in range(
+            volume * chapters_per_volume + 1,
+            min((volume + 1) * chapters_per_volume, chapters) + 1,
+        ):
+            lines.append(
+                f"| {{{{Nihongo|Chapter Title {chapter}|第{chapter}話の題名|Dai {chapter}-wa no Daimei}}}}"
+            )
+        lines.append("}}")
+    return "\n".join(lines)
+
+
+# The shapes of the articles parsed by the wikipedia_parse benchmark.
+CHAPTER_LIST_ARTICLES = {
+    "graphic_novel_list": chapter_list_article,
+    "numbered_list": numbered_list_article,
+}
+
+
+# Time how long parse_wikipedia_page takes for chapter list articles of each shape and size.
+#
+# The time per chapter should stay about the same as the number of chapters grows.
+# Articles which don't parse into the expected number of chapters are reported as errors.
+def run_wikipedia_parse_benchmark(args) -> dict:
+    articles = {}
+    errors = []
+    for name, article in CHAPTER_LIST_ARTICLES.items():
+        sizes = {}
+        for chapters in args.chapters:
+            wikitext = article(chapters, args.chapters_per_volume)
+            seconds = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                parsed = parse_wikipedia_chapters.parse_wikipedia_page(wikitext)
+                seconds.append(time.perf_counter() - start)
+            if len(parsed) != chapters:
+                errors.append(
+                    f"Parsed {len(parsed)} of {chapters} chapters of the {name} article"
+                )
+            sizes[chapters] = {
+                "seconds": min(seconds),
+                "microseconds_per_chapter": min(seconds) / chapters * 1_000_000,
+            }
+        smallest = sizes[min(sizes)]["microseconds_per_chapter"]
+        largest = sizes[max(sizes)]["microseconds_per_chapter"]
+        articles[name] = {"sizes": sizes, "growth": largest / smallest}
+    return {
+        "chapters_per_volume": args.chapters_per_volume,
+        "runs": args.runs,
+        "articles": articles,
+        "growth": max(article["growth"] for article in articles.values()),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="benchmark.py",
+        description="Benchmark DriverBrainz against local stand-ins for the BookBrainz and MusicBrainz editors",
+    )
+    parser.add_argument(
+        "command",
+        choices=[
+            "musicbrainz_work",
+            "musicbrainz_release_group",
+            "browser_backends",
+            "import_time",
+            "wikipedia_parse",
+        ],
+    )
+    parser.add_argument(
+        "--works",
+        type=int,
+        default=5,
+        help="The number of works or release groups to create",
+    )
+    parser.add_argument(
+        "--page-latency",
+        type=float,
+        default=0.3,
+        help="The number of seconds the stand-in server takes to respond to each request",
+    )
+    parser.add_argument(
+        "--script-latency",
+        type=float,
+        default=0.1,
+        help="The number of seconds each client-side update in the stand-in editor takes, such as an autocomplete lookup",
+    )
+    parser.add_argument(
+        "--alias-failure-rate",
+        type=float,
+        default=0.0,
+        help="The fraction of alias submissions which the stand-in rejects, to exercise retries",
+    )
+    parser.add_argument("--no-headless", action="store_true")
+    parser.add_argument(
+        "--browser",
+        choices=list(driverbrainz.BROWSER_BACKENDS),
+        default="firefox",
+        help="The browser for the musicbrainz_work and musicbrainz_release_group benchmarks",
+    )
+    parser.add_argument(
+        "--browsers",
+        nargs="+",
+        choices=list(driverbrainz.BROWSER_BACKENDS),
+        default=list(driverbrainz.BROWSER_BACKENDS),
+        help="The browsers to compare in the browser_backends benchmark",
+    )
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=10,
+        help="The number of times to import DriverBrainz for the import_time benchmark or to parse each article for the wikipedia_parse benchmark",
+    )
+    parser.add_argument(
+        "--max-import-time",
+        type=float,
+        help="Fail the import_time benchmark when the median time to import DriverBrainz exceeds this number of seconds",
+    )
+    parser.add_argument(
+        "--chapters",
+        type=int,
+        nargs="+",
+        default=[250, 500, 1000, 2000, 4000],
+        help="The numbers of chapters of the articles in the wikipedia_parse benchmark",
+    )
+    parser.add_argument(
+        "--chapters-per-volume",
+        type=int,
+        default=10,
+        help="The number of chapters in each chapter list of the articles in the wikipedia_parse benchmark",
+    )
+    parser.add_argument(
+        "--max-growth",
+        type=float,
+        help="Fail the wikipedia_parse benchmark when the time per chapter of the largest article exceeds this multiple of the smallest",
+    )
+    args = parser.parse_args()
+
+    if args.command == "wikipedia_parse":
+        report = run_wikipedia_parse_benchmark(args)
+        print(json.dumps(report, indent=2))
+        for error in report["errors"]:
+            logger.error(error)
+        if report["errors"]:
+            sys.exit(1)
+        if args.max_growth is not None and report["growth"] > args.max_growth:
+            logger.error(
+                f"The time per chapter grew {report['growth']:.2f} times, more than {args.max_growth} times"
+            )
+            sys.exit(1)
+        return
+
+    if args.command == "import_time":
+        report = run_import_time_benchmark(args)
+        print(json.dumps(report, indent=2))
+        if (
+            args.max_import_time is not None
+            and report["startup"]["median"] > args.max_import_time
+        ):
+            logger.error(
+                f"Importing DriverBrainz took {report['startup']['median']:.3f} seconds, more than {args.max_import_time} seconds"
+            )
+            sys.exit(1)
+        return
+
+    # The stand-in doesn't check the password, but the login form still needs one.
+    os.environ.setdefault("MUSICBRAINZ_PASSWORD", "benchmark")
+    # Keep the session cookies of the stand-in out of the real cookie cache.
+    cache_dir = tempfile.TemporaryDirectory()
+    driverbrainz.COOKIES_CACHE_FILE = os.path.join(cache_dir.name, "cookies.json")
+
+    if args.command == "musicbrainz_work":
+        report = run_musicbrainz_work_benchmark(args)
+    elif args.command == "musicbrainz_release_group":
+        report = run_musicbrainz_release_group_benchmark(args)
+    elif args.command == "browser_backends":
+        report = run_browser_backend_benchmark(args)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
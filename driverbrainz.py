@@ -1,33 +1,80 @@
 #!/usr/bin/env python
-from selenium import webdriver
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support.relative_locator import locate_with
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-
 import argparse
 from collections import OrderedDict
+import collections.abc
+import concurrent.futures
 import copy
+import glob
+import importlib
 import json
 import math
 import platformdirs
 import logging
 import os
+import queue
 import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import sqlite3
+import tarfile
+import threading
+import time
+import urllib.parse
+
+
+# A module, or an attribute of a module, which is only imported when it's first used.
+#
+# Selenium and Requests take most of the time to import this script, so commands which don't need them, such as --help, verify, and the library functions, don't pay for them.
+class LazyImport:
+    def __init__(self, module: str, attribute=None):
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            target = importlib.import_module(self._module)
+            if self._attribute is not None:
+                target = getattr(target, self._attribute)
+            self._target = target
+        return self._target
+
+    def __getattr__(self, name: str):
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+
+webdriver = LazyImport("selenium.webdriver")
+EC = LazyImport("selenium.webdriver.support.expected_conditions")
+selenium_exceptions = LazyImport("selenium.common.exceptions")
+By = LazyImport("selenium.webdriver.common.by", "By")
+WebDriverWait = LazyImport("selenium.webdriver.support.wait", "WebDriverWait")
+locate_with = LazyImport("selenium.webdriver.support.relative_locator", "locate_with")
+Select = LazyImport("selenium.webdriver.support.select", "Select")
+FirefoxOptions = LazyImport("selenium.webdriver.firefox.options", "Options")
+ChromiumOptions = LazyImport("selenium.webdriver.chrome.options", "Options")
+requests = LazyImport("requests")
+urllib_request = LazyImport("urllib.request")
 
 logger = logging.getLogger(__name__)
 
 APP_NAME = "DriverBrainz"
-CACHE_DIR = platformdirs.user_cache_dir(
-    appname="DriverBrainz", appauthor=False, ensure_exists=True
-)
+VERSION = "0.1.0"
+# The cache directory is only created once something is written to it.
+CACHE_DIR = platformdirs.user_cache_dir(appname="DriverBrainz", appauthor=False)
 COOKIES_CACHE_FILE = os.path.join(CACHE_DIR, "cookies.json")
-
-MUSICBRAINZ_CREATE_WORK_URL = "https://beta.musicbrainz.org/work/create"
-MUSICBRAINZ_CREATE_RELEASE_GROUP_URL = (
-    "https://beta.musicbrainz.org/release-group/create"
-)
+LEDGER_FILE = os.path.join(CACHE_DIR, "ledger.sqlite")
+HISTORY_FILE = os.path.join(CACHE_DIR, "history.sqlite")
+ENTITIES_CACHE_FILE = os.path.join(CACHE_DIR, "entities.json")
+
+MUSICBRAINZ_SERVER = "https://beta.musicbrainz.org"
+MUSICBRAINZ_CREATE_WORK_URL = f"{MUSICBRAINZ_SERVER}/work/create"
+MUSICBRAINZ_CREATE_RELEASE_GROUP_URL = f"{MUSICBRAINZ_SERVER}/release-group/create"
+MUSICBRAINZ_SESSION_COOKIE = "musicbrainz_server_session"
 BOOKBRAINZ_CREATE_WORK_URL = "https://bookbrainz.org/work/create"
 
 MUSICBRAINZ_WORK_TYPE = "Prose"
@@ -42,13 +89,6 @@ MUSICBRAINZ_TRANSLATOR = ""
 ORIGINAL_BOOKBRAINZ_WORK_IDENTIFIERS = {}
 TRANSLATED_BOOKBRAINZ_WORK_IDENTIFIERS = {}
 
-# Use the following snippet to format the items in a MusicBrainz series so that they can be copied and pasted here.
-# http get --headers [Accept "application/json"]  $"https://musicbrainz.org/ws/2/series/xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx?inc=work-rels" | get relations | select attribute-values.number work.id | rename number id | each {|w| $"    \"($w.number)\": \"https://beta.musicbrainz.org/work/($w.id)\"," } | print --raw
-ORIGINAL_MUSICBRAINZ_WORK_IDENTIFIERS = {}
-
-# http get --headers [Accept "application/json"]  $"https://musicbrainz.org/ws/2/series/xxxxxxxx-xxxx-xxxx-xxxx-xxxxxxxxxxxx?inc=work-rels" | get relations | select attribute-values.number work.id | rename number id | each {|w| $"    \"($w.number)\": \"https://beta.musicbrainz.org/work/($w.id)\"," } | print --raw
-TRANSLATED_MUSICBRAINZ_WORK_IDENTIFIERS = {}
-
 # ORIGINAL_MUSICBRAINZ_WORK = {
 #     "title": ORIGINAL_TITLE,
 #     "type": MUSICBRAINZ_WORK_TYPE,
@@ -87,40 +127,6 @@ TRANSLATED_MUSICBRAINZ_WORK_IDENTIFIERS = {}
 #     "tags": TAGS,
 # }
 
-# MUSICBRAINZ_RELEASE_GROUP = {
-#     "name": ORIGINAL_WORK_ALIASES[0]["text"],
-#     "disambiguation": "light novel, English, unabridged",
-#     "primary_type": "Other",
-#     "secondary_type": "Audiobook",
-#     "series": "",
-#     "credits": [
-#         {
-#             "id": MUSICBRAINZ_WRITER,
-#             "credited_as": "Such and such",
-#             "join_phrase": " read by ",
-#         },
-#         {
-#             "id": "",
-#         },
-#     ],
-#     "tags": ["light novel", "unabridged"],
-# }
-
-# MUSICBRAINZ_RELEASE_GROUP_LINKS = {
-#     "1": [
-#         {
-#             "url": "",
-#             "type": "discography entry",
-#         },
-#     ],
-#     "2": [
-#         {
-#             "url": "",
-#             "type": "discography entry",
-#         },
-#     ],
-# }
-
 
 # https://stackoverflow.com/a/28777781/9835303
 def write_roman(num: int) -> str:
@@ -277,18 +283,21 @@ def convert_to_japanese_numeral(num: int, requested_type: str) -> str:
     return string
 
 
+INDEX_NUMBER_FORMATS = [
+    "kanji",
+    "hiragana",
+    "hepburn",
+    "formal_kanji",
+    "numeral",
+    "roman_numeral",
+]
+
+
 # Format an integer according to the given format.
 #
 # The requested format can be kanji, hiragana, hepburn, formal_kanji, numeral, or roman_numeral.
 def format_number(number: int, format: str) -> str:
-    if format not in [
-        "kanji",
-        "hiragana",
-        "hepburn",
-        "formal_kanji",
-        "numeral",
-        "roman_numeral",
-    ]:
+    if format not in INDEX_NUMBER_FORMATS:
         return ""
 
     if format == "numeral":
@@ -357,15 +366,590 @@ def sanitize_sort(sanitized_sort_title: str) -> str:
     return sanitized_sort_title
 
 
+# Requests per second allowed for each host, shared by every browser session.
+#
+# Subdomains share the budget of their parent domain, so beta.musicbrainz.org counts against musicbrainz.org.
+DEFAULT_HOST_RATE_LIMITS = {
+    "api.bookbrainz.org": 10.0,
+    "bookbrainz.org": 2.0,
+    "musicbrainz.org": 1.0,
+}
+
+
+# A token bucket which refills at a fixed rate up to the size of its burst.
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    # Block until a token is available and take it.
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                delay = (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+# Rate limit page loads, entity searches, and submits with a separate token bucket for each host.
+#
+# The limiter also keeps a moving average of the page load latency for each host.
+class RateLimiter:
+    def __init__(self, rates: dict):
+        self._buckets = {host: TokenBucket(rate) for host, rate in rates.items()}
+        self._latency = {}
+        self._lock = threading.Lock()
+
+    def set_rate(self, host: str, rate: float):
+        with self._lock:
+            self._buckets[host] = TokenBucket(rate)
+
+    # Find the host with a budget which covers the given URL or hostname.
+    def budget_host(self, url: str):
+        host = urllib.parse.urlsplit(url).hostname if "/" in url else url
+        while host:
+            if host in self._buckets:
+                return host
+            host = host.partition(".")[2]
+        return None
+
+    def throttle(self, url: str):
+        host = self.budget_host(url)
+        if host is not None:
+            self._buckets[host].acquire()
+
+    def observe_latency(self, url: str, seconds: float):
+        host = self.budget_host(url)
+        if host is None:
+            return
+        with self._lock:
+            previous = self._latency.get(host)
+            self._latency[host] = (
+                seconds if previous is None else 0.8 * previous + 0.2 * seconds
+            )
+
+    def latency(self):
+        with self._lock:
+            return max(self._latency.values(), default=0.0)
+
+
+RATE_LIMITER = RateLimiter(DEFAULT_HOST_RATE_LIMITS)
+
+
+# Load a page within the politeness budget of its host, recording how long it took.
+def load_page(driver, url: str):
+    RATE_LIMITER.throttle(url)
+    start = time.monotonic()
+    driver.get(url)
+    RATE_LIMITER.observe_latency(url, time.monotonic() - start)
+
+
+METRICS_LATENCY_BUCKETS = [
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    25.0,
+    60.0,
+    120.0,
+    300.0,
+]
+
+
+# Times the phases of creating a single work, such as loading the page, filling in the title, or submitting.
+#
+# Each lap records the time since the previous lap as the named phase.
+class PhaseTimer:
+    def __init__(self, metrics):
+        self._metrics = metrics
+        self._last = time.monotonic()
+
+    def lap(self, phase: str):
+        now = time.monotonic()
+        self._metrics.observe_phase(phase, now - self._last)
+        self._last = now
+
+
+# The counters and latency histograms of a run.
+#
+# Phases are tagged with the part of the series which the current thread is creating, either original or translation.
+# The metrics are written as a Prometheus textfile, for the textfile collector of the node exporter, and as a JSON summary.
+# Both files are rewritten at most every flush_interval seconds while works complete and once more at the end of the run.
+class Metrics:
+    def __init__(self, buckets: list = METRICS_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.textfile = None
+        self.json_path = None
+        self.progress = False
+        self.flush_interval = 10.0
+        self.started = time.monotonic()
+        self.expected = 0
+        self.commands = 0
+        self._counters = {}
+        self._phases = {}
+        self._last_flush = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # Tag the phases timed by the current thread with a part of the series.
+    def set_part(self, part: str):
+        self._local.part = part
+
+    def timer(self) -> PhaseTimer:
+        return PhaseTimer(self)
+
+    def observe_phase(self, phase: str, seconds: float):
+        key = (getattr(self._local, "part", "original"), phase)
+        with self._lock:
+            self._phases.setdefault(key, []).append(seconds)
+
+    def increment(self, name: str, amount: int = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    # Count a command sent to a browser session.
+    def count_command(self):
+        with self._lock:
+            self.commands += 1
+
+    # Add works to the number expected in this run, which the ETA is based on.
+    def expect(self, works: int):
+        with self._lock:
+            self.expected += works
+
+    # Count a finished work as created, skipped, updated, or failed, then update the progress line and the metric files.
+    def record_work(self, outcome: str, entity: str):
+        self.increment("driverbrainz_works_total", outcome=outcome, entity=entity)
+        # The line is cleared before it's redrawn, so redirect the output of the run to keep it on a line of its own.
+        if self.progress:
+            print(
+                f"\r{self.progress_line()}\x1b[K", end="", file=sys.stderr, flush=True
+            )
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def done(self) -> int:
+        with self._lock:
+            return sum(
+                value
+                for (name, _), value in self._counters.items()
+                if name == "driverbrainz_works_total"
+            )
+
+    def works_per_minute(self) -> float:
+        elapsed = time.monotonic() - self.started
+        return self.done() / elapsed * 60 if elapsed > 0 else 0.0
+
+    def progress_line(self) -> str:
+        done = self.done()
+        rate = self.works_per_minute()
+        line = f"{done}/{self.expected} works, {rate:.1f} works/minute"
+        if rate > 0 and self.expected > done:
+            hours, remaining = divmod(int((self.expected - done) / rate * 60), 3600)
+            minutes, seconds = divmod(remaining, 60)
+            line += f", ETA {hours}:{minutes:02}:{seconds:02}"
+        return line
+
+    def prometheus_text(self) -> str:
+        lines = [
+            "# HELP driverbrainz_works_total The number of finished works by outcome.",
+            "# TYPE driverbrainz_works_total counter",
+        ]
+        with self._lock:
+            counters = dict(self._counters)
+            phases = {key: list(samples) for key, samples in self._phases.items()}
+        for (name, labels), value in sorted(counters.items()):
+            label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+            lines.append(f"{name}{{{label_text}}} {value}")
+        lines.extend(
+            [
+                "# HELP driverbrainz_webdriver_commands_total The number of commands sent to the browser sessions.",
+                "# TYPE driverbrainz_webdriver_commands_total counter",
+                f"driverbrainz_webdriver_commands_total {self.commands}",
+                "# HELP driverbrainz_works_per_minute The number of works finished per minute since the start of the run.",
+                "# TYPE driverbrainz_works_per_minute gauge",
+                f"driverbrainz_works_per_minute {self.works_per_minute()}",
+                "# HELP driverbrainz_phase_seconds The time taken by each phase of creating a work.",
+                "# TYPE driverbrainz_phase_seconds histogram",
+            ]
+        )
+        for (part, phase), samples in sorted(phases.items()):
+            labels = f'part="{part}",phase="{phase}"'
+            for bucket in self.buckets:
+                count = sum(1 for sample in samples if sample <= bucket)
+                lines.append(
+                    f'driverbrainz_phase_seconds_bucket{{{labels},le="{bucket}"}} {count}'
+                )
+            lines.append(
+                f'driverbrainz_phase_seconds_bucket{{{labels},le="+Inf"}} {len(samples)}'
+            )
+            lines.append(f"driverbrainz_phase_seconds_sum{{{labels}}} {sum(samples)}")
+            lines.append(f"driverbrainz_phase_seconds_count{{{labels}}} {len(samples)}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            phases = {key: sorted(samples) for key, samples in self._phases.items()}
+        summary = {
+            "elapsed": time.monotonic() - self.started,
+            "expected": self.expected,
+            "works_per_minute": self.works_per_minute(),
+            "commands": self.commands,
+            "works": {},
+            "phases": {},
+        }
+        for (name, labels), value in counters.items():
+            if name == "driverbrainz_works_total":
+                labels = dict(labels)
+                summary["works"].setdefault(labels["entity"], {})[labels["outcome"]] = (
+                    value
+                )
+        for (part, phase), samples in sorted(phases.items()):
+            summary["phases"].setdefault(part, {})[phase] = {
+                "count": len(samples),
+                "mean": statistics.mean(samples),
+                "variance": statistics.variance(samples) if len(samples) > 1 else 0.0,
+                "p50": samples[int(0.5 * (len(samples) - 1))],
+                "p95": samples[int(0.95 * (len(samples) - 1))],
+                "max": samples[-1],
+            }
+        return summary
+
+    # Write the metric files, replacing them atomically so that a collector never reads a partial file.
+    def flush(self):
+        self._last_flush = time.monotonic()
+        for path, content in [
+            (self.textfile, self.prometheus_text),
+            (self.json_path, lambda: json.dumps(self.summary(), indent=2) + "\n"),
+        ]:
+            if path is None:
+                continue
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                f.write(content())
+            os.replace(temporary, path)
+
+
+METRICS = Metrics()
+
+
+# The regularized incomplete beta function, evaluated with Lentz's continued fraction.
+def regularized_incomplete_beta(x: float, a: float, b: float) -> float:
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    # The continued fraction converges quickly only on one side of the mean.
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - regularized_incomplete_beta(1.0 - x, b, a)
+    front = math.exp(
+        math.lgamma(a + b)
+        - math.lgamma(a)
+        - math.lgamma(b)
+        + a * math.log(x)
+        + b * math.log(1.0 - x)
+    )
+    tiny = 1e-300
+    c = 1.0
+    d = 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, 200):
+        for numerator in [
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ]:
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= c * d
+        if abs(c * d - 1.0) < 1e-12:
+            break
+    return front * fraction / a
+
+
+# Welch's t-test of whether the mean of the latest samples is greater than the mean of the baseline samples.
+#
+# Each side is given by its number of samples, mean, and variance.
+# Returns the one-sided p-value, or None when either side has too few samples.
+def welch_slowdown_p_value(baseline: dict, latest: dict):
+    if baseline["count"] < 2 or latest["count"] < 2:
+        return None
+    baseline_error = baseline["variance"] / baseline["count"]
+    latest_error = latest["variance"] / latest["count"]
+    error = baseline_error + latest_error
+    if error == 0.0:
+        return 0.0 if latest["mean"] > baseline["mean"] else 1.0
+    t = (latest["mean"] - baseline["mean"]) / math.sqrt(error)
+    df = error**2 / (
+        baseline_error**2 / (baseline["count"] - 1)
+        + latest_error**2 / (latest["count"] - 1)
+    )
+    tail = 0.5 * regularized_incomplete_beta(df / (df + t * t), df / 2, 0.5)
+    return tail if t > 0 else 1.0 - tail
+
+
+# A history of the timing of every run, so that slowdowns can be traced to a change in BookBrainz, MusicBrainz, or DriverBrainz.
+#
+# Each run is a single row with the summary of its metrics, which keeps the mean and variance of every phase for comparisons.
+class RunHistory:
+    def __init__(self, path: str = HISTORY_FILE):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY,
+                    started REAL NOT NULL,
+                    version TEXT NOT NULL,
+                    command TEXT NOT NULL,
+                    series TEXT NOT NULL,
+                    workers INTEGER NOT NULL,
+                    elapsed REAL NOT NULL,
+                    works TEXT NOT NULL,
+                    commands_per_work REAL,
+                    phases TEXT NOT NULL
+                )
+                """
+            )
+
+    def record(self, command: str, series: list, workers: int, summary: dict) -> int:
+        finished = sum(
+            count
+            for outcomes in summary["works"].values()
+            for outcome, count in outcomes.items()
+            if outcome in ["created", "updated"]
+        )
+        with self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO runs (started, version, command, series, workers, elapsed, works, commands_per_work, phases) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time() - summary["elapsed"],
+                    driverbrainz_version(),
+                    command,
+                    json.dumps(sorted(series)),
+                    workers,
+                    summary["elapsed"],
+                    json.dumps(summary["works"]),
+                    summary["commands"] / finished if finished else None,
+                    json.dumps(summary["phases"]),
+                ),
+            )
+        return cursor.lastrowid
+
+    def run(self, run_id=None):
+        query = "SELECT id, started, version, command, series, workers, elapsed, works, commands_per_work, phases FROM runs"
+        if run_id is None:
+            row = self._connection.execute(
+                f"{query} ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        else:
+            row = self._connection.execute(
+                f"{query} WHERE id = ?", (run_id,)
+            ).fetchone()
+        return None if row is None else self._run(row)
+
+    # The most recent run before the given run with the same command and series.
+    def previous(self, run: dict):
+        row = self._connection.execute(
+            "SELECT id, started, version, command, series, workers, elapsed, works, commands_per_work, phases FROM runs WHERE id < ? AND command = ? AND series = ? ORDER BY id DESC LIMIT 1",
+            (run["id"], run["command"], json.dumps(run["series"])),
+        ).fetchone()
+        return None if row is None else self._run(row)
+
+    @staticmethod
+    def _run(row) -> dict:
+        return {
+            "id": row[0],
+            "started": row[1],
+            "version": row[2],
+            "command": row[3],
+            "series": json.loads(row[4]),
+            "workers": row[5],
+            "elapsed": row[6],
+            "works": json.loads(row[7]),
+            "commands_per_work": row[8],
+            "phases": json.loads(row[9]),
+        }
+
+
+# The version of DriverBrainz, with the Git revision when running from a clone of the repository.
+def driverbrainz_version() -> str:
+    try:
+        revision = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.realpath(__file__)),
+            capture_output=True,
+            text=True,
+            check=False,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        revision = ""
+    return f"{VERSION}+{revision}" if revision else VERSION
+
+
+# Compare the latency of every phase of a run with a baseline run.
+#
+# A phase is slower when its mean rose by at least min_slowdown and Welch's t-test finds the rise significant at alpha.
+def compare_runs(
+    baseline: dict, latest: dict, alpha: float = 0.05, min_slowdown: float = 0.1
+) -> dict:
+    report = {
+        "baseline": {key: baseline[key] for key in ["id", "version", "workers"]},
+        "latest": {key: latest[key] for key in ["id", "version", "workers"]},
+        "commands_per_work": {
+            "baseline": baseline["commands_per_work"],
+            "latest": latest["commands_per_work"],
+        },
+        "phases": {},
+        "slower": [],
+    }
+    for part, phases in latest["phases"].items():
+        for phase, stats in phases.items():
+            baseline_stats = baseline["phases"].get(part, {}).get(phase)
+            if baseline_stats is None:
+                continue
+            change = (
+                stats["mean"] / baseline_stats["mean"] - 1
+                if baseline_stats["mean"]
+                else None
+            )
+            p_value = welch_slowdown_p_value(baseline_stats, stats)
+            name = f"{part} {phase}"
+            report["phases"][name] = {
+                "baseline_p50": baseline_stats["p50"],
+                "latest_p50": stats["p50"],
+                "baseline_p95": baseline_stats["p95"],
+                "latest_p95": stats["p95"],
+                "change": change,
+                "p_value": p_value,
+            }
+            if (
+                change is not None
+                and change >= min_slowdown
+                and p_value is not None
+                and p_value < alpha
+            ):
+                report["slower"].append(name)
+    return report
+
+
+# Adjust the number of active browser sessions with additive increase and multiplicative decrease.
+#
+# Every successful work raises the limit by one session per window of limit works.
+# A failed work or a page load latency above the target halves the limit.
+# The limit never changes more than once per window so that a burst of failures only backs off once.
+class ConcurrencyController:
+    def __init__(
+        self,
+        maximum: int,
+        minimum: int = 1,
+        initial=None,
+        target_latency: float = 10.0,
+        decrease_factor: float = 0.5,
+    ):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(self.minimum if initial is None else initial)
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self._active = 0
+        self._since_decrease = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self._active >= int(self.limit):
+                self._condition.wait()
+            self._active += 1
+
+    def release(self):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def record(self, error: bool, latency: float = 0.0):
+        with self._condition:
+            self._since_decrease += 1
+            previous = int(self.limit)
+            if error or latency > self.target_latency:
+                if self._since_decrease >= self.limit:
+                    self.limit = max(
+                        float(self.minimum), self.limit * self.decrease_factor
+                    )
+                    self._since_decrease = 0
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+            if int(self.limit) != previous:
+                logger.info(
+                    f"Adjusted the number of active sessions from {previous} to {int(self.limit)}"
+                )
+            self._condition.notify_all()
+
+
 def musicbrainz_log_in(driver, username):
     username_text_box = driver.find_element(by=By.ID, value="id-username")
     username_text_box.send_keys(username)
     password_text_box = driver.find_element(by=By.ID, value="id-password")
     password_text_box.send_keys(os.environ.get("MUSICBRAINZ_PASSWORD"))
     submit_button = driver.find_element(by=By.CSS_SELECTOR, value="button:nth-child(1)")
+    RATE_LIMITER.throttle("musicbrainz.org")
     submit_button.click()
 
 
+# The name of a title with the subtitle and index filled in.
+def bookbrainz_title_name(
+    index, title, index_number_format_map: dict = DEFAULT_INDEX_NUMBER_FORMAT_MAP
+) -> str:
+    subtitle = ""
+    if "subtitle" in title and title["subtitle"]:
+        subtitle = title["subtitle"]
+    return (
+        title["text"]
+        .replace("|subtitle|", subtitle)
+        .replace("|index|", format_index(index, title, index_number_format_map))
+    )
+
+
+# The sort name of a title with the subtitle and index filled in.
+# Returns None when the sort name is copied or guessed by BookBrainz.
+def bookbrainz_title_sort_name(
+    index,
+    title,
+    sort_index_number_format_map: dict = DEFAULT_SORT_INDEX_NUMBER_FORMAT_MAP,
+):
+    if title["sort"] in ["COPY", "GUESS"]:
+        return None
+    sort_subtitle = ""
+    if "sort_subtitle" in title and title["sort_subtitle"]:
+        sort_subtitle = title["sort_subtitle"]
+    elif "subtitle" in title and title["subtitle"]:
+        sort_subtitle = title["subtitle"]
+    return sanitize_sort(
+        title["sort"]
+        .replace("|subtitle|", sort_subtitle)
+        .replace("|index|", format_index(index, title, sort_index_number_format_map))
+    )
+
+
 def bookbrainz_set_title(
     driver,
     index,
@@ -382,11 +966,7 @@ def bookbrainz_set_title(
     subtitle = ""
     if "subtitle" in title and title["subtitle"]:
         subtitle = title["subtitle"]
-    name = (
-        title["text"]
-        .replace("|subtitle|", subtitle)
-        .replace("|index|", format_index(index, title, index_number_format_map))
-    )
+    name = bookbrainz_title_name(index, title, index_number_format_map)
     name_text_box.send_keys(name)
     wait.until(
         EC.visibility_of_element_located(
@@ -457,10 +1037,14 @@ def bookbrainz_set_title(
     )
 
 
-def bookbrainz_add_aliases(driver, aliases):
+# Add aliases in the alias editor.
+#
+# When editing a work which already has aliases, start is the number of existing aliases and the new aliases are added after them.
+def bookbrainz_add_aliases(driver, aliases, start: int = 0):
     wait = WebDriverWait(driver, timeout=200)
     add_aliases_button = driver.find_element(
-        by=By.XPATH, value="//button[text()='Add aliases…']"
+        by=By.XPATH,
+        value="//button[text()='Add aliases…' or text()='Edit aliases…']",
     )
     add_aliases_button.click()
     wait.until(
@@ -472,8 +1056,18 @@ def bookbrainz_add_aliases(driver, aliases):
         by=By.CSS_SELECTOR, value=".offset-lg-9 > .btn"
     )
     close_button = driver.find_element(by=By.XPATH, value="//button[text()='Close']")
+    if start > 0:
+        add_alias_button.click()
+        wait.until(
+            EC.visibility_of_element_located(
+                (
+                    By.XPATH,
+                    f"(//div/div[@class='row']/div[@class='col-lg-4']/div[@class='form-group']/input[@class='form-control'])[{start + 1}]",
+                )
+            )
+        )
     for index, alias in enumerate(aliases):
-        one_based_index = index + 1
+        one_based_index = start + index + 1
         name_text_box = driver.find_element(
             by=By.XPATH,
             value=f"(//div/div[@class='row']/div[@class='col-lg-4']/div[@class='form-group']/input[@class='form-control'])[{one_based_index}]",
@@ -630,6 +1224,47 @@ def bookbrainz_set_work_type(driver, work_type):
     )
 
 
+# Quote a string for use in an XPath expression, which has no escape for quotes.
+def xpath_string(text: str) -> str:
+    if "'" not in text:
+        return f"'{text}'"
+    if '"' not in text:
+        return f'"{text}"'
+    parts = text.split("'")
+    return "concat(" + ', "\'", '.join(f"'{part}'" for part in parts) + ")"
+
+
+# Choose the other entity in the relationship editor by its BBID.
+#
+# When the entity was resolved before the run, its type is checked before the editor is touched, and its option is picked by its cached name as soon as it's listed instead of waiting for the search to settle.
+# Entities which weren't resolved, such as when the preflight is skipped, wait for the search to select them.
+def bookbrainz_select_entity(wait, text_box, bbid: str, entity_type: str):
+    entity = BOOKBRAINZ_ENTITIES.get(bbid.lower())
+    if entity is not None and entity["type"] != entity_type:
+        raise RuntimeError(
+            f"The BookBrainz entity {bbid} is a {entity['type']}, not a {entity_type}"
+        )
+    RATE_LIMITER.throttle("bookbrainz.org")
+    text_box.send_keys(bbid)
+    selected = (By.XPATH, "//div[@class='progress']/div[@aria-valuenow=50]")
+    if entity is None or not entity.get("name"):
+        wait.until(EC.visibility_of_element_located(selected))
+        return
+    option = (
+        By.XPATH,
+        f"//div[starts-with(@class,'react-select__option') and contains(., {xpath_string(entity['name'])})]",
+    )
+    found = wait.until(
+        EC.any_of(
+            EC.element_to_be_clickable(option),
+            EC.visibility_of_element_located(selected),
+        )
+    )
+    if found.get_attribute("class").startswith("react-select__option"):
+        found.click()
+        wait.until(EC.visibility_of_element_located(selected))
+
+
 def bookbrainz_add_series(driver, series, index):
     wait = WebDriverWait(driver, timeout=200)
     add_relationships_button = driver.find_element(
@@ -640,12 +1275,7 @@ def bookbrainz_add_series(driver, series, index):
     other_entity_text_box = driver.find_element(
         By.ID, "react-select-relationshipEntitySearchField-input"
     )
-    other_entity_text_box.send_keys(series)
-    wait.until(
-        EC.visibility_of_element_located(
-            (By.XPATH, "//div[@class='progress']/div[@aria-valuenow=50]")
-        )
-    )
+    bookbrainz_select_entity(wait, other_entity_text_box, series, "series")
     relationship_text_box_locator = locate_with(
         By.XPATH, "//div[@class='react-select__input']/input"
     ).below(other_entity_text_box)
@@ -714,11 +1344,11 @@ def bookbrainz_add_relationship(driver, relationship):
     other_entity_text_box = driver.find_element(
         By.ID, "react-select-relationshipEntitySearchField-input"
     )
-    other_entity_text_box.send_keys(relationship["id"])
-    wait.until(
-        EC.visibility_of_element_located(
-            (By.XPATH, "//div[@class='progress']/div[@aria-valuenow=50]")
-        )
+    bookbrainz_select_entity(
+        wait,
+        other_entity_text_box,
+        relationship["id"],
+        BOOKBRAINZ_RELATIONSHIP_TARGET_TYPE[relationship["role"].lower()],
     )
     relation = BOOKBRAINZ_RELATIONSHIP_VERB[relationship["role"].lower()]
     relationship_text_box_locator = locate_with(
@@ -754,17 +1384,15 @@ def bookbrainz_add_relationship(driver, relationship):
     wait.until(EC.visibility_of(add_relationships_button))
 
 
-def bookbrainz_create_work(
-    driver,
-    work,
-    index,
-    username=None,
-    index_number_format_map: dict = DEFAULT_INDEX_NUMBER_FORMAT_MAP,
-    sort_index_number_format_map: dict = DEFAULT_SORT_INDEX_NUMBER_FORMAT_MAP,
-):
+# Serializes logging in and writing the cookie cache between browser sessions.
+COOKIES_LOCK = threading.Lock()
+
+
+# Open a BookBrainz editor, the work editor by default, logging in through MusicBrainz if necessary.
+def bookbrainz_log_in(driver, username, url: str = BOOKBRAINZ_CREATE_WORK_URL):
     wait = WebDriverWait(driver, timeout=200)
 
-    driver.get(BOOKBRAINZ_CREATE_WORK_URL)
+    load_page(driver, url)
 
     wait.until(
         lambda x: (
@@ -772,27 +1400,277 @@ def bookbrainz_create_work(
             or x.find_element(By.ID, ".logo > .logo")
         )
     )
-    if "https://musicbrainz.org/oauth2/authorize" in driver.current_url:
+    if "https://musicbrainz.org/oauth2/authorize" not in driver.current_url:
+        return
+    with COOKIES_LOCK:
         musicbrainz_log_in(driver, username)
         wait.until(
             EC.visibility_of_element_located((By.CSS_SELECTOR, ".card-header > div"))
         )
-        cookies = []
-        try:
-            with open(COOKIES_CACHE_FILE) as f:
-                cookies = json.load(f)
-        except FileNotFoundError:
-            pass
-        cookies = [
+        save_cookie(driver, "connect.sid")
+    if driver.current_url != url:
+        load_page(driver, url)
+
+
+# Find a cookie for a host in the cookie cache.
+def cached_cookie(name: str, host: str):
+    try:
+        with open(COOKIES_CACHE_FILE) as f:
+            cookies = json.load(f)
+    except FileNotFoundError:
+        return None
+    return next(
+        (
             cookie
             for cookie in cookies
-            if not (
-                cookie["domain"] == "bookbrainz.org" and cookie["name"] == "connect.sid"
+            if cookie["name"] == name and host.endswith(cookie["domain"].lstrip("."))
+        ),
+        None,
+    )
+
+
+# Save a cookie of the current page in the cookie cache, replacing the cached cookie of the same name and domain.
+#
+# Callers hold COOKIES_LOCK.
+def save_cookie(driver, name: str):
+    cookie = driver.get_cookie(name)
+    if cookie is None:
+        return
+    cookies = []
+    try:
+        with open(COOKIES_CACHE_FILE) as f:
+            cookies = json.load(f)
+    except FileNotFoundError:
+        pass
+    cookies = [
+        c
+        for c in cookies
+        if not (c["domain"] == cookie["domain"] and c["name"] == cookie["name"])
+    ]
+    cookies.append(cookie)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(COOKIES_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump(cookies, f, ensure_ascii=False, indent=4)
+
+
+# The number of an index within a series, taking the series' offset into account.
+def series_number(series: dict, index: str) -> str:
+    if "offset" in series and series["offset"]:
+        offset_index = float(index) + series["offset"]
+        if offset_index.is_integer():
+            offset_index = int(offset_index)
+        return str(offset_index)
+    return index
+
+
+# The aliases of a work, which are all of its titles after the first, with the subtitle and index filled in.
+def bookbrainz_work_aliases(
+    work: dict,
+    index,
+    index_number_format_map: dict = DEFAULT_INDEX_NUMBER_FORMAT_MAP,
+    sort_index_number_format_map: dict = DEFAULT_SORT_INDEX_NUMBER_FORMAT_MAP,
+) -> list:
+    titles = []
+    for a in work["titles"][1:]:
+        subtitle = ""
+        if "subtitle" in a and a["subtitle"]:
+            subtitle = a["subtitle"]
+        sort_subtitle = ""
+        if "sort_subtitle" in a and a["sort_subtitle"]:
+            sort_subtitle = a["sort_subtitle"]
+        else:
+            sort_subtitle = subtitle
+        titles.append(
+            {
+                "text": a["text"]
+                .replace("|subtitle|", subtitle)
+                .replace("|index|", format_index(index, a, index_number_format_map)),
+                "sort": sanitize_sort(
+                    a["sort"]
+                    .replace("|subtitle|", sort_subtitle)
+                    .replace(
+                        "|index|",
+                        format_index(index, a, sort_index_number_format_map),
+                    )
+                ),
+                "language": a["language"],
+                "primary": a["primary"] if "primary" in a else False,
+            }
+        )
+    return titles
+
+
+# The ISO 639-3 codes of the languages which series files name.
+#
+# Works and aliases are created by choosing the name of their language in the work editor, but the BookBrainz API identifies the language of an alias by its code.
+BOOKBRAINZ_LANGUAGE_CODES = {
+    "Chinese": "zho",
+    "English": "eng",
+    "French": "fra",
+    "German": "deu",
+    "Italian": "ita",
+    "Japanese": "jpn",
+    "Korean": "kor",
+    "Portuguese": "por",
+    "Russian": "rus",
+    "Spanish": "spa",
+}
+
+
+# The ISO 639-3 code of a language given by its name or its code, for comparing the languages of series files with those of the BookBrainz API.
+#
+# Languages without a known code are compared by their name.
+def bookbrainz_language(language):
+    if language in BOOKBRAINZ_LANGUAGE_CODES:
+        return BOOKBRAINZ_LANGUAGE_CODES[language]
+    if (
+        isinstance(language, str)
+        and language.lower() in BOOKBRAINZ_LANGUAGE_CODES.values()
+    ):
+        return language.lower()
+    return language
+
+
+# Whether the relationships of a work from BookBrainzApi.related_links include a relationship with the given entity and link phrase.
+#
+# Relationships whose phrase the API didn't name match any phrase, as does a phrase of None.
+def has_bookbrainz_link(links: set, bbid: str, phrase) -> bool:
+    return any(
+        other == bbid and (phrase is None or link_phrase in (phrase, None))
+        for other, link_phrase, _ in links
+    )
+
+
+# The sort name which an alias of a planned work is expected to have, or None when BookBrainz guesses it.
+def bookbrainz_alias_sort_name(alias: dict):
+    if alias["sort"] == "COPY":
+        return alias["text"]
+    if alias["sort"] == "GUESS":
+        return None
+    return alias["sort"]
+
+
+# Compute the minimal changes which turn an existing work from the BookBrainz API into the planned work.
+#
+# Aliases are matched by their name and language, and those whose sort name differs are corrected.
+# Relationships are matched by their target and their role, and series by their BBID and the number of the work in the series.
+# The related links are the relationships of the work from BookBrainzApi.related_links.
+# The differences may contain the name, the sort name, the type, the language, the aliases to add, the aliases whose sort names to correct, the series to add, the series to remove because the work has the wrong number in them, and the relationships to add.
+def diff_bookbrainz_work(
+    work: dict,
+    index,
+    details: dict,
+    aliases: dict,
+    related: set,
+    index_number_format_map: dict = DEFAULT_INDEX_NUMBER_FORMAT_MAP,
+    sort_index_number_format_map: dict = DEFAULT_SORT_INDEX_NUMBER_FORMAT_MAP,
+) -> dict:
+    differences = {}
+    default_alias = details.get("defaultAlias") or {}
+    title = work["titles"][0]
+    name = bookbrainz_title_name(index, title, index_number_format_map)
+    if default_alias.get("name") != name:
+        differences["name"] = name
+    sort_name = bookbrainz_title_sort_name(index, title, sort_index_number_format_map)
+    if sort_name is not None and default_alias.get("sortName") != sort_name:
+        differences["sort_name"] = sort_name
+
+    existing_aliases = [
+        alias
+        for alias in aliases.get("aliases") or []
+        if alias.get("name") != default_alias.get("name")
+        or alias.get("language") != default_alias.get("language")
+    ]
+    existing = {
+        (alias.get("name"), bookbrainz_language(alias.get("language"))): position
+        for position, alias in enumerate(existing_aliases)
+    }
+    new_aliases = []
+    alias_sort_names = []
+    for alias in bookbrainz_work_aliases(
+        work, index, index_number_format_map, sort_index_number_format_map
+    ):
+        position = existing.get((alias["text"], bookbrainz_language(alias["language"])))
+        if position is None:
+            new_aliases.append(alias)
+            continue
+        sort_name = bookbrainz_alias_sort_name(alias)
+        if (
+            sort_name is not None
+            and existing_aliases[position].get("sortName") != sort_name
+        ):
+            alias_sort_names.append({**alias, "position": position})
+    if new_aliases or alias_sort_names:
+        differences["existing_aliases"] = len(existing_aliases)
+    if new_aliases:
+        differences["aliases"] = new_aliases
+    if alias_sort_names:
+        differences["alias_sort_names"] = alias_sort_names
+
+    if work.get("type") and details.get("workType") not in (None, work["type"]):
+        differences["type"] = work["type"]
+    if work.get("language"):
+        languages = [
+            bookbrainz_language(
+                language.get("name") if isinstance(language, dict) else language
             )
+            for language in details.get("languages") or []
         ]
-        cookies.append(driver.get_cookie("connect.sid"))
-        with open(COOKIES_CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(cookies, f, ensure_ascii=False, indent=4)
+        if languages != [bookbrainz_language(work["language"])]:
+            differences["language"] = work["language"]
+
+    new_series = []
+    stale_series = []
+    for series in work.get("series") or []:
+        if not series or not series.get("id"):
+            continue
+        bbid = bbid_from_url(series["id"])
+        numbers = {
+            number
+            for other, phrase, number in related
+            if other == bbid and phrase in ("is part of", None)
+        }
+        # The number of a relationship the API didn't number can't be checked.
+        if normalize_index(series_number(series, index)) in numbers or None in numbers:
+            continue
+        new_series.append(series)
+        if numbers:
+            stale_series.append(bbid)
+    if new_series:
+        differences["series"] = new_series
+    if stale_series:
+        differences["stale_series"] = stale_series
+
+    new_relationships = [
+        relationship
+        for relationship in work.get("relationships", [])
+        if relationship
+        and relationship.get("id")
+        and relationship.get("role")
+        and not has_bookbrainz_link(
+            related,
+            bbid_from_url(relationship["id"]),
+            BOOKBRAINZ_RELATIONSHIP_VERB.get(relationship["role"].lower()),
+        )
+    ]
+    if new_relationships:
+        differences["relationships"] = new_relationships
+    return differences
+
+
+def bookbrainz_create_work(
+    driver,
+    work,
+    index,
+    username=None,
+    index_number_format_map: dict = DEFAULT_INDEX_NUMBER_FORMAT_MAP,
+    sort_index_number_format_map: dict = DEFAULT_SORT_INDEX_NUMBER_FORMAT_MAP,
+):
+    wait = WebDriverWait(driver, timeout=200)
+    timer = METRICS.timer()
+
+    bookbrainz_log_in(driver, username)
+    timer.lap("page_load")
     bookbrainz_set_title(
         driver,
         index,
@@ -812,520 +1690,904 @@ def bookbrainz_create_work(
                 (By.XPATH, "//span[@class='text-success' and text()='Disambiguation']")
             )
         )
+    timer.lap("title")
 
     if "titles" in work and len(work["titles"]) > 1:
-        titles = []
-        for a in work["titles"][1:]:
-            subtitle = ""
-            if "subtitle" in a and a["subtitle"]:
-                subtitle = a["subtitle"]
-            sort_subtitle = ""
-            if "sort_subtitle" in a and a["sort_subtitle"]:
-                sort_subtitle = a["sort_subtitle"]
-            else:
-                sort_subtitle = subtitle
-            titles.append(
-                {
-                    "text": a["text"]
-                    .replace("|subtitle|", subtitle)
-                    .replace(
-                        "|index|", format_index(index, a, index_number_format_map)
-                    ),
-                    "sort": sanitize_sort(
-                        a["sort"]
-                        .replace("|subtitle|", sort_subtitle)
-                        .replace(
-                            "|index|",
-                            format_index(index, a, sort_index_number_format_map),
-                        )
-                    ),
-                    "language": a["language"],
-                    "primary": a["primary"] if "primary" in a else False,
-                }
-            )
-        bookbrainz_add_aliases(driver, titles)
+        bookbrainz_add_aliases(
+            driver,
+            bookbrainz_work_aliases(
+                work, index, index_number_format_map, sort_index_number_format_map
+            ),
+        )
+        timer.lap("aliases")
     if "identifiers" in work and work["identifiers"]:
         bookbrainz_add_identifiers(driver, work["identifiers"])
     bookbrainz_set_work_type(driver, work["type"])
+    bookbrainz_set_work_language(driver, work["language"])
+    timer.lap("details")
+    if "series" in work and work["series"]:
+        for series in work["series"]:
+            if "id" in series and series["id"]:
+                bookbrainz_add_series(
+                    driver, series["id"], series_number(series, index)
+                )
+        timer.lap("series")
+    if "relationships" in work:
+        for relationship in work["relationships"]:
+            if relationship:
+                bookbrainz_add_relationship(driver, relationship)
+        timer.lap("relationships")
+    bookbrainz_submit(driver)
+    timer.lap("submit")
+
 
+# Choose the language of the work in the work editor, removing any other languages of an existing work first.
+def bookbrainz_set_work_language(driver, language):
+    wait = WebDriverWait(driver, timeout=200)
+    while True:
+        remove_buttons = driver.find_elements(
+            by=By.XPATH,
+            value="//div[contains(@class,'react-select__multi-value__remove')]",
+        )
+        if not remove_buttons:
+            break
+        remove_buttons[0].click()
+        wait.until(EC.staleness_of(remove_buttons[0]))
     work_language_text_box = driver.find_element(
         by=By.XPATH,
         value="(//div[@class='form-group']/div[starts-with(@class,'Select')]/div[starts-with(@class,'react-select__control')]/div[starts-with(@class,'react-select__value-container')]/div/div[@class='react-select__input']/input[@id='react-select-language-input'])[2]",
     )
-    work_language_text_box.send_keys(work["language"])
+    work_language_text_box.send_keys(language)
     wait.until(
         EC.visibility_of_element_located(
             (
                 By.XPATH,
-                f"//div[starts-with(@class,'react-select__menu-list')]/div[@id='react-select-language-option-0' and text()='{work['language']}']",
+                f"//div[starts-with(@class,'react-select__menu-list')]/div[@id='react-select-language-option-0' and text()='{language}']",
             )
         )
     )
     first_work_language_option = driver.find_element(
         by=By.XPATH,
-        value=f"//div[starts-with(@class,'react-select__menu-list')]/div[@id='react-select-language-option-0' and text()='{work['language']}']",
+        value=f"//div[starts-with(@class,'react-select__menu-list')]/div[@id='react-select-language-option-0' and text()='{language}']",
     )
     first_work_language_option.click()
     wait.until(
         EC.visibility_of_element_located(
             (
                 By.XPATH,
-                f"//div[contains(@class,'react-select__multi-value__label') and contains(text(),'{work['language']}')]",
+                f"//div[contains(@class,'react-select__multi-value__label') and contains(text(),'{language}')]",
             )
         )
     )
-    if "series" in work and work["series"]:
-        for series in work["series"]:
-            if "id" in series and series["id"]:
-                if "offset" in series and series["offset"]:
-                    offset_index = float(index) + series["offset"]
-                    if offset_index.is_integer():
-                        offset_index = int(offset_index)
-                    bookbrainz_add_series(
-                        driver,
-                        series["id"],
-                        str(offset_index),
-                    )
-                else:
-                    bookbrainz_add_series(driver, series["id"], index)
-    if "relationships" in work:
-        for relationship in work["relationships"]:
-            if relationship:
-                bookbrainz_add_relationship(driver, relationship)
-    submit_button = driver.find_element(
-        by=By.XPATH, value="(//button[@type='submit'])[2]"
+
+
+# Correct the sort names of existing aliases in the alias editor.
+#
+# Each alias has the position of its row among the existing aliases, as computed by diff_bookbrainz_work.
+def bookbrainz_set_alias_sort_names(driver, aliases):
+    wait = WebDriverWait(driver, timeout=200)
+    edit_aliases_button = driver.find_element(
+        by=By.XPATH,
+        value="//button[text()='Add aliases…' or text()='Edit aliases…']",
     )
-    submit_button.click()
+    edit_aliases_button.click()
     wait.until(
-        EC.visibility_of_element_located(
-            (
-                By.XPATH,
-                "//a[contains(@class,'btn-success') and contains(text(),'Add Edition')]",
-            )
+        EC.text_to_be_present_in_element(
+            (By.CSS_SELECTOR, ".modal-title"), "Alias Editor"
         )
     )
-
-
-# def musicbrainz_add_series(macropad, series, index):
-#     macropad.keyboard.send(macropad.Keycode.SPACE)
-#     driver.implicitly_wait(0.2)
-#     write(macropad, "Series")
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     write(macropad, "has parts / part of")
-#     driver.implicitly_wait(0.25)
-#     tab(macropad, 2)
-#     write(macropad, series)
-#     driver.implicitly_wait(1)
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     write(macropad, f"{index}")
-#     macropad.keyboard.send(macropad.Keycode.ENTER)
-#     driver.implicitly_wait(0.2)
-
-
-# def musicbrainz_add_translation_of_relationship(macropad, original_work_id):
-#     macropad.keyboard.send(macropad.Keycode.SPACE)
-#     driver.implicitly_wait(0.2)
-#     write(macropad, "Work")
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     driver.implicitly_wait(0.1)
-#     write(macropad, "later versions / version of")
-#     driver.implicitly_wait(0.25)
-#     tab(macropad, 2)
-#     driver.implicitly_wait(0.1)
-#     if original_work_id == "PASTE_FROM_CLIPBOARD":
-#         paste(macropad)
-#     else:
-#         write(macropad, original_work_id)
-#     driver.implicitly_wait(1)
-#     tab(macropad, 2)
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.SPACE)
-#     driver.implicitly_wait(0.2)
-#     tab(macropad, 2)
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.SPACE)
-#     driver.implicitly_wait(0.2)
-#     tab(macropad, 2)
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.SPACE)
-#     driver.implicitly_wait(0.2)
-
-
-# def musicbrainz_add_artist(macropad, artist):
-#     macropad.keyboard.send(macropad.Keycode.SPACE)
-#     driver.implicitly_wait(0.75)
-#     write(macropad, "Artist")
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     driver.implicitly_wait(0.1)
-#     write(macropad, artist["role"])
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.ENTER)
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     write(macropad, artist["id"])
-#     driver.implicitly_wait(1)
-#     if "credited_as" in artist and artist["credited_as"]:
-#         macropad.keyboard.send(macropad.Keycode.TAB)
-#         driver.implicitly_wait(0.1)
-#         write(macropad, artist["credited_as"])
-#         driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.ENTER)
-#     driver.implicitly_wait(0.2)
-
-
-# def musicbrainz_add_identifiers(macropad, identifiers):
-#     for identifier in identifiers:
-#         write(macropad, identifier)
-#         driver.implicitly_wait(0.4)
-#         macropad.keyboard.send(macropad.Keycode.ENTER)
-#         driver.implicitly_wait(0.4)
-
-
-# # This is done after the work is created
-# def musicbrainz_add_aliases(macropad, aliases, index=None):
-#     for alias_index, alias in enumerate(aliases):
-#         macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.L)
-#         driver.implicitly_wait(0.1)
-#         macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.RIGHT_ARROW)
-#         driver.implicitly_wait(0.2)
-#         write(macropad, "/add-alias")
-#         driver.implicitly_wait(0.2)
-#         macropad.keyboard.send(macropad.Keycode.ESCAPE)
-#         driver.implicitly_wait(0.1)
-#         macropad.keyboard.send(macropad.Keycode.ENTER)
-#         driver.implicitly_wait(12)
-
-#         # Add the alias
-#         macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.A)
-#         macropad.keyboard.send(macropad.Keycode.BACKSPACE)
-#         driver.implicitly_wait(0.1)
-
-#         if alias["text"] == "PASTE_FROM_CLIPBOARD":
-#             paste(macropad)
-#             if index:
-#                 write(macropad, f"{index}")
-#         else:
-#             write(macropad, alias["text"])
-
-#         tab(macropad, 3)
-
-#         if alias["sort"] == "PASTE_FROM_CLIPBOARD":
-#             paste(macropad)
-#             if index:
-#                 write(macropad, f"{index}")
-#             tab(macropad, 3)
-#         elif alias["sort"] == "COPY":
-#             tab(macropad, 2)
-#             macropad.keyboard.send(macropad.Keycode.SPACE)
-#             driver.implicitly_wait(0.1)
-#             tab(macropad, 3)
-#         elif alias["sort"] == "GUESS":
-#             tab(macropad, 1)
-#             driver.implicitly_wait(0.1)
-#             macropad.keyboard.send(macropad.Keycode.SPACE)
-#             driver.implicitly_wait(0.1)
-#             tab(macropad, 1)
-#             macropad.keyboard.send(macropad.Keycode.SPACE)
-#             driver.implicitly_wait(0.1)
-#             tab(macropad, 3)
-#         else:
-#             write(macropad, alias["sort"])
-#             tab(macropad, 3)
-
-#         # Reset the language list to the beginning as a precaution.
-#         macropad.keyboard.send(macropad.Keycode.A)
-#         macropad.keyboard.send(macropad.Keycode.TAB)
-#         macropad.keyboard.send(macropad.Keycode.SHIFT, macropad.Keycode.TAB)
-#         write(macropad, alias["language"])
-#         driver.implicitly_wait(0.1)
-#         macropad.keyboard.send(macropad.Keycode.TAB)
-#         if alias["primary"]:
-#             macropad.keyboard.send(macropad.Keycode.SPACE)
-#         tab(macropad, 2)
-#         write(macropad, "Work name")
-#         macropad.keyboard.send(macropad.Keycode.TAB)
-#         macropad.keyboard.send(macropad.Keycode.ENTER)
-#         driver.implicitly_wait(12)
-
-#         if alias_index < len(aliases) - 1:
-#             # Remove the /aliases part at the end of the URL in the URL bar
-#             macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.L)
-#             driver.implicitly_wait(0.1)
-#             macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.RIGHT_ARROW)
-#             driver.implicitly_wait(0.1)
-#             for _ in range(8):
-#                 macropad.keyboard.send(macropad.Keycode.BACKSPACE)
-
-
-# This is done after a work has been created
-# def musicbrainz_add_tags(macropad, tags, index=None):
-#     macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.L)
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.RIGHT_ARROW)
-#     driver.implicitly_wait(0.2)
-#     write(macropad, "/tags")
-#     driver.implicitly_wait(0.2)
-#     macropad.keyboard.send(macropad.Keycode.ESCAPE)
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.ENTER)
-#     driver.implicitly_wait(12)
-#     for alias_index, alias in enumerate(aliases):
-#         # Add the alias
-#         macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.A)
-#         macropad.keyboard.send(macropad.Keycode.BACKSPACE)
-#         driver.implicitly_wait(0.1)
-
-#         if alias["text"] == "PASTE_FROM_CLIPBOARD":
-#             paste(macropad)
-#             if index:
-#                 write(macropad, f"{index}")
-#         else:
-#             write(macropad, alias["text"])
-
-#         tab(macropad, 5)
-#         macropad.keyboard.send(macropad.Keycode.SPACE)
-#         driver.implicitly_wait(0.1)
-#         tab(macropad, 3)
-#         # Reset the language list to the beginning as a precaution.
-#         macropad.keyboard.send(macropad.Keycode.A)
-#         macropad.keyboard.send(macropad.Keycode.TAB)
-#         macropad.keyboard.send(macropad.Keycode.SHIFT, macropad.Keycode.TAB)
-#         write(macropad, alias["language"])
-#         driver.implicitly_wait(0.1)
-#         macropad.keyboard.send(macropad.Keycode.TAB)
-#         if alias["primary"]:
-#             macropad.keyboard.send(macropad.Keycode.SPACE)
-#         tab(macropad, 2)
-#         write(macropad, "Work name")
-#         macropad.keyboard.send(macropad.Keycode.TAB)
-#         macropad.keyboard.send(macropad.Keycode.ENTER)
-#         driver.implicitly_wait(12)
-
-#         if alias_index < len(aliases) - 1:
-#             # Remove the /aliases part at the end of the URL in the URL bar
-#             macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.L)
-#             driver.implicitly_wait(0.1)
-#             macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.RIGHT_ARROW)
-#             driver.implicitly_wait(0.1)
-#             for _ in range(8):
-#                 macropad.keyboard.send(macropad.Keycode.BACKSPACE)
-
-
-# def musicbrainz_create_work(macropad, work, index):
-#     macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.T)
-#     write(macropad, MUSICBRAINZ_CREATE_WORK_URL)
-#     macropad.keyboard.send(macropad.Keycode.ENTER)
-#     driver.implicitly_wait(15)
-#     # I use the a user script which automatically focuses on the first input box in MusicBrainz.
-#     subtitle = ""
-#     if "subtitle" in work["title"] and work["title"]["subtitle"]:
-#         subtitle = work["title"]["subtitle"]
-#     if "text" in work["title"] and work["title"]["text"]:
-#         write(macropad, work["title"]["text"].replace("|index|", f"{index}").replace("|subtitle|", subtitle))
-#     else:
-#         macropad.keyboard.send(macropad.Keycode.CONTROL, macropad.Keycode.V)
-#         write(macropad, f"{index}")
-#     driver.implicitly_wait(0.1)
-#     tab(macropad, 3)
-#     if "disambiguation" in work and work["disambiguation"]:
-#         write(macropad, work["disambiguation"])
-#     driver.implicitly_wait(0.1)
-#     tab(macropad, 2)
-#     write(macropad, work["type"])
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     write(macropad, work["language"])
-#     driver.implicitly_wait(0.1)
-#     tab(macropad, 10)
-
-#     if "artists" in work:
-#         for artist in work["artists"]:
-#             musicbrainz_add_artist(macropad, artist)
-
-#     if "series" in work and work["series"]:
-#         musicbrainz_add_series(macropad, work["series"], index)
-
-#     if "translation_of" in work and work["translation_of"]:
-#         musicbrainz_add_translation_of_relationship(macropad, work["translation_of"])
-
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     if "identifiers" in work and work["identifiers"]:
-#         musicbrainz_add_identifiers(macropad, work["identifiers"])
-
-#     # Submit by just hitting enter here, thanks to the MusicBrainz user script
-#     macropad.keyboard.send(macropad.Keycode.ENTER)
-#     driver.implicitly_wait(18)
-
-#     # After the work is created, add the aliases
-#     if "aliases" in work and work["aliases"]:
-#         aliases = []
-#         for a in work["aliases"]:
-#             subtitle = ""
-#             if "subtitle" in a and a["subtitle"]:
-#                 subtitle = a["subtitle"]
-#             sort_subtitle = ""
-#             if "sort_subtitle" in a and a["sort_subtitle"]:
-#                 sort_subtitle = a["sort_subtitle"]
-#             aliases.append(
-#                 {
-#                     "text": a["text"].replace("|index|", f"{index}").replace("|subtitle|", subtitle),
-#                     "sort": a["sort"].replace("|index|", f"{index}").replace("|subtitle|", sort_subtitle),
-#                     "language": a["language"],
-#                     "primary": a["primary"],
-#                 }
-#             )
-#         musicbrainz_add_aliases(macropad, aliases, index)
-
-
-# # Set the Artist credit for a MusicBrainz Release Group
-# def musicbrainz_set_artist_credit(macropad, credits):
-#     macropad.keyboard.send(macropad.Keycode.SPACE)
-#     driver.implicitly_wait(1)
-#     for index, credit in enumerate(credits):
-#         write(macropad, credit["id"])
-#         driver.implicitly_wait(1)
-#         macropad.keyboard.send(macropad.Keycode.TAB)
-#         driver.implicitly_wait(0.1)
-#         if "credited_as" in credit and credit["credited_as"]:
-#             write(macropad, credit["credited_as"])
-#             driver.implicitly_wait(0.1)
-#         macropad.keyboard.send(macropad.Keycode.TAB)
-#         driver.implicitly_wait(0.1)
-#         if "join_phrase" in credit and credit["join_phrase"]:
-#             write(macropad, credit["join_phrase"])
-#             driver.implicitly_wait(0.1)
-#             macropad.keyboard.send(macropad.Keycode.ESCAPE)
-#             driver.implicitly_wait(0.1)
-#             macropad.keyboard.send(macropad.Keycode.TAB)
-#             driver.implicitly_wait(0.1)
-#         if index < len(credits) - 1:
-#             tab(macropad, 1 if index == 0 else 3)
-#             driver.implicitly_wait(0.1)
-#             macropad.keyboard.send(macropad.Keycode.SPACE)
-#             driver.implicitly_wait(1)
-#             for _ in range(5):
-#                 macropad.keyboard.send(macropad.Keycode.SHIFT, macropad.Keycode.TAB)
-#             driver.implicitly_wait(0.1)
-#         else:
-#             tab(macropad, 6)
-#             driver.implicitly_wait(0.1)
-#             macropad.keyboard.send(macropad.Keycode.SPACE)
-#             driver.implicitly_wait(0.5)
-
-
-# def musicbrainz_add_external_links(macropad, links):
-#     for link in links:
-#         if "url" not in link or not link["url"]:
-#             continue
-#         write(macropad, link["url"])
-#         driver.implicitly_wait(0.75)
-#         macropad.keyboard.send(macropad.Keycode.ENTER)
-#         driver.implicitly_wait(0.25)
-#         if "type" in link and link["type"]:
-#             write(macropad, link["type"])
-#             driver.implicitly_wait(0.1)
-#             tab(macropad, 2)
-#             driver.implicitly_wait(0.1)
-
-
-# def musicbrainz_create_release_group(macropad, release_group, index):
-#     driver.close()
-#     driver.get(MUSICBRAINZ_CREATE_RELEASE_GROUP_URL)
-#     write(macropad, release_group["name"].replace("|index|", f"{index}"))
-#     driver.implicitly_wait(0.1)
-#     tab(macropad, 5)
-#     musicbrainz_set_artist_credit(macropad, release_group["credits"])
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     if "disambiguation" in release_group and release_group["disambiguation"]:
-#         write(macropad, release_group["disambiguation"])
-#         driver.implicitly_wait(0.1)
-#     tab(macropad, 2)
-#     driver.implicitly_wait(0.1)
-#     write(macropad, release_group["primary_type"])
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     driver.implicitly_wait(0.1)
-#     write(macropad, release_group["secondary_type"])
-#     driver.implicitly_wait(0.1)
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     driver.implicitly_wait(0.1)
-#     if "series" in release_group and release_group["series"]:
-#         musicbrainz_add_series(macropad, release_group["series"], i)
-#     macropad.keyboard.send(macropad.Keycode.TAB)
-#     driver.implicitly_wait(0.1)
-#     musicbrainz_add_external_links(macropad, release_group["links"])
-#     macropad.keyboard.send(macropad.Keycode.ENTER)
-#     driver.implicitly_wait(15)
-
-
-def main():
-    parser = argparse.ArgumentParser(
-        prog="driverbrainz.py",
-        description="Automate time-consuming tasks contributing metadata to BookBrainz and MusicBrainz",
+    for alias in aliases:
+        one_based_index = alias["position"] + 1
+        sort_name_text_box = driver.find_element(
+            by=By.XPATH,
+            value=f"(//div/div[@class='row']/div[@class='col-lg-4']/div[@class='form-group']/div[@class='input-group']/input[@class='form-control'])[{one_based_index}]",
+        )
+        sort_name_text_box.clear()
+        if alias["sort"] == "COPY":
+            driver.find_element(
+                by=By.XPATH,
+                value=f"(//div/div[@class='row']/div[@class='col-lg-4']/div[@class='form-group']/div[@class='input-group']/div[@class='input-group-append']/button[text()='Copy'])[{one_based_index}]",
+            ).click()
+        else:
+            sort_name_text_box.send_keys(alias["sort"])
+        wait.until(
+            EC.visibility_of_element_located(
+                (
+                    By.XPATH,
+                    f"(//div/div[@class='row']/div[@class='col-lg-4']/div[@class='form-group']/label[@class='form-label']/span[@class='text-success' and starts-with(text(),'Sort Name')])[{one_based_index}]",
+                )
+            )
+        )
+    close_button = driver.find_element(by=By.XPATH, value="//button[text()='Close']")
+    close_button.click()
+    wait.until(EC.visibility_of(edit_aliases_button))
+
+
+# Remove the relationships of the work being edited with an entity, such as a series in which the work has the wrong number.
+def bookbrainz_remove_relationships(driver, entity_type: str, bbid: str):
+    wait = WebDriverWait(driver, timeout=200)
+    row = f"//a[contains(@href,'/{entity_type}/{bbid}')]/ancestor::div[contains(@class,'row')][1]"
+    while True:
+        remove_buttons = driver.find_elements(
+            by=By.XPATH, value=f"{row}//button[contains(.,'Remove')]"
+        )
+        if not remove_buttons:
+            break
+        remove_buttons[0].click()
+        wait.until(EC.staleness_of(remove_buttons[0]))
+
+
+# Submit the work editor and wait for the work's page.
+def bookbrainz_submit(driver):
+    wait = WebDriverWait(driver, timeout=200)
+    submit_button = driver.find_element(
+        by=By.XPATH, value="(//button[@type='submit'])[2]"
+    )
+    RATE_LIMITER.throttle("bookbrainz.org")
+    submit_button.click()
+    wait.until(
+        EC.visibility_of_element_located(
+            (
+                By.XPATH,
+                "//a[contains(@class,'btn-success') and contains(text(),'Add Edition')]",
+            )
+        )
     )
 
-    parser.add_argument("command", nargs="?", default="add_bookbrainz_work_series")
-    parser.add_argument(
-        "filename",
-        nargs="?",
-        default=os.path.join(os.path.dirname(os.path.realpath(__file__)), "data.json"),
+
+# Open the editor of an existing work and apply only the differences computed by diff_bookbrainz_work for the planned work.
+#
+# Fields are filled in the same way and with the same checks as when a work is created.
+def bookbrainz_update_work(
+    driver,
+    bbid: str,
+    work: dict,
+    index,
+    differences: dict,
+    username=None,
+    index_number_format_map: dict = DEFAULT_INDEX_NUMBER_FORMAT_MAP,
+    sort_index_number_format_map: dict = DEFAULT_SORT_INDEX_NUMBER_FORMAT_MAP,
+):
+    wait = WebDriverWait(driver, timeout=200)
+    bookbrainz_log_in(driver, username, f"https://bookbrainz.org/work/{bbid}/edit")
+    wait.until(
+        EC.visibility_of_element_located((By.XPATH, "(//button[@type='submit'])[2]"))
     )
-    parser.add_argument("--range-start", type=int)
-    parser.add_argument("--range-end", type=int)
-    parser.add_argument("--no-headless", action="store_true")
-    parser.add_argument("--username")
-    args = parser.parse_args()
+    if "name" in differences or "sort_name" in differences:
+        # The title is entered from scratch so that the editor checks it as it would for a new work.
+        # todo Make more accurate by relative to label
+        name_text_box = driver.find_element(
+            by=By.XPATH,
+            value="(//div[@class='form-group']/input[@class='form-control'])[1]",
+        )
+        sort_name_text_box = driver.find_element(
+            by=By.XPATH,
+            value="(//div[@class='input-group']/input[@class='form-control'])[2]",
+        )
+        name_text_box.clear()
+        sort_name_text_box.clear()
+        bookbrainz_set_title(
+            driver,
+            index,
+            work["titles"][0],
+            index_number_format_map=index_number_format_map,
+            sort_index_number_format_map=sort_index_number_format_map,
+        )
+    if "alias_sort_names" in differences:
+        bookbrainz_set_alias_sort_names(driver, differences["alias_sort_names"])
+    if "aliases" in differences:
+        bookbrainz_add_aliases(
+            driver, differences["aliases"], start=differences["existing_aliases"]
+        )
+    if "type" in differences:
+        bookbrainz_set_work_type(driver, differences["type"])
+    if "language" in differences:
+        bookbrainz_set_work_language(driver, differences["language"])
+    for series_bbid in differences.get("stale_series", []):
+        bookbrainz_remove_relationships(driver, "series", series_bbid)
+    for series in differences.get("series", []):
+        bookbrainz_add_series(driver, series["id"], series_number(series, index))
+    for relationship in differences.get("relationships", []):
+        bookbrainz_add_relationship(driver, relationship)
+    bookbrainz_submit(driver)
+
+
+# Open a MusicBrainz page, restoring the cached session or logging in when MusicBrainz asks for it.
+def musicbrainz_load_page(driver, url: str, username=None):
+    wait = WebDriverWait(driver, timeout=200)
+    load_page(driver, url)
+    if "/login" not in urllib.parse.urlparse(driver.current_url).path:
+        return
+    with COOKIES_LOCK:
+        cookie = cached_cookie(
+            MUSICBRAINZ_SESSION_COOKIE,
+            urllib.parse.urlparse(driver.current_url).hostname,
+        )
+        if cookie is not None:
+            driver.add_cookie(cookie)
+            load_page(driver, url)
+            if "/login" not in urllib.parse.urlparse(driver.current_url).path:
+                return
+        wait.until(EC.visibility_of_element_located((By.ID, "id-username")))
+        musicbrainz_log_in(driver, username)
+        wait.until(lambda x: "/login" not in urllib.parse.urlparse(x.current_url).path)
+        save_cookie(driver, MUSICBRAINZ_SESSION_COOKIE)
 
-    username = args.username
-    if username is None:
-        username = os.environ.get("MUSICBRAINZ_USERNAME")
-    if username is None:
-        logger.error(
-            'Missing MusicBrainz username. Please supply it with the "--username" flag or the "MUSICBRAINZ_USERNAME" environment variable.'
+
+# Log a new browser session in to MusicBrainz.
+def musicbrainz_log_in_session(driver, username):
+    musicbrainz_load_page(driver, f"{MUSICBRAINZ_SERVER}/work/create", username)
+
+
+# Choose an option of a MusicBrainz autocomplete field.
+def musicbrainz_autocomplete(driver, text_box, text: str):
+    wait = WebDriverWait(driver, timeout=200)
+    text_box.clear()
+    text_box.send_keys(text)
+    option = wait.until(
+        EC.element_to_be_clickable(
+            (
+                By.XPATH,
+                f"//ul[@role='listbox']/li[@role='option' and contains(., '{text}')]",
+            )
         )
-        exit(1)
+    )
+    option.click()
 
-    if os.environ.get("MUSICBRAINZ_PASSWORD") is None:
-        logger.error(
-            'Missing MusicBrainz password. Please supply it through the "MUSICBRAINZ_PASSWORD" environment variable.'
+
+# Add a relationship in the relationship editor of a MusicBrainz entity.
+#
+# The relationship is a dictionary with the type of the target entity, the link type, and the MBID of the target.
+# It may also set the credit of the target, the number within a series, attributes to check, and whether the relationship is backward.
+def musicbrainz_add_relationship(driver, relationship: dict):
+    wait = WebDriverWait(driver, timeout=200)
+    add_relationship_button = driver.find_element(
+        by=By.XPATH,
+        value="//button[contains(@class,'add-item') and contains(., 'Add relationship')]",
+    )
+    add_relationship_button.click()
+    dialog = wait.until(
+        EC.visibility_of_element_located((By.CSS_SELECTOR, ".relationship-dialog"))
+    )
+    Select(dialog.find_element(By.CSS_SELECTOR, "select.entity-type")).select_by_value(
+        relationship["target_type"]
+    )
+    musicbrainz_autocomplete(
+        driver,
+        dialog.find_element(By.CSS_SELECTOR, "input.relationship-type"),
+        relationship["link_type"],
+    )
+    target_text_box = dialog.find_element(By.CSS_SELECTOR, "input.relationship-target")
+    target_text_box.send_keys(relationship["target"])
+    # MusicBrainz looks up an MBID directly and marks the field once the entity is found.
+    wait.until(lambda _: "lookup-performed" in target_text_box.get_attribute("class"))
+    if "credited_as" in relationship and relationship["credited_as"]:
+        dialog.find_element(By.CSS_SELECTOR, "input.entity-credit").send_keys(
+            relationship["credited_as"]
         )
-        exit(1)
+    if "backward" in relationship and relationship["backward"]:
+        dialog.find_element(By.CSS_SELECTOR, "button.change-direction").click()
+    for attribute in relationship.get("attributes", []):
+        dialog.find_element(
+            By.XPATH, f".//label[contains(., '{attribute}')]/input[@type='checkbox']"
+        ).click()
+    if "number" in relationship and relationship["number"]:
+        dialog.find_element(By.CSS_SELECTOR, "input.attribute-text-value").send_keys(
+            relationship["number"]
+        )
+    dialog.find_element(
+        By.XPATH, ".//button[contains(@class,'positive') and text()='Done']"
+    ).click()
+    wait.until(EC.invisibility_of_element(dialog))
 
-    if args.range_start and not args.range_end:
-        logger.error(
-            'Given option "--range-start" but missing option "--range-end". Pleas supply the "--range-end" option.'
+
+# Add an external link in the external links editor of a MusicBrainz entity.
+def musicbrainz_add_external_link(driver, url: str):
+    wait = WebDriverWait(driver, timeout=200)
+    link_text_boxes = driver.find_elements(
+        by=By.CSS_SELECTOR, value="#external-links-editor input.value"
+    )
+    link_text_boxes[-1].send_keys(url)
+    # A new empty row appears once the link has been accepted.
+    wait.until(
+        lambda x: (
+            len(
+                x.find_elements(
+                    by=By.CSS_SELECTOR, value="#external-links-editor input.value"
+                )
+            )
+            > len(link_text_boxes)
         )
-        exit(1)
+    )
+
+
+# Open the alias editor of a work in the current tab and fill it in without submitting it.
+def musicbrainz_fill_alias(driver, work_url: str, alias: dict, username=None):
+    wait = WebDriverWait(driver, timeout=200)
+    musicbrainz_load_page(driver, f"{work_url}/add-alias", username)
+    name_text_box = wait.until(
+        EC.visibility_of_element_located((By.ID, "id-edit-alias.name"))
+    )
+    name_text_box.send_keys(alias["text"])
+    sort_name_text_box = driver.find_element(By.ID, "id-edit-alias.sort_name")
+    if alias["sort"] == "COPY":
+        driver.find_element(By.CSS_SELECTOR, "button.sortname-copy").click()
+        wait.until(lambda _: sort_name_text_box.get_attribute("value") == alias["text"])
+    elif alias["sort"] == "GUESS":
+        driver.find_element(By.CSS_SELECTOR, "button.guesscase-sortname").click()
+        wait.until(lambda _: sort_name_text_box.get_attribute("value"))
+    else:
+        sort_name_text_box.send_keys(alias["sort"])
+    Select(driver.find_element(By.ID, "id-edit-alias.locale")).select_by_visible_text(
+        alias["language"]
+    )
+    if alias["primary"]:
+        driver.find_element(By.ID, "id-edit-alias.primary_for_locale").click()
+    Select(driver.find_element(By.ID, "id-edit-alias.type_id")).select_by_visible_text(
+        "Work name"
+    )
+
+
+# Submit a filled alias editor in the current tab without waiting for the response.
+def musicbrainz_submit_alias(driver, work_url: str):
+    submit_button = driver.find_element(
+        by=By.CSS_SELECTOR, value="button.submit.positive"
+    )
+    RATE_LIMITER.throttle(work_url)
+    submit_button.click()
 
-    data = {}
+
+# Wait for the response to a submitted alias in the current tab.
+#
+# MusicBrainz redirects to the aliases of the work once the alias is added and shows the form again with errors otherwise.
+def musicbrainz_alias_added(driver, work_url: str, timeout: float = 200) -> bool:
+    wait = WebDriverWait(driver, timeout=timeout)
     try:
-        with open(args.filename) as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        logger.error(f"Failed to open the file {args.filename}")
-        exit(1)
+        wait.until(
+            lambda x: (
+                x.current_url == f"{work_url}/aliases"
+                or x.find_elements(By.CSS_SELECTOR, "form .errors")
+            )
+        )
+    except selenium_exceptions.TimeoutException:
+        return False
+    return driver.current_url == f"{work_url}/aliases"
+
+
+# This is done after the work is created
+def musicbrainz_add_alias(driver, work_url: str, alias: dict, username=None):
+    musicbrainz_fill_alias(driver, work_url, alias, username)
+    musicbrainz_submit_alias(driver, work_url)
+    if not musicbrainz_alias_added(driver, work_url):
+        raise RuntimeError(f"Failed to add the alias {alias['text']} to {work_url}")
+
+
+# Whether the aliases of a work list an alias with the name and locale of the given alias.
+def musicbrainz_has_alias(driver, work_url: str, alias: dict, username=None) -> bool:
+    musicbrainz_load_page(driver, f"{work_url}/aliases", username)
+    return bool(
+        driver.find_elements(
+            By.XPATH,
+            f"//table[contains(@class,'tbl')]//tr[td[normalize-space()={xpath_string(alias['text'])}] and td[contains(normalize-space(),{xpath_string(alias['language'])})]]",
+        )
+    )
 
-    range_start = args.range_start
-    if not args.range_start and args.range_end:
-        range_start = 1
 
-    range_ = []
-    if args.range_start and args.range_end:
-        # Convert the indices to a string.
-        range_ = [str(i) for i in range(range_start, args.range_end + 1)]
-    elif "range" in data and data["range"]:
-        range_ = [str(i) for i in data["range"]]
+# Add all of the aliases of a work.
+#
+# Each alias editor is opened and filled in its own tab of the same session, one after another.
+# The tabs are then submitted one after another, each within the rate limit of musicbrainz.org like any other request, so at most one alias is submitted per second.
+# The responses aren't waited for between the submissions, but every tab is checked for its response once all of them are submitted.
+# An alias which failed is retried one at a time in the original tab, unless the aliases of the work show that it was added after all, such as when its response timed out.
+def musicbrainz_add_aliases(
+    driver, work_url: str, aliases: list, username=None, retries: int = 2
+):
+    original_tab = driver.current_window_handle
+    tabs = []
+    try:
+        for alias in aliases:
+            driver.switch_to.new_window("tab")
+            tabs.append(driver.current_window_handle)
+            musicbrainz_fill_alias(driver, work_url, alias, username)
+        for tab in tabs:
+            driver.switch_to.window(tab)
+            musicbrainz_submit_alias(driver, work_url)
+        failed = []
+        for tab, alias in zip(tabs, aliases):
+            driver.switch_to.window(tab)
+            if not musicbrainz_alias_added(driver, work_url):
+                failed.append(alias)
+    finally:
+        for tab in tabs:
+            driver.switch_to.window(tab)
+            driver.close()
+        driver.switch_to.window(original_tab)
+
+    for alias in failed:
+        for attempt in range(1, retries + 1):
+            if musicbrainz_has_alias(driver, work_url, alias, username):
+                logger.info(
+                    f"The alias {alias['text']} of {work_url} was added despite the failed response"
+                )
+                break
+            logger.warning(
+                f"Retrying the alias {alias['text']} of {work_url} ({attempt}/{retries})"
+            )
+            try:
+                musicbrainz_add_alias(driver, work_url, alias, username)
+            except (RuntimeError, selenium_exceptions.WebDriverException) as error:
+                if attempt == retries:
+                    raise RuntimeError(
+                        f"Failed to add the alias {alias['text']} to {work_url}"
+                    ) from error
+            else:
+                break
+
+
+# This is done after a work or release group has been created
+def musicbrainz_add_tags(driver, entity_url: str, tags: list, username=None):
+    wait = WebDriverWait(driver, timeout=200)
+    musicbrainz_load_page(driver, f"{entity_url}/tags", username)
+    tags_text_box = wait.until(
+        EC.visibility_of_element_located((By.CSS_SELECTOR, "#tag-form textarea"))
+    )
+    tags_text_box.send_keys(", ".join(tags))
+    submit_button = driver.find_element(
+        by=By.CSS_SELECTOR, value="#tag-form button[type='submit']"
+    )
+    RATE_LIMITER.throttle(entity_url)
+    submit_button.click()
+    for tag in tags:
+        wait.until(
+            EC.visibility_of_element_located(
+                (By.XPATH, f"//a[contains(@href,'/tag/') and text()='{tag}']")
+            )
+        )
+
+
+# Create a work in MusicBrainz from a work planned by plan_musicbrainz_work.
+#
+# Returns the URL of the new work.
+def musicbrainz_create_work(driver, work: dict, username=None) -> str:
+    wait = WebDriverWait(driver, timeout=200)
+    timer = METRICS.timer()
+    musicbrainz_load_page(driver, f"{MUSICBRAINZ_SERVER}/work/create", username)
+    name_text_box = wait.until(
+        EC.visibility_of_element_located((By.ID, "id-edit-work.name"))
+    )
+    timer.lap("page_load")
+    name_text_box.send_keys(work["name"])
+    if "disambiguation" in work and work["disambiguation"]:
+        driver.find_element(By.ID, "id-edit-work.comment").send_keys(
+            work["disambiguation"]
+        )
+    if "type" in work and work["type"]:
+        Select(
+            driver.find_element(By.ID, "id-edit-work.type_id")
+        ).select_by_visible_text(work["type"])
+    Select(
+        driver.find_element(By.ID, "id-edit-work.languages.0")
+    ).select_by_visible_text(work["language"])
+    timer.lap("title")
+
+    for relationship in work["relationships"]:
+        musicbrainz_add_relationship(driver, relationship)
+    timer.lap("relationships")
+
+    for link in work["links"]:
+        musicbrainz_add_external_link(driver, link)
+
+    if "edit_note" in work and work["edit_note"]:
+        driver.find_element(By.ID, "id-edit-work.edit_note").send_keys(
+            work["edit_note"]
+        )
+
+    submit_button = driver.find_element(
+        by=By.CSS_SELECTOR, value="button.submit.positive"
+    )
+    RATE_LIMITER.throttle(MUSICBRAINZ_SERVER)
+    submit_button.click()
+    wait.until(EC.url_matches(r"/work/[0-9a-f-]{36}$"))
+    work_url = driver.current_url
+    timer.lap("submit")
+
+    # After the work is created, add the aliases and tags
+    if work["aliases"]:
+        musicbrainz_add_aliases(driver, work_url, work["aliases"], username)
+        timer.lap("aliases")
+    if work["tags"]:
+        musicbrainz_add_tags(driver, work_url, work["tags"], username)
+        timer.lap("tags")
+    return work_url
+
+
+# The IDs of the release group types which MusicBrainz accepts when seeding the release group editor.
+MUSICBRAINZ_RELEASE_GROUP_PRIMARY_TYPES = {
+    "Album": 1,
+    "Single": 2,
+    "EP": 3,
+    "Other": 11,
+    "Broadcast": 12,
+}
+MUSICBRAINZ_RELEASE_GROUP_SECONDARY_TYPES = {
+    "Compilation": 1,
+    "Soundtrack": 2,
+    "Spokenword": 3,
+    "Interview": 4,
+    "Audiobook": 5,
+    "Live": 6,
+    "Remix": 7,
+    "DJ-mix": 8,
+    "Mixtape/Street": 9,
+    "Demo": 10,
+    "Audio drama": 11,
+    "Field recording": 12,
+}
+# The "part of" relationship from a release group to a series and its "number" attribute.
+MUSICBRAINZ_RELEASE_GROUP_SERIES_LINK_TYPE = "01018437-91d8-36b9-bf89-3f885d53b5bd"
+MUSICBRAINZ_SERIES_NUMBER_ATTRIBUTE_TYPE = "a59c5830-5ec7-38fe-9a21-c7ea54f6650a"
+
+
+# Plan a MusicBrainz release group for an index from the musicbrainz_release_group object of the translated part of a series.
+#
+# The name defaults to the name of the translated work.
+# The links are a table from each index to its external links.
+def plan_musicbrainz_release_group(data: dict, i: str) -> dict:
+    release_group = copy.deepcopy(data["translation"]["musicbrainz_release_group"])
+    if "name" in release_group and release_group["name"]:
+        name = release_group["name"].replace("|index|", i)
+    else:
+        name = bookbrainz_title_name(
+            i,
+            series_titles(data["original"], i)[1],
+            data["index_number_format_map"],
+        )
+    secondary_types = release_group.get("secondary_types", [])
+    if "secondary_type" in release_group and release_group["secondary_type"]:
+        secondary_types = [*secondary_types, release_group["secondary_type"]]
+    return {
+        "name": name,
+        "disambiguation": release_group.get("disambiguation"),
+        "primary_type": release_group.get("primary_type"),
+        "secondary_types": secondary_types,
+        "credits": [
+            credit for credit in release_group.get("credits", []) if credit.get("id")
+        ],
+        "series": [
+            {
+                "id": series["id"],
+                "number": series_number(series, i),
+            }
+            for series in release_group.get("series", [])
+            if series and series.get("id")
+        ],
+        "links": [
+            link
+            for link in release_group.get("links", {}).get(i, [])
+            if "url" in link and link["url"]
+        ],
+        "tags": release_group.get("tags", []),
+        "edit_note": release_group.get("edit_note"),
+    }
+
+
+# The form fields which seed the MusicBrainz release group editor with a planned release group.
+def musicbrainz_release_group_seed(release_group: dict) -> dict:
+    seed = {"edit-release-group.name": release_group["name"]}
+    if release_group["disambiguation"]:
+        seed["edit-release-group.comment"] = release_group["disambiguation"]
+    if release_group["primary_type"]:
+        seed["edit-release-group.primary_type_id"] = (
+            MUSICBRAINZ_RELEASE_GROUP_PRIMARY_TYPES[release_group["primary_type"]]
+        )
+    if release_group["secondary_types"]:
+        seed["edit-release-group.secondary_type_ids"] = [
+            MUSICBRAINZ_RELEASE_GROUP_SECONDARY_TYPES[secondary_type]
+            for secondary_type in release_group["secondary_types"]
+        ]
+    for index, credit in enumerate(release_group["credits"]):
+        prefix = f"edit-release-group.artist_credit.names.{index}"
+        seed[f"{prefix}.mbid"] = credit["id"]
+        if "credited_as" in credit and credit["credited_as"]:
+            seed[f"{prefix}.name"] = credit["credited_as"]
+        if "join_phrase" in credit and credit["join_phrase"]:
+            seed[f"{prefix}.join_phrase"] = credit["join_phrase"]
+    for index, series in enumerate(release_group["series"]):
+        prefix = f"rels.{index}"
+        seed[f"{prefix}.target"] = series["id"]
+        seed[f"{prefix}.type"] = MUSICBRAINZ_RELEASE_GROUP_SERIES_LINK_TYPE
+        seed[f"{prefix}.attributes.0.type"] = MUSICBRAINZ_SERIES_NUMBER_ATTRIBUTE_TYPE
+        seed[f"{prefix}.attributes.0.text_value"] = series["number"]
+    for index, link in enumerate(release_group["links"]):
+        seed[f"urls.{index}.url"] = link["url"]
+    if release_group["edit_note"]:
+        seed["edit-release-group.edit_note"] = release_group["edit_note"]
+    return seed
+
+
+# Create a release group in MusicBrainz by seeding the release group editor, so that creating it only takes one page load.
+#
+# The seeded form is checked and submitted.
+# Only the types of the external links, which can't be seeded by name, are chosen in the editor.
+# Returns the URL of the new release group.
+def musicbrainz_create_release_group(driver, release_group: dict, username=None) -> str:
+    wait = WebDriverWait(driver, timeout=200)
+    timer = METRICS.timer()
+    query = urllib.parse.urlencode(
+        musicbrainz_release_group_seed(release_group), doseq=True
+    )
+    musicbrainz_load_page(
+        driver, f"{MUSICBRAINZ_SERVER}/release-group/create?{query}", username
+    )
+    name_text_box = wait.until(
+        EC.visibility_of_element_located((By.ID, "id-edit-release-group.name"))
+    )
+    wait.until(lambda _: name_text_box.get_attribute("value") == release_group["name"])
+    timer.lap("page_load")
+    for link in release_group["links"]:
+        link_row = wait.until(
+            EC.visibility_of_element_located(
+                (
+                    By.XPATH,
+                    f"//table[@id='external-links-editor']//tr[.//input[@value='{link['url']}'] or .//a[@href='{link['url']}']]",
+                )
+            )
+        )
+        if "type" in link and link["type"]:
+            Select(link_row.find_element(By.TAG_NAME, "select")).select_by_visible_text(
+                link["type"]
+            )
+
+    submit_button = driver.find_element(
+        by=By.CSS_SELECTOR, value="button.submit.positive"
+    )
+    RATE_LIMITER.throttle(MUSICBRAINZ_SERVER)
+    submit_button.click()
+    wait.until(EC.url_matches(r"/release-group/[0-9a-f-]{36}$"))
+    release_group_url = driver.current_url
+    timer.lap("submit")
+    if release_group["tags"]:
+        musicbrainz_add_tags(driver, release_group_url, release_group["tags"], username)
+        timer.lap("tags")
+    return release_group_url
+
+
+# Create the MusicBrainz release group for an index unless it's already in the ledger.
+#
+# Returns a tuple with the URL of the release group.
+def add_musicbrainz_release_group(
+    driver, data: dict, i: str, username=None, ledger=None
+):
+    key = ledger_key(data, "translation", i, "musicbrainz_release_group")
+    if ledger is not None and key is not None and key in ledger:
+        return (ledger.get(key),)
+    METRICS.set_part("translation")
+    release_group_url = musicbrainz_create_release_group(
+        driver, plan_musicbrainz_release_group(data, i), username=username
+    )
+    if ledger is not None and key is not None:
+        ledger.record(key, release_group_url)
+    return (release_group_url,)
+
+
+# The subtitles of the original or translated part of a series stored in SQLite instead of the series file.
+#
+# The subtitles of an index are only read when they're looked up, so neither the memory used nor the time to load a series grows with the number of chapters.
+# A series file refers to the store by its path relative to the series file in place of the subtitles object.
+#
+#   "subtitles": "kaguya-sama_love_is_war_manga.subtitles.sqlite"
+#
+# The store can hold the subtitles of both parts of a series.
+class SubtitleStore(collections.abc.MutableMapping):
+    def __init__(self, path: str, part: str):
+        self.path = path
+        self.part = part
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS subtitles (
+                    part TEXT NOT NULL,
+                    idx TEXT NOT NULL,
+                    subtitles TEXT NOT NULL,
+                    PRIMARY KEY (part, idx)
+                ) WITHOUT ROWID
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS subtitles_by_number ON subtitles (part, CAST(idx AS REAL), idx)"
+            )
+
+    def __getitem__(self, i: str):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT subtitles FROM subtitles WHERE part = ? AND idx = ?",
+                (self.part, i),
+            ).fetchone()
+        if row is None:
+            raise KeyError(i)
+        return json.loads(row[0])
+
+    def __setitem__(self, i: str, subtitles: dict):
+        self.update({i: subtitles})
+
+    def __delitem__(self, i: str):
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM subtitles WHERE part = ? AND idx = ?", (self.part, i)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(i)
+
+    def __contains__(self, i) -> bool:
+        with self._lock:
+            return (
+                self._connection.execute(
+                    "SELECT 1 FROM subtitles WHERE part = ? AND idx = ?",
+                    (self.part, i),
+                ).fetchone()
+                is not None
+            )
+
+    # The rows of the store in numerical order of their indices.
+    #
+    # The rows are read in batches so that iterating over a large store doesn't load it whole.
+    def _rows(self, columns: str):
+        last = None
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    f"SELECT CAST(idx AS REAL), {columns} FROM subtitles WHERE part = ? AND (? OR (CAST(idx AS REAL), idx) > (?, ?)) ORDER BY CAST(idx AS REAL), idx LIMIT 1000",
+                    (self.part, last is None, *(last or (None, None))),
+                ).fetchall()
+            if not rows:
+                return
+            yield from rows
+            last = rows[-1][:2]
+
+    def __iter__(self):
+        for _number, i in self._rows("idx"):
+            yield i
+
+    def items(self):
+        for _number, i, subtitles in self._rows("idx, subtitles"):
+            yield i, json.loads(subtitles)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM subtitles WHERE part = ?", (self.part,)
+            ).fetchone()[0]
+
+    # Store the subtitles of many indices in a single transaction.
+    def update(self, subtitles=(), **kwargs):
+        rows = [
+            (self.part, str(i), json.dumps(value, ensure_ascii=False))
+            for i, value in dict(subtitles, **kwargs).items()
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO subtitles (part, idx, subtitles) VALUES (?, ?, ?)",
+                rows,
+            )
+
+    # The subtitles which don't refer to one of the titles or which aren't objects, found with a single query, as given by invalid_subtitles.
+    def invalid_subtitles(self, titles: int) -> list:
+        with self._lock:
+            rows = self._connection.execute(
+                """
+                SELECT s.idx, title.key,
+                    title.key = '' OR title.key GLOB '*[^0-9]*' OR CAST(title.key AS INTEGER) >= ?
+                FROM subtitles AS s, json_each(s.subtitles) AS title
+                WHERE s.part = ? AND json_type(s.subtitles) = 'object'
+                    AND (
+                        title.key = '' OR title.key GLOB '*[^0-9]*' OR CAST(title.key AS INTEGER) >= ?
+                        OR title.type != 'object'
+                    )
+                ORDER BY CAST(s.idx AS REAL), s.idx
+                """,
+                (titles, self.part, titles),
+            ).fetchall()
+        return [
+            (i, title_index, "title" if unknown_title else "object")
+            for i, title_index, unknown_title in rows
+        ]
 
-    if "bookbrainz_work" in data["original"]:
-        if "bookbrainz_work" in data["translation"]:
+    # Works are planned from deep copies of their series, which share the store instead of copying it.
+    def __deepcopy__(self, memo):
+        return self
+
+
+# The subtitles of a series file which don't refer to one of its titles or which aren't objects.
+#
+# Each problem is the index, the number of the title, and either "title" or "object".
+def invalid_subtitles(subtitles: dict, titles: int) -> list:
+    invalid = []
+    for i, title_subtitles in subtitles.items():
+        for title_index, subtitle in (title_subtitles or {}).items():
+            if not title_index.isdigit() or int(title_index) >= titles:
+                invalid.append((i, title_index, "title"))
+            elif not isinstance(subtitle, dict):
+                invalid.append((i, title_index, "object"))
+    return invalid
+
+
+# Load a series file.
+#
+# Subtitles given as the path of a subtitle store are read from the store when they're looked up.
+def load_series(filename: str) -> dict:
+    with open(filename) as f:
+        data = json.load(f)
+    for part in ["original", "translation"]:
+        subtitles = data.get(part, {}).get("subtitles")
+        if isinstance(subtitles, str):
+            data[part]["subtitles"] = SubtitleStore(
+                os.path.join(os.path.dirname(filename), subtitles), part
+            )
+    return data
+
+
+# Move the subtitles of a series file into a subtitle store, replacing them in the series file with the path of the store.
+#
+# Returns the number of indices moved for each part.
+def import_subtitles(filename: str, store_path=None) -> dict:
+    with open(filename) as f:
+        data = json.load(f)
+    if store_path is None:
+        store_path = f"{os.path.splitext(filename)[0]}.subtitles.sqlite"
+    relative_path = os.path.relpath(store_path, os.path.dirname(filename) or ".")
+    imported = {}
+    for part in ["original", "translation"]:
+        subtitles = data.get(part, {}).get("subtitles")
+        if not isinstance(subtitles, dict):
+            continue
+        SubtitleStore(store_path, part).update(subtitles)
+        data[part]["subtitles"] = relative_path
+        imported[part] = len(subtitles)
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return imported
+
+
+# A series file with the subtitles of its subtitle stores written inline.
+def export_subtitles(filename: str) -> dict:
+    data = load_series(filename)
+    for part in ["original", "translation"]:
+        subtitles = data.get(part, {}).get("subtitles")
+        if isinstance(subtitles, SubtitleStore):
+            data[part]["subtitles"] = dict(subtitles.items())
+    return data
+
+
+# Fill in details of the translated work which are inherited from the original work.
+def prepare_series(data: dict) -> dict:
+    # Series files without format maps use the default formats.
+    if "index_number_format_map" not in data:
+        data["index_number_format_map"] = copy.deepcopy(DEFAULT_INDEX_NUMBER_FORMAT_MAP)
+    if "sort_index_number_format_map" not in data:
+        data["sort_index_number_format_map"] = copy.deepcopy(
+            DEFAULT_SORT_INDEX_NUMBER_FORMAT_MAP
+        )
+    # Titles without a script use the first script of their language in the format map, which is how older series files were formatted.
+    for part in ["original", "translation"]:
+        for title in data.get(part, {}).get("titles") or []:
+            scripts = data["index_number_format_map"].get(title.get("language"))
+            if "script" not in title and scripts:
+                title["script"] = next(iter(scripts))
+    if "bookbrainz_work" in data.get("original", {}):
+        data["original"]["bookbrainz_work"].setdefault("relationships", [])
+        if "bookbrainz_work" in data.get("translation", {}):
+            data["translation"]["bookbrainz_work"].setdefault("relationships", [])
+            data["translation"]["bookbrainz_work"].setdefault("editions", {})
             if (
                 "type" not in data["translation"]["bookbrainz_work"]
-                or not data["bookbrainz_work"]["translation"]["type"]
+                or not data["translation"]["bookbrainz_work"]["type"]
             ):
                 data["translation"]["bookbrainz_work"]["type"] = data["original"][
                     "bookbrainz_work"
-                ]["type"]
+                ].get("type")
             for relationship in data["original"]["bookbrainz_work"]["relationships"]:
                 if relationship["id"]:
                     if relationship["role"] in ["writer", "provided story for"]:
@@ -1427,291 +2689,2796 @@ def main():
     #                     0
     #                 ].copy()
     # TRANSLATED_MUSICBRAINZ_WORK["aliases"] = aliases
+    return data
 
-    geckodriver = shutil.which("geckodriver")
-    if geckodriver is None:
-        logger.error("geckodriver not found in PATH!")
-        exit(1)
-    geckodriver = str(geckodriver)
-    service = webdriver.FirefoxService(executable_path=geckodriver)
-    options = FirefoxOptions()
-    if not args.no_headless:
-        options.add_argument("--headless")
-    # Avoid using too much RAM over time.
-    # 512,000 KiB is 500 MiB
-    # 1,048,576 KiB is 1 GiB
-    options.set_preference("browser.cache.memory.capacity", 1_048_576)
-
-    driver = webdriver.Firefox(options=options, service=service)
-
-    wait = WebDriverWait(driver, timeout=200)
 
-    try:
-        with open(COOKIES_CACHE_FILE) as f:
-            cookies = json.load(f)
-            bookbrainz_cookie = next(
-                (
-                    cookie
-                    for cookie in cookies
-                    if cookie["domain"] == "bookbrainz.org"
-                    and cookie["name"] == "connect.sid"
-                ),
-                None,
+# Check the structure of a series before any browser is started.
+#
+# Every index of the range, the format maps, the titles and subtitles, the relationship roles, and the edition indices are checked in one pass.
+# Returns a description of each problem, so that a broken series file fails before a single work is created.
+def validate_series(data: dict, range_: list) -> list:
+    problems = [
+        f'The "{part}" object is missing'
+        for part in ["original", "translation"]
+        if not isinstance(data.get(part), dict)
+    ]
+    if problems:
+        return problems
+    for key in ["index_number_format_map", "sort_index_number_format_map"]:
+        for language, scripts in data[key].items():
+            for script, format in scripts.items():
+                if format not in INDEX_NUMBER_FORMATS:
+                    problems.append(
+                        f'{key}: The format "{format}" of {language} in the {script} script isn\'t one of {", ".join(INDEX_NUMBER_FORMATS)}'
+                    )
+    for part in ["original", "translation"]:
+        problems.extend(validate_series_part(data, part))
+    seen = set()
+    for i in range_:
+        if i in seen:
+            problems.append(f"The index {i} appears more than once in the range")
+        seen.add(i)
+        problems.extend(validate_series_index(data, i))
+    return problems
+
+
+# Check the original or translated part of a series.
+def validate_series_part(data: dict, part: str) -> list:
+    problems = []
+    source = data[part]
+    if "language" not in source:
+        problems.append(f'{part}: The "language" field is missing')
+    if "bookbrainz_work" in source and "disambiguation" not in source:
+        problems.append(f'{part}: The "disambiguation" field is missing')
+
+    titles = source.get("titles") or []
+    for title_index, title in enumerate(titles):
+        missing = [key for key in ["text", "language", "script"] if key not in title]
+        if missing:
+            problems.append(
+                f"{part}: Title {title_index} is missing {', '.join(missing)}"
             )
-            if bookbrainz_cookie is not None:
-                driver.get("https://bookbrainz.org")
-                wait.until(
-                    EC.visibility_of_element_located((By.CSS_SELECTOR, ".logo img"))
+            continue
+        for key in ["index_number_format_map", "sort_index_number_format_map"]:
+            if title["script"] not in data[key].get(title["language"], {}):
+                problems.append(
+                    f"{part}: Title {title_index} is in {title['language']} in the {title['script']} script, which is missing from {key}"
                 )
-                driver.add_cookie(bookbrainz_cookie)
-    except FileNotFoundError:
-        pass
-
-    # Add a bunch of MusicBrainz works
-    # if command == "add_musicbrainz_work_series":
-    #     for i in RANGE:
-    #         print(f"{i}")
-
-    #         original_work = ORIGINAL_MUSICBRAINZ_WORK.copy()
-
-    #         original_identifiers = []
-    #         if i in IDENTIFIERS:
-    #             original_identifiers = IDENTIFIERS[i].copy()
-    #         if i in ORIGINAL_MUSICBRAINZ_WORK_IDENTIFIERS:
-    #             original_identifiers.append(ORIGINAL_MUSICBRAINZ_WORK_IDENTIFIERS[i])
-    #         if i in ORIGINAL_BOOKBRAINZ_WORK_IDENTIFIERS:
-    #             original_identifiers.append(ORIGINAL_BOOKBRAINZ_WORK_IDENTIFIERS[i])
-
-    #         original_work["identifiers"] = original_identifiers
-
-    #         subtitle = ""
-    #         if i in SUBTITLES and SUBTITLES[i] and 0 in SUBTITLES[i] and SUBTITLES[i][0] and "title" in SUBTITLES[i][0] and SUBTITLES[i][0]["title"]:
-    #             subtitle = SUBTITLES[i][0]["title"]
-    #         sort_subtitle = ""
-    #         if i in SUBTITLES and SUBTITLES[i] and 0 in SUBTITLES[i] and SUBTITLES[i][0] and "sort" in SUBTITLES[i][0] and SUBTITLES[i][0]["sort"]:
-    #             sort_subtitle = SUBTITLES[i][0]["sort"]
-
-    #         original_work["title"]["subtitle"] = subtitle
-    #         original_work["title"]["sort_subtitle"] = sort_subtitle
-
-    #         aliases = []
-    #         for alias_index, alias in enumerate(original_work["aliases"].copy(), start=1):
-    #             alias["subtitle"] = ""
-    #             alias["sort_subtitle"] = ""
-    #             if i in SUBTITLES and SUBTITLES[i] and alias_index in SUBTITLES[i] and SUBTITLES[i][alias_index]:
-    #                 if "title" in SUBTITLES[i][alias_index] and SUBTITLES[i][alias_index]["title"]:
-    #                     alias["subtitle"] = SUBTITLES[i][alias_index]["title"]
-    #                 if "sort" in SUBTITLES[i][alias_index] and SUBTITLES[i][alias_index]["sort"]:
-    #                     alias["sort_subtitle"] = SUBTITLES[i][alias_index]["sort"]
-    #             aliases.append(alias)
-    #         original_work["aliases"] = aliases
-
-    #         musicbrainz_create_work(macropad, original_work, i)
-
-    #         original_work_url = driver.current_url
-
-    #         # Now create the translated work
-    #         translated_work = TRANSLATED_MUSICBRAINZ_WORK.copy()
-    #         translated_work["title"] = TRANSLATED_MUSICBRAINZ_WORK["title"].copy()
-    #         translated_work["aliases"] = TRANSLATED_MUSICBRAINZ_WORK["aliases"].copy()
-
-    #         translated_identifiers = []
-    #         if i in IDENTIFIERS:
-    #             translated_identifiers = IDENTIFIERS[i].copy()
-    #         if i in TRANSLATED_MUSICBRAINZ_WORK_IDENTIFIERS:
-    #             translated_identifiers.append(TRANSLATED_MUSICBRAINZ_WORK_IDENTIFIERS[i])
-    #         if i in TRANSLATED_BOOKBRAINZ_WORK_IDENTIFIERS:
-    #             translated_identifiers.append(TRANSLATED_BOOKBRAINZ_WORK_IDENTIFIERS[i])
-
-    #         translated_work["identifiers"] = translated_identifiers
-    #         translated_work["translation_of"] = "PASTE_FROM_CLIPBOARD"
-
-    #         subtitle = ""
-    #         if i in SUBTITLES and SUBTITLES[i] and 1 in SUBTITLES[i] and SUBTITLES[i][1] and "title" in SUBTITLES[i][1] and SUBTITLES[i][1]["title"]:
-    #             subtitle = SUBTITLES[i][1]["title"]
-    #         sort_subtitle = ""
-    #         if i in SUBTITLES and SUBTITLES[i] and 1 in SUBTITLES[i] and SUBTITLES[i][1] and "sort" in SUBTITLES[i][1] and SUBTITLES[i][1]["sort"]:
-    #             sort_subtitle = SUBTITLES[i][1]["sort"]
-
-    #         translated_work["title"]["subtitle"] = subtitle
-    #         translated_work["title"]["sort_subtitle"] = sort_subtitle
-
-    #         aliases = []
-    #         for alias_index, alias in enumerate(translated_work["aliases"].copy()):
-    #             alias["subtitle"] = ""
-    #             alias["sort_subtitle"] = ""
-    #             if i in SUBTITLES and TRANSLATED_SUBTITLES[i] and alias_index in TRANSLATED_SUBTITLES[i] and TRANSLATED_SUBTITLES[i][alias_index]:
-    #                 if "title" in TRANSLATED_SUBTITLES[i][alias_index] and TRANSLATED_SUBTITLES[i][alias_index]["title"]:
-    #                     alias["subtitle"] = TRANSLATED_SUBTITLES[i][alias_index]["title"]
-    #                 if "sort" in TRANSLATED_SUBTITLES[i][alias_index] and TRANSLATED_SUBTITLES[i][alias_index]["sort"]:
-    #                     alias["sort_subtitle"] = TRANSLATED_SUBTITLES[i][alias_index]["sort"]
-    #             aliases.append(alias)
-    #         translated_work["aliases"] = aliases
-
-    #         musicbrainz_create_work(macropad, translated_work, i)
-
-    #         # Restore the clipboard contents before continuing
-    #         clipboard_select(macropad, 1)
-    #     print("Complete")
-    # # Create multiple Release Groups as part of a Release Group series in MusicBrainz
-    # if command == "add_musicbrainz_release_group_series":
-    #     for i in RANGE:
-    #         print(f"{i}")
-    #         release_group = MUSICBRAINZ_RELEASE_GROUP
-    #         if i in MUSICBRAINZ_RELEASE_GROUP_LINKS:
-    #             release_group["links"] = MUSICBRAINZ_RELEASE_GROUP_LINKS[i]
-    #         musicbrainz_create_release_group(macropad, MUSICBRAINZ_RELEASE_GROUP, index=i)
-    #     print("Complete")
-    # Create a series of BookBrainz works with their translated works
-    if args.command == "add_bookbrainz_work_series":
-        for i in range_:
-            # Create the original work first.
-            print(f"{i}")
-
-            original = copy.deepcopy(data["original"])
-            original_work = original["bookbrainz_work"]
-
-            original_work["language"] = original["language"]
-            original_work["disambiguation"] = original["disambiguation"]
+    translated = any(
+        entity in data["translation"]
+        for entity in ["bookbrainz_work", "musicbrainz_work"]
+    )
+    if part == "original" and translated and len(titles) < 2:
+        problems.append(
+            "original: The second title is required, since it's the first title of the translated work"
+        )
 
-            if "identifiers" not in original_work:
-                original_work["identifiers"] = []
-            if "identifiers" in original and i in original["identifiers"]:
-                original_work["identifiers"].append(
-                    copy.deepcopy(original["identifiers"][i])
-                )
-            if "identifiers" in data and i in data["identifiers"]:
-                original_work["identifiers"].append(
-                    copy.deepcopy(data["identifiers"][i])
-                )
+    subtitles = source.get("subtitles")
+    if subtitles is None:
+        subtitles = {}
+    # Stores are checked in SQLite so that their subtitles aren't all loaded at startup.
+    invalid = (
+        subtitles.invalid_subtitles(len(titles))
+        if isinstance(subtitles, SubtitleStore)
+        else invalid_subtitles(subtitles, len(titles))
+    )
+    for i, title_index, problem in invalid:
+        if problem == "title":
+            problems.append(
+                f"{part}: The subtitle {title_index} of {i} doesn't refer to one of the {len(titles)} titles"
+            )
+        else:
+            problems.append(
+                f"{part}: The subtitle {title_index} of {i} isn't an object with a title and a sort"
+            )
 
-            titles = []
-            for title_index, title in enumerate(original["titles"]):
-                title_index = str(title_index)
-                title["subtitle"] = ""
-                title["sort_subtitle"] = ""
-                if (
-                    i in original["subtitles"]
-                    and original["subtitles"][i]
-                    and title_index in original["subtitles"][i]
-                    and original["subtitles"][i][title_index]
-                ):
-                    if (
-                        "title" in original["subtitles"][i][title_index]
-                        and original["subtitles"][i][title_index]["title"]
-                    ):
-                        title["subtitle"] = original["subtitles"][i][title_index][
-                            "title"
-                        ]
-                    if (
-                        "sort" in original["subtitles"][i][title_index]
-                        and original["subtitles"][i][title_index]["sort"]
-                    ):
-                        title["sort_subtitle"] = original["subtitles"][i][title_index][
-                            "sort"
-                        ]
-                titles.append(title)
-            original_work["titles"] = titles
-
-            bookbrainz_create_work(
-                driver,
-                original_work,
-                i,
-                username=username,
-                index_number_format_map=data["index_number_format_map"],
-                sort_index_number_format_map=data["sort_index_number_format_map"],
+    work = source.get("bookbrainz_work") or {}
+    for relationship in work.get("relationships") or []:
+        role = relationship.get("role")
+        if not role or role.lower() not in BOOKBRAINZ_RELATIONSHIP_VERB:
+            problems.append(
+                f'{part}: The relationship role "{role}" isn\'t one of {", ".join(BOOKBRAINZ_RELATIONSHIP_VERB)}'
             )
-            original_work_url = driver.current_url
+    for index, edition in (work.get("editions") or {}).items():
+        if not edition:
+            continue
+        try:
+            float(index)
+        except ValueError:
+            problems.append(
+                f'{part}: The edition {edition} has the index "{index}", which isn\'t a number'
+            )
+    return problems
 
-            # Now create the translated work
 
-            translation = copy.deepcopy(data["translation"])
-            translation_work = translation["bookbrainz_work"]
+# Check a single index of a series, such as one read from a stream.
+def validate_series_index(data: dict, i: str) -> list:
+    try:
+        float(i)
+    except ValueError:
+        return [f"The index {i} isn't a number"]
+    problems = []
+    for part in ["original", "translation"]:
+        titles = series_titles(data[part], i)
+        if not titles or not {"text", "language", "script"} <= titles[0].keys():
+            continue
+        try:
+            name = bookbrainz_title_name(i, titles[0], data["index_number_format_map"])
+        except KeyError:
+            continue
+        if not name.strip():
+            problems.append(f"{part}: The name of {i} is empty")
+    return problems
 
-            translation_work["language"] = translation["language"]
-            translation_work["disambiguation"] = translation["disambiguation"]
 
-            if "identifiers" not in translation_work:
-                translation_work["identifiers"] = []
-            if "identifiers" in translation and i in translation["identifiers"]:
-                translation_work["identifiers"].append(
-                    copy.deepcopy(translation["identifiers"][i])
-                )
-            if "identifiers" in data and i in data["identifiers"]:
-                translation_work["identifiers"].append(
-                    copy.deepcopy(data["identifiers"][i])
-                )
+# Determine the indices to process for a series.
+def series_range(data: dict, range_start=None, range_end=None) -> list:
+    if range_end and not range_start:
+        range_start = 1
+    if range_start and range_end:
+        # Convert the indices to a string.
+        return [str(i) for i in range(range_start, range_end + 1)]
+    if "range" in data and data["range"]:
+        return [str(i) for i in data["range"]]
+    return []
 
-            translated_edition_id = next(
-                (
-                    id
-                    for index, id in reversed(
-                        sorted(
-                            list(translation_work["editions"].items()),
-                            key=lambda pair: float(pair[0]),
-                        )
-                    )
-                    if float(i) >= float(index)
-                ),
-                None,
+
+# Select indices of a series with an expression such as 1-20,28.5,>90,!14.5.
+#
+# Each comma-separated term is a span of indices, a single index, or a comparison with <, <=, >, or >=.
+# Spans and comparisons select from the range of the series, and spans also include the whole numbers between their ends.
+# Terms prefixed with ! are excluded, and when only exclusions are given they're excluded from the whole range.
+# The term "missing" keeps only the indices for which the missing function returns true, such as those without works in the ledger.
+# The indices are returned in numeric order.
+def select_range(range_: list, selector: str, missing=None) -> list:
+    base = {normalize_index(i) for i in range_}
+    included = set()
+    excluded = set()
+    only_missing = False
+    has_inclusions = False
+    for term in selector.split(","):
+        term = term.strip()
+        exclude = term.startswith("!")
+        term = term.removeprefix("!").strip()
+        if not term:
+            raise ValueError(f'The range "{selector}" has an empty term')
+        if term == "missing":
+            if exclude:
+                raise ValueError('The "missing" term can\'t be excluded')
+            if missing is None:
+                raise ValueError('The "missing" term requires the ledger')
+            only_missing = True
+            continue
+        comparison = next(
+            (op for op in ["<=", ">=", "<", ">"] if term.startswith(op)), None
+        )
+        start, separator, end = term.partition("-")
+        try:
+            if comparison is not None:
+                bound = float(term.removeprefix(comparison))
+                compare = {
+                    "<": float.__lt__,
+                    "<=": float.__le__,
+                    ">": float.__gt__,
+                    ">=": float.__ge__,
+                }[comparison]
+                selected = {i for i in base if compare(float(i), bound)}
+            elif separator:
+                low, high = float(start), float(end)
+                selected = {i for i in base if low <= float(i) <= high}
+                selected.update(
+                    str(number)
+                    for number in range(math.ceil(low), math.floor(high) + 1)
+                )
+            else:
+                float(term)
+                selected = {normalize_index(term)}
+        except ValueError:
+            raise ValueError(
+                f'The range "{selector}" has an invalid term "{term}"'
+            ) from None
+        if exclude:
+            excluded |= selected
+        else:
+            included |= selected
+            has_inclusions = True
+    selected = (included if has_inclusions else base) - excluded
+    if only_missing:
+        selected = {i for i in selected if missing(i)}
+    return sorted(selected, key=float)
+
+
+def firefox_options(headless: bool = True):
+    options = FirefoxOptions()
+    if headless:
+        options.add_argument("--headless")
+    # Avoid using too much RAM over time.
+    # 512,000 KiB is 500 MiB
+    # 1,048,576 KiB is 1 GiB
+    options.set_preference("browser.cache.memory.capacity", 1_048_576)
+    return options
+
+
+def chromium_options(headless: bool = True):
+    options = ChromiumOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    # The shared memory of containers is often too small for Chromium.
+    options.add_argument("--disable-dev-shm-usage")
+    # Avoid using too much RAM over time, as for Firefox.
+    options.add_argument("--disk-cache-size=1073741824")
+    # Selenium looks for Google Chrome unless it's told where Chromium is.
+    chromium = shutil.which("chromium") or shutil.which("chromium-browser")
+    if chromium is not None:
+        options.binary_location = chromium
+    return options
+
+
+# The browsers which can drive the editors.
+#
+# Each backend is a tuple of the function creating its options, the name of its WebDriver executable, and the names of its Selenium service and driver classes.
+# The editors are driven through the same helpers with every backend.
+BROWSER_BACKENDS = {
+    "firefox": (firefox_options, "geckodriver", "FirefoxService", "Firefox"),
+    "chromium": (chromium_options, "chromedriver", "ChromeService", "Chrome"),
+}
+
+
+def create_driver(headless: bool = True, remote_url=None, browser: str = "firefox"):
+    create_options, executable, service_class, driver_class = BROWSER_BACKENDS[browser]
+    options = create_options(headless)
+
+    if remote_url is None:
+        executable_path = shutil.which(executable)
+        if executable_path is None:
+            logger.error(f"{executable} not found in PATH!")
+            exit(1)
+        service = getattr(webdriver, service_class)(
+            executable_path=str(executable_path)
+        )
+        driver = getattr(webdriver, driver_class)(options=options, service=service)
+    else:
+        driver = webdriver.Remote(command_executor=remote_url, options=options)
+
+    # Count every command sent to the browser, including those of its elements, for the commands per work in the run history.
+    execute = driver.execute
+
+    def counted_execute(*args, **kwargs):
+        METRICS.count_command()
+        return execute(*args, **kwargs)
+
+    driver.execute = counted_execute
+    return driver
+
+
+# Remote WebDriver endpoints, such as a Selenium Grid or standalone Selenium servers.
+#
+# New sessions go to the healthy endpoint with the fewest sessions.
+# Endpoints are health checked periodically through the WebDriver status endpoint.
+class EndpointPool:
+    def __init__(self, urls: list, health_check_interval: float = 30.0):
+        self.urls = [url.rstrip("/") for url in urls]
+        self.health_check_interval = health_check_interval
+        self._healthy = dict.fromkeys(self.urls, True)
+        self._sessions = dict.fromkeys(self.urls, 0)
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def check(url: str) -> bool:
+        try:
+            with urllib_request.urlopen(f"{url}/status", timeout=10) as response:
+                status = json.load(response)
+        except (OSError, ValueError):
+            return False
+        return bool(status.get("value", {}).get("ready", False))
+
+    def check_all(self):
+        for url in self.urls:
+            healthy = self.check(url)
+            if healthy != self._healthy[url]:
+                logger.warning(
+                    f"The WebDriver endpoint {url} is {'healthy' if healthy else 'unhealthy'}"
+                )
+            self._healthy[url] = healthy
+        self._checked = time.monotonic()
+
+    def is_healthy(self, url: str) -> bool:
+        with self._lock:
+            if time.monotonic() - self._checked > self.health_check_interval:
+                self.check_all()
+            return self._healthy[url]
+
+    # Reserve a session on the healthy endpoint with the fewest sessions.
+    def choose(self) -> str:
+        with self._lock:
+            if time.monotonic() - self._checked > self.health_check_interval:
+                self.check_all()
+            healthy = [url for url in self.urls if self._healthy[url]]
+            if not healthy:
+                self.check_all()
+                healthy = [url for url in self.urls if self._healthy[url]]
+            if not healthy:
+                raise RuntimeError("None of the remote WebDriver endpoints are healthy")
+            url = min(healthy, key=lambda url: self._sessions[url])
+            self._sessions[url] += 1
+            return url
+
+    def release(self, url: str):
+        with self._lock:
+            self._sessions[url] -= 1
+
+
+# Restore the BookBrainz session cookie from the cache, if there is one.
+def load_bookbrainz_cookie(driver):
+    wait = WebDriverWait(driver, timeout=200)
+    bookbrainz_cookie = cached_cookie("connect.sid", "bookbrainz.org")
+    if bookbrainz_cookie is not None:
+        load_page(driver, "https://bookbrainz.org")
+        wait.until(EC.visibility_of_element_located((By.CSS_SELECTOR, ".logo img")))
+        driver.add_cookie(bookbrainz_cookie)
+
+
+# Sum the resident set size in bytes of a process and all of its descendants.
+#
+# This reads the process tree from /proc, so it only works on Linux.
+def process_tree_rss(pid: int) -> int:
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name is in parentheses and may contain spaces.
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    rss = 0
+    pids = [pid]
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                rss += int(f.read().split()[1]) * page_size
+        except OSError:
+            continue
+        pids.extend(children.get(current, []))
+    return rss
+
+
+# The resident set size of a local browser session in bytes, including its WebDriver executable and the browser's content processes.
+# Returns None for remote sessions and on platforms without /proc.
+def browser_rss(driver):
+    service = getattr(driver, "service", None)
+    process = getattr(service, "process", None)
+    if process is None or not os.path.isdir("/proc"):
+        return None
+    return process_tree_rss(process.pid)
+
+
+# A pool of browser sessions shared by every series in a run.
+#
+# Sessions are started lazily, up to the size of the pool.
+# The first session logs in to BookBrainz before any others are started so that they can all reuse its cookie.
+# Browser memory grows with every page load, so a session is restarted between works once it has created recycle_after_works works or its process tree exceeds recycle_rss bytes.
+class SessionPool:
+    def __init__(
+        self,
+        size: int = 1,
+        headless: bool = True,
+        username=None,
+        endpoints=None,
+        recycle_after_works=None,
+        recycle_rss=None,
+        log_in=None,
+        browser: str = "firefox",
+    ):
+        self.size = max(1, size)
+        self.headless = headless
+        self.browser = browser
+        self.username = username
+        self.endpoints = endpoints
+        self.recycle_after_works = recycle_after_works
+        self.recycle_rss = recycle_rss
+        self.log_in = bookbrainz_log_in if log_in is None else log_in
+        self._idle = queue.Queue()
+        self._sessions = []
+        self._endpoint = {}
+        self._works = {}
+        self._starting = 0
+        self._logged_in = False
+        self._lock = threading.Lock()
+        self._log_in_lock = threading.Lock()
+
+    # Reserve a slot for a new session, unless the pool is full.
+    def _reserve(self, size=None) -> bool:
+        with self._lock:
+            if len(self._sessions) + self._starting >= (
+                self.size if size is None else size
+            ):
+                return False
+            self._starting += 1
+            return True
+
+    # Start a session in a slot reserved with _reserve.
+    #
+    # Launching the browser and logging in happen without holding the lock, so that other sessions can be started and released meanwhile.
+    # The slot is given back whether or not the session starts, and a browser which fails to log in is quit.
+    def _start_session(self):
+        endpoint = None if self.endpoints is None else self.endpoints.choose()
+        driver = None
+        started = False
+        try:
+            driver = create_driver(
+                self.headless, remote_url=endpoint, browser=self.browser
             )
-            if translated_edition_id is not None:
-                translation_work["relationships"].append(
-                    {
-                        "role": "edition",
-                        "id": translated_edition_id,
-                    }
+            if self.log_in is bookbrainz_log_in:
+                load_bookbrainz_cookie(driver)
+            with self._log_in_lock:
+                if not self._logged_in:
+                    self.log_in(driver, self.username)
+                    self._logged_in = True
+            started = True
+        finally:
+            with self._lock:
+                self._starting -= 1
+                if started:
+                    self._sessions.append(driver)
+                    self._endpoint[driver] = endpoint
+                    self._works[driver] = 0
+            if not started:
+                if driver is not None:
+                    try:
+                        driver.quit()
+                    except selenium_exceptions.WebDriverException:
+                        pass
+                if endpoint is not None:
+                    self.endpoints.release(endpoint)
+        return driver
+
+    # Start the first session in the calling thread so that failing to launch the browser or log in stops the run early.
+    def start(self):
+        if self._reserve(size=1):
+            self._idle.put(self._start_session())
+
+    def acquire(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            if self._reserve():
+                return self._start_session()
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                pass
+
+    # Check whether a session can still be used.
+    def is_alive(self, driver) -> bool:
+        endpoint = self._endpoint.get(driver)
+        if endpoint is not None and not self.endpoints.is_healthy(endpoint):
+            return False
+        try:
+            _ = driver.current_url
+        except selenium_exceptions.WebDriverException:
+            return False
+        return True
+
+    # Return a session to the pool.
+    # After a failure, a session which died or whose endpoint went down is discarded and replaced on the next acquire.
+    def release(self, driver, failed: bool = False):
+        if failed and not self.is_alive(driver):
+            logger.warning("Replacing a browser session which is no longer responding")
+            self.discard(driver)
+            return
+        self._works[driver] += 1
+        if self._should_recycle(driver):
+            driver = self._recycle(driver)
+        self._idle.put(driver)
+
+    def _should_recycle(self, driver) -> bool:
+        if self.recycle_after_works and self._works[driver] >= self.recycle_after_works:
+            return True
+        if self.recycle_rss:
+            rss = browser_rss(driver)
+            if rss is not None and rss >= self.recycle_rss:
+                return True
+        return False
+
+    # Restart a session, carrying its BookBrainz cookies over to the new browser.
+    #
+    # The old session is only discarded once the new one has started, and it's kept when the new one fails to start.
+    def _recycle(self, driver):
+        works = self._works[driver]
+        rss_before = browser_rss(driver)
+        cookies = []
+        try:
+            if urllib.parse.urlsplit(driver.current_url).hostname == "bookbrainz.org":
+                cookies = driver.get_cookies()
+        except selenium_exceptions.WebDriverException:
+            pass
+        # The new session takes the place of the old one, so its slot is reserved beyond the size of the pool.
+        with self._lock:
+            self._starting += 1
+        old_driver = driver
+        try:
+            driver = self._start_session()
+        except work_errors() as error:
+            logger.warning(
+                f"Keeping a browser session which failed to restart: {error}"
+            )
+            return old_driver
+        self.discard(old_driver)
+        if cookies:
+            if urllib.parse.urlsplit(driver.current_url).hostname != "bookbrainz.org":
+                load_page(driver, "https://bookbrainz.org")
+            for cookie in cookies:
+                driver.add_cookie(cookie)
+        rss_after = browser_rss(driver)
+        if rss_before is not None and rss_after is not None:
+            print(
+                f"Recycled a browser session after {works} works, reclaiming {(rss_before - rss_after) / 1_048_576:.0f} MiB"
+            )
+        else:
+            print(f"Recycled a browser session after {works} works")
+        return driver
+
+    def discard(self, driver):
+        with self._lock:
+            self._sessions.remove(driver)
+            self._works.pop(driver, None)
+            endpoint = self._endpoint.pop(driver, None)
+            if endpoint is not None:
+                self.endpoints.release(endpoint)
+        try:
+            driver.quit()
+        except selenium_exceptions.WebDriverException:
+            pass
+
+    def close(self):
+        with self._lock:
+            for driver in self._sessions:
+                try:
+                    driver.quit()
+                except selenium_exceptions.WebDriverException:
+                    pass
+            self._sessions = []
+            self._endpoint = {}
+            self._works = {}
+
+
+# The identifiers of a work for an index.
+#
+# The identifiers of a work in a series file are either a list shared by every index or a map from each index to its identifier.
+def work_identifiers(work: dict, i: str) -> list:
+    identifiers = work.get("identifiers") or []
+    if isinstance(identifiers, dict):
+        return [identifiers[i]] if i in identifiers and identifiers[i] else []
+    return list(identifiers)
+
+
+# The titles of the original or translated part of a series with the subtitles of an index filled in.
+def series_titles(part: dict, i: str) -> list:
+    subtitles = {}
+    if "subtitles" in part and i in part["subtitles"] and part["subtitles"][i]:
+        subtitles = part["subtitles"][i]
+    titles = []
+    for title_index, title in enumerate(part.get("titles") or []):
+        title = copy.deepcopy(title)
+        title_index = str(title_index)
+        title["subtitle"] = ""
+        title["sort_subtitle"] = ""
+        if title_index in subtitles and subtitles[title_index]:
+            if "title" in subtitles[title_index] and subtitles[title_index]["title"]:
+                title["subtitle"] = subtitles[title_index]["title"]
+            if "sort" in subtitles[title_index] and subtitles[title_index]["sort"]:
+                title["sort_subtitle"] = subtitles[title_index]["sort"]
+        titles.append(title)
+    return titles
+
+
+# Plan the original BookBrainz work for an index from a series.
+def plan_bookbrainz_original_work(data: dict, i: str) -> dict:
+    original = copy.deepcopy(data["original"])
+    original_work = original["bookbrainz_work"]
+
+    original_work["language"] = original["language"]
+    original_work["disambiguation"] = original["disambiguation"]
+
+    original_work["identifiers"] = work_identifiers(original_work, i)
+    if "identifiers" in original and i in original["identifiers"]:
+        original_work["identifiers"].append(copy.deepcopy(original["identifiers"][i]))
+    if "identifiers" in data and i in data["identifiers"]:
+        original_work["identifiers"].append(copy.deepcopy(data["identifiers"][i]))
+    if i in original.get("musicbrainz_work_identifiers", {}):
+        original_work["identifiers"].append(original["musicbrainz_work_identifiers"][i])
+
+    original_work["titles"] = series_titles(original, i)
+    return original_work
+
+
+# Plan the translated BookBrainz work for an index from a series.
+#
+# The translation relationship is only added when the URL of the original work is known.
+def plan_bookbrainz_translation_work(
+    data: dict, i: str, original_work: dict, original_work_url=None
+) -> dict:
+    translation = copy.deepcopy(data["translation"])
+    translation_work = translation["bookbrainz_work"]
+
+    translation_work["language"] = translation["language"]
+    translation_work["disambiguation"] = translation["disambiguation"]
+
+    translation_work["identifiers"] = work_identifiers(translation_work, i)
+    if "identifiers" in translation and i in translation["identifiers"]:
+        translation_work["identifiers"].append(
+            copy.deepcopy(translation["identifiers"][i])
+        )
+    if "identifiers" in data and i in data["identifiers"]:
+        translation_work["identifiers"].append(copy.deepcopy(data["identifiers"][i]))
+    if i in translation.get("musicbrainz_work_identifiers", {}):
+        translation_work["identifiers"].append(
+            translation["musicbrainz_work_identifiers"][i]
+        )
+
+    translated_edition_id = next(
+        (
+            id
+            for index, id in reversed(
+                sorted(
+                    [
+                        (index, id)
+                        for index, id in translation_work["editions"].items()
+                        if id
+                    ],
+                    key=lambda pair: float(pair[0]),
                 )
+            )
+            if float(i) >= float(index)
+        ),
+        None,
+    )
+    if translated_edition_id is not None:
+        translation_work["relationships"].append(
+            {
+                "role": "edition",
+                "id": translated_edition_id,
+            }
+        )
+
+    if original_work_url is not None:
+        translation_work["relationships"].append(
+            {
+                "role": "translation",
+                "id": original_work_url,
+            }
+        )
+
+    translation_work["titles"] = [original_work["titles"][1]] + series_titles(
+        translation, i
+    )
+    return translation_work
+
+
+# Create the original BookBrainz work for an index followed by its translated work.
+#
+# Returns the URLs of the original work and the translated work.
+def add_bookbrainz_work_pair(driver, data: dict, i: str, username=None, ledger=None):
+    # Create the original work first.
+    original_work = plan_bookbrainz_original_work(data, i)
+    original_work_url = None
+    original_key = ledger_key(data, "original", i)
+    if ledger is not None and original_key is not None:
+        original_work_url = ledger.get(original_key)
+    if original_work_url is None:
+        METRICS.set_part("original")
+        bookbrainz_create_work(
+            driver,
+            original_work,
+            i,
+            username=username,
+            index_number_format_map=data["index_number_format_map"],
+            sort_index_number_format_map=data["sort_index_number_format_map"],
+        )
+        original_work_url = driver.current_url
+        if ledger is not None and original_key is not None:
+            ledger.record(original_key, original_work_url)
+
+    # Now create the translated work
+    translation_work = plan_bookbrainz_translation_work(
+        data, i, original_work, original_work_url
+    )
 
-            translation_work["relationships"].append(
+    translation_key = ledger_key(data, "translation", i)
+    if ledger is not None and translation_key is not None:
+        translation_work_url = ledger.get(translation_key)
+        if translation_work_url is not None:
+            return original_work_url, translation_work_url
+    METRICS.set_part("translation")
+    bookbrainz_create_work(
+        driver,
+        translation_work,
+        i,
+        username=username,
+        index_number_format_map=data["index_number_format_map"],
+        sort_index_number_format_map=data["sort_index_number_format_map"],
+    )
+    translation_work_url = driver.current_url
+    if ledger is not None and translation_key is not None:
+        ledger.record(translation_key, translation_work_url)
+    return original_work_url, translation_work_url
+
+
+# Plan a MusicBrainz work for an index from the original or translated part of a series.
+#
+# MusicBrainz works don't have a sort name, so a title with a distinct sort name is added as a primary alias.
+# The translation relationship is only added when the URL of the original work is known.
+# The BookBrainz work from the ledger is added as an external link.
+def plan_musicbrainz_work(
+    data: dict, i: str, part: str, original_work_url=None, ledger=None
+) -> dict:
+    source = copy.deepcopy(data[part])
+    musicbrainz_work = source.get("musicbrainz_work", {})
+    titles = series_titles(source, i)
+    if part == "translation":
+        titles = [series_titles(data["original"], i)[1]] + titles
+
+    work = {
+        "name": bookbrainz_title_name(i, titles[0], data["index_number_format_map"]),
+        "disambiguation": source.get("disambiguation"),
+        "type": musicbrainz_work.get("type", MUSICBRAINZ_WORK_TYPE),
+        "language": source["language"],
+        "relationships": [],
+        "links": [],
+        "aliases": [],
+        "tags": musicbrainz_work.get("tags", []),
+        "edit_note": musicbrainz_work.get("edit_note"),
+    }
+
+    sort_name = bookbrainz_title_sort_name(
+        i, titles[0], data["sort_index_number_format_map"]
+    )
+    if sort_name is not None and sort_name != work["name"]:
+        work["aliases"].append(
+            {
+                "text": work["name"],
+                "sort": sort_name,
+                "language": titles[0]["language"],
+                "primary": True,
+            }
+        )
+    work["aliases"].extend(
+        bookbrainz_work_aliases(
+            {"titles": titles},
+            i,
+            data["index_number_format_map"],
+            data["sort_index_number_format_map"],
+        )
+    )
+
+    for artist in musicbrainz_work.get("artists", []):
+        if artist and artist.get("id"):
+            work["relationships"].append(
                 {
-                    "role": "translation",
-                    "id": original_work_url,
+                    "target_type": "artist",
+                    "link_type": artist["role"],
+                    "target": artist["id"],
+                    "credited_as": artist.get("credited_as"),
                 }
             )
+    for series in musicbrainz_work.get("series", []):
+        if series and series.get("id"):
+            work["relationships"].append(
+                {
+                    "target_type": "series",
+                    "link_type": "part of",
+                    "target": series["id"],
+                    "number": series_number(series, i),
+                }
+            )
+    if original_work_url is not None:
+        work["relationships"].append(
+            {
+                "target_type": "work",
+                "link_type": "later versions / version of",
+                "target": original_work_url.rstrip("/").rsplit("/", 1)[-1],
+                "backward": True,
+                "attributes": ["translated"],
+            }
+        )
+
+    if "identifiers" in source and i in source["identifiers"]:
+        work["links"].append(source["identifiers"][i])
+    if "identifiers" in data and i in data["identifiers"]:
+        work["links"].append(data["identifiers"][i])
+    if ledger is not None:
+        bookbrainz_key = ledger_key(data, part, i)
+        if bookbrainz_key is not None and bookbrainz_key in ledger:
+            work["links"].append(ledger.get(bookbrainz_key))
+    return work
+
+
+# Create the original MusicBrainz work and the translated work for an index, skipping any that already exist in their MusicBrainz series or in the ledger.
+#
+# Returns the URLs of the original work and the translated work.
+def add_musicbrainz_work_pair(driver, data: dict, i: str, username=None, ledger=None):
+    urls = {}
+    for part in ["original", "translation"]:
+        if i in data[part].get("musicbrainz_work_identifiers", {}):
+            urls[part] = data[part]["musicbrainz_work_identifiers"][i]
+            continue
+        key = ledger_key(data, part, i, "musicbrainz_work")
+        if ledger is not None and key is not None and key in ledger:
+            urls[part] = ledger.get(key)
+            continue
+        work = plan_musicbrainz_work(
+            data, i, part, original_work_url=urls.get("original"), ledger=ledger
+        )
+        METRICS.set_part(part)
+        urls[part] = musicbrainz_create_work(driver, work, username=username)
+        if ledger is not None and key is not None:
+            ledger.record(key, urls[part])
+    return urls["original"], urls["translation"]
+
+
+# Normalize an index so that "7", "7.0", and "07" refer to the same work.
+def normalize_index(index: str) -> str:
+    try:
+        number = float(index)
+    except ValueError:
+        return index
+    if number.is_integer():
+        return str(int(number))
+    return str(number)
+
+
+# The key of a work in the ledger, which is the first series of the work, its number in that series, and the language of the work.
+#
+# The part is either "original" or "translation".
+# The entity is either "bookbrainz_work" or "musicbrainz_work".
+# Returns None when the work isn't part of a series.
+def ledger_key(data: dict, part: str, index: str, entity: str = "bookbrainz_work"):
+    work = data[part].get(entity, {})
+    series = next(
+        (s for s in work.get("series", []) if "id" in s and s["id"]),
+        None,
+    )
+    if series is None:
+        return None
+    return (
+        series["id"].lower(),
+        normalize_index(series_number(series, index)),
+        data[part]["language"],
+    )
 
-            if "titles" not in translation or not translation["titles"]:
-                translation["titles"] = []
 
-            titles = []
-            for title_index, title in enumerate(translation["titles"]):
-                title_index = str(title_index)
-                title["subtitle"] = ""
-                title["sort_subtitle"] = ""
+# A persistent record of the BookBrainz and MusicBrainz works which already exist, so that runs can be repeated without creating duplicates.
+#
+# Works are keyed by their series BBID or MBID, their number in the series, and their language.
+# The ledger is stored in SQLite and loaded into memory for constant time lookups.
+class Ledger:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS works (
+                    series TEXT NOT NULL,
+                    number TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    PRIMARY KEY (series, number, language)
+                )
+                """
+            )
+        self._works = {
+            (series, number, language): url
+            for series, number, language, url in self._connection.execute(
+                "SELECT series, number, language, url FROM works"
+            )
+        }
+
+    def get(self, key: tuple):
+        return self._works.get(key)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._works
+
+    def record(self, key: tuple, url: str):
+        with self._lock:
+            self._works[key] = url
+            with self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO works (series, number, language, url) VALUES (?, ?, ?, ?)",
+                    (*key, url),
+                )
+
+    # Check whether both the original work and the translated work for an index already exist.
+    def has_pair(self, data: dict, index: str, entity: str = "bookbrainz_work") -> bool:
+        original_key = ledger_key(data, "original", index, entity)
+        translation_key = ledger_key(data, "translation", index, entity)
+        return (
+            original_key is not None
+            and translation_key is not None
+            and original_key in self._works
+            and translation_key in self._works
+        )
+
+    def pair(self, data: dict, index: str, entity: str = "bookbrainz_work"):
+        return (
+            self._works[ledger_key(data, "original", index, entity)],
+            self._works[ledger_key(data, "translation", index, entity)],
+        )
+
+    # The URLs of the entities for an index in each of the given parts of a series, or None unless all of them exist.
+    def existing(self, data: dict, index: str, entity: str, parts: list):
+        keys = [ledger_key(data, part, index, entity) for part in parts]
+        if any(key is None or key not in self._works for key in keys):
+            return None
+        return tuple(self._works[key] for key in keys)
+
+
+BOOKBRAINZ_API_URL = "https://api.bookbrainz.org/1"
+
+
+# A client for the BookBrainz web API which reuses its connections.
+#
+# Requests count against the politeness budget of bookbrainz.org.
+class BookBrainzApi:
+    def __init__(self, pool_size: int = 8):
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept"] = "application/json"
+        self.session.headers["User-Agent"] = (
+            f"{APP_NAME} ( https://github.com/jwillikers/driverbrainz )"
+        )
+
+    # Fetch an API path, returning None when the entity doesn't exist.
+    def get(self, path: str):
+        url = f"{BOOKBRAINZ_API_URL}/{path.lstrip('/')}"
+        RATE_LIMITER.throttle(url)
+        response = self.session.get(url, timeout=30)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    # The relationships of an entity, as tuples of the related BBID, the link phrase of the relationship, and the number attribute of the relationship.
+    #
+    # Each relationship is listed under both its link phrase and its reverse link phrase, such as "wrote" and "was written by".
+    # The phrase is None when the API doesn't name it.
+    # The number, such as the number of a work in a series, is normalized and None when the relationship has no number.
+    def related_links(self, entity_type: str, bbid: str) -> set:
+        relationships = self.get(f"{entity_type}/{bbid}/relationships")
+        if relationships is None:
+            return set()
+        links = set()
+        for relationship in relationships.get("relationships", []):
+            related = set()
+            for key in ["targetBbid", "sourceBbid"]:
+                if relationship.get(key):
+                    related.add(relationship[key].lower())
+            for key in ["target", "source"]:
+                if isinstance(relationship.get(key), dict) and relationship[key].get(
+                    "bbid"
+                ):
+                    related.add(relationship[key]["bbid"].lower())
+            related.discard(bbid.lower())
+            relationship_type = relationship.get("relationshipType") or {}
+            phrases = {
+                phrase.lower()
+                for phrase in [
+                    relationship.get("linkPhrase"),
+                    relationship.get("reverseLinkPhrase"),
+                    relationship_type.get("linkPhrase"),
+                    relationship_type.get("reverseLinkPhrase"),
+                ]
+                if phrase
+            } or {None}
+            number = relationship_attribute(relationship, "number")
+            if number is not None:
+                number = normalize_index(str(number))
+            links.update(
+                (other, phrase, number) for other in related for phrase in phrases
+            )
+        return links
+
+    # The works of a series, as pairs of the work's number in the series and its BBID.
+    def series_works(self, bbid: str) -> list:
+        relationships = self.get(f"series/{bbid}/relationships")
+        if relationships is None:
+            return []
+        works = []
+        for relationship in relationships.get("relationships", []):
+            if relationship.get("targetEntityType", "").lower() != "work":
+                continue
+            works.append(
+                (
+                    relationship_attribute(relationship, "number"),
+                    relationship["targetBbid"],
+                )
+            )
+        return works
+
+
+# The value of an attribute, such as the number of an item in a series, from a relationship returned by the BookBrainz API.
+def relationship_attribute(relationship: dict, name: str):
+    for attribute in relationship.get("attributes") or []:
+        attribute_type = attribute.get("type", {})
+        if isinstance(attribute_type, dict):
+            attribute_type = attribute_type.get("name")
+        if str(attribute_type).lower() != name:
+            continue
+        value = attribute.get("value", {})
+        if isinstance(value, dict):
+            value = value.get("textValue")
+        return value
+    return None
+
+
+MUSICBRAINZ_API_URL = "https://musicbrainz.org/ws/2"
+MUSICBRAINZ_API_CACHE_FILE = os.path.join(CACHE_DIR, "musicbrainz.sqlite")
+MUSICBRAINZ_DUMP_INDEX_FILE = os.path.join(CACHE_DIR, "musicbrainz_dump.sqlite")
+
+
+# A client for the MusicBrainz web service which reuses its connections and caches responses on disk.
+#
+# Requests count against the politeness budget of musicbrainz.org, which is one request per second.
+# Responses are cached in SQLite and reused until they are older than the TTL.
+# MusicBrainz answers 503 when requests come too fast, in which case the request is retried after backing off.
+class MusicBrainzApi:
+    def __init__(
+        self,
+        pool_size: int = 4,
+        cache_path: str = MUSICBRAINZ_API_CACHE_FILE,
+        ttl: float = 86_400.0,
+        retries: int = 5,
+    ):
+        self.ttl = ttl
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.headers["Accept"] = "application/json"
+        self.session.headers["User-Agent"] = (
+            f"{APP_NAME} ( https://github.com/jwillikers/driverbrainz )"
+        )
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._cache = sqlite3.connect(cache_path, check_same_thread=False)
+        with self._cache:
+            self._cache.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    fetched REAL NOT NULL,
+                    body TEXT
+                )
+                """
+            )
+
+    # Fetch a web service path, returning None when the entity doesn't exist.
+    def get(self, path: str, params=None, ttl=None):
+        params = dict(sorted({**(params or {}), "fmt": "json"}.items()))
+        url = (
+            f"{MUSICBRAINZ_API_URL}/{path.lstrip('/')}?{urllib.parse.urlencode(params)}"
+        )
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            cached = self._cache.execute(
+                "SELECT fetched, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if cached is not None and time.time() - cached[0] < ttl:
+            return None if cached[1] is None else json.loads(cached[1])
+
+        for attempt in range(self.retries + 1):
+            RATE_LIMITER.throttle(url)
+            response = self.session.get(url, timeout=30)
+            if response.status_code != 503 or attempt == self.retries:
+                break
+            delay = float(response.headers.get("Retry-After", 2**attempt))
+            logger.warning(f"MusicBrainz is busy, retrying {url} in {delay} seconds")
+            time.sleep(delay)
+        if response.status_code == 404:
+            body = None
+        else:
+            response.raise_for_status()
+            body = response.text
+        with self._lock, self._cache:
+            self._cache.execute(
+                "INSERT OR REPLACE INTO responses (url, fetched, body) VALUES (?, ?, ?)",
+                (url, time.time(), body),
+            )
+        return None if body is None else json.loads(body)
+
+    # The works of a series, as pairs of the work's number in the series and its MBID.
+    def series_works(self, mbid: str) -> list:
+        series = self.get(f"series/{mbid}", {"inc": "work-rels"})
+        if series is None:
+            return []
+        works = []
+        for relation in series.get("relations", []):
+            if relation.get("target-type") != "work" or "work" not in relation:
+                continue
+            works.append(
+                (
+                    relation.get("attribute-values", {}).get("number"),
+                    relation["work"]["id"],
+                )
+            )
+        return works
+
+
+# An index of the works in each MusicBrainz series built from the MusicBrainz JSON dumps.
+#
+# The series and work dumps, such as series.tar.xz and work.tar.xz, are read as a stream, one entity per line, so that they are never loaded whole.
+# Only the series number and the MBID of each work are kept, keyed by the series, so a lookup is a single primary key search.
+# Series which aren't part of the indexed dumps are looked up through the fallback, normally the MusicBrainz web service.
+class MusicBrainzDumpIndex:
+    def __init__(self, path: str = MUSICBRAINZ_DUMP_INDEX_FILE, fallback=None):
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS series (
+                    id TEXT PRIMARY KEY
+                ) WITHOUT ROWID
+                """
+            )
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS series_works (
+                    series TEXT NOT NULL,
+                    number TEXT NOT NULL,
+                    work TEXT NOT NULL,
+                    PRIMARY KEY (series, number, work)
+                ) WITHOUT ROWID
+                """
+            )
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dumps (
+                    name TEXT PRIMARY KEY,
+                    entities INTEGER NOT NULL,
+                    works INTEGER NOT NULL,
+                    indexed REAL NOT NULL
+                )
+                """
+            )
+
+    # The series and the works in them for one line of a series dump or a work dump.
+    @staticmethod
+    def dump_entity_works(entity: str, line: bytes):
+        record = json.loads(line)
+        series = set()
+        works = []
+        if entity == "series":
+            series.add(record["id"])
+        for relation in record.get("relations") or []:
+            number = (relation.get("attribute-values") or {}).get("number")
+            if entity == "series" and relation.get("target-type") == "work":
+                if number is not None and "work" in relation:
+                    works.append((record["id"], number, relation["work"]["id"]))
+            elif entity == "work" and relation.get("target-type") == "series":
+                if "series" in relation:
+                    series.add(relation["series"]["id"])
+                    if number is not None:
+                        works.append((relation["series"]["id"], number, record["id"]))
+        return series, works
+
+    # Index a series dump or a work dump.
+    #
+    # The entities are read from the mbdump/series or mbdump/work member of the archive.
+    # Rows are inserted in batches so that memory use doesn't grow with the size of the dump.
+    def index_dump(self, path: str, batch_size: int = 10_000) -> dict:
+        entities = 0
+        works = 0
+        series = set()
+        rows = []
+
+        def flush():
+            with self._lock, self._db:
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO series (id) VALUES (?)",
+                    [(s,) for s in series],
+                )
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO series_works (series, number, work) VALUES (?, ?, ?)",
+                    rows,
+                )
+            series.clear()
+            rows.clear()
+
+        with tarfile.open(path, mode="r|*") as archive:
+            for member in archive:
+                entity = member.name.rsplit("/", 1)[-1]
                 if (
-                    "subtitles" in translation
-                    and i in translation["subtitles"]
-                    and translation["subtitles"][i]
-                    and title_index in translation["subtitles"][i]
-                    and translation["subtitles"][i][title_index]
+                    not member.isfile()
+                    or not member.name.startswith("mbdump/")
+                    or entity not in ["series", "work"]
                 ):
-                    if (
-                        "title" in translation["subtitles"][i][title_index]
-                        and translation["subtitles"][i][title_index]["title"]
-                    ):
-                        title["subtitle"] = translation["subtitles"][i][title_index][
-                            "title"
-                        ]
-                    if (
-                        "sort" in translation["subtitles"][i][title_index]
-                        and translation["subtitles"][i][title_index]["sort"]
-                    ):
-                        title["sort_subtitle"] = translation["subtitles"][i][
-                            title_index
-                        ]["sort"]
-                titles.append(title)
-            translation_work["titles"] = [original_work["titles"][1]] + titles
-
-            bookbrainz_create_work(
+                    continue
+                for line in archive.extractfile(member):
+                    if not line.strip():
+                        continue
+                    entity_series, entity_works = self.dump_entity_works(entity, line)
+                    entities += 1
+                    works += len(entity_works)
+                    series.update(entity_series)
+                    rows.extend(entity_works)
+                    if len(rows) >= batch_size or len(series) >= batch_size:
+                        flush()
+                    if entities % 100_000 == 0:
+                        logger.info(f"{path}: Indexed {entities} entities")
+        flush()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO dumps (name, entities, works, indexed) VALUES (?, ?, ?, ?)",
+                (os.path.basename(path), entities, works, time.time()),
+            )
+        return {"entities": entities, "works": works}
+
+    # The works of a series, as pairs of the work's number in the series and its MBID.
+    def series_works(self, mbid: str) -> list:
+        with self._lock:
+            indexed = self._db.execute(
+                "SELECT 1 FROM series WHERE id = ?", (mbid,)
+            ).fetchone()
+            works = self._db.execute(
+                "SELECT number, work FROM series_works WHERE series = ?", (mbid,)
+            ).fetchall()
+        if indexed is None and not works and self.fallback is not None:
+            return self.fallback.series_works(mbid)
+        return works
+
+
+# Look up the MusicBrainz works which already exist in the MusicBrainz series of each part of a series.
+#
+# The works are stored in the series data as a map from each index to the URL of its MusicBrainz work.
+# BookBrainz works are then planned with the MusicBrainz work as an identifier, and MusicBrainz works which already exist aren't created again.
+def fill_musicbrainz_work_identifiers(api, data: dict, range_: list):
+    for part in ["original", "translation"]:
+        series = next(
+            (
+                s
+                for s in data[part].get("musicbrainz_work", {}).get("series", [])
+                if s and s.get("id")
+            ),
+            None,
+        )
+        if series is None:
+            continue
+        works = {
+            normalize_index(number): mbid
+            for number, mbid in api.series_works(series["id"])
+            if number is not None
+        }
+        identifiers = data[part].setdefault("musicbrainz_work_identifiers", {})
+        for i in range_:
+            number = normalize_index(series_number(series, i))
+            if number in works:
+                identifiers[i] = f"https://musicbrainz.org/work/{works[number]}"
+
+
+# The languages of a work returned by the BookBrainz API as given by bookbrainz_language.
+def work_languages(work: dict) -> list:
+    languages = [
+        language.get("name") if isinstance(language, dict) else language
+        for language in work.get("languages") or []
+    ]
+    if not languages and work.get("defaultAlias", {}).get("language"):
+        languages = [work["defaultAlias"]["language"]]
+    return [bookbrainz_language(language) for language in languages]
+
+
+# The BBID in a BookBrainz URL or a bare BBID.
+def bbid_from_url(url: str) -> str:
+    return url.rstrip("/").rsplit("/", 1)[-1].lower()
+
+
+# Fetch the works of the original series and the translated series along with their details, aliases, and relationships.
+#
+# The works found in each series are indexed by their number and language.
+def fetch_bookbrainz_series_works(api: BookBrainzApi, data: dict, workers: int = 8):
+    parts = {}
+    for part in ["original", "translation"]:
+        series = next(
+            (
+                s
+                for s in data[part]["bookbrainz_work"].get("series", [])
+                if "id" in s and s["id"]
+            ),
+            None,
+        )
+        if series is not None:
+            parts[part] = series
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        series_works = dict(
+            zip(
+                parts,
+                executor.map(
+                    lambda series: api.series_works(series["id"]), parts.values()
+                ),
+            )
+        )
+        bbids = sorted(
+            {bbid.lower() for works in series_works.values() for _, bbid in works}
+        )
+        details = dict(zip(bbids, executor.map(lambda b: api.get(f"work/{b}"), bbids)))
+        aliases = dict(
+            zip(bbids, executor.map(lambda b: api.get(f"work/{b}/aliases"), bbids))
+        )
+        related = dict(
+            zip(bbids, executor.map(lambda b: api.related_links("work", b), bbids))
+        )
+
+    found = {}
+    for part, works in series_works.items():
+        found[part] = {}
+        for number, bbid in works:
+            bbid = bbid.lower()
+            if number is None or details.get(bbid) is None:
+                continue
+            if bookbrainz_language(data[part]["language"]) not in work_languages(
+                details[bbid]
+            ):
+                continue
+            found[part].setdefault(normalize_index(number), []).append(bbid)
+    return parts, found, details, aliases, related
+
+
+# Plan the original work and the translated work for an index, relating the translation to the original work found in its series.
+def plan_bookbrainz_work_parts(data: dict, i: str, parts: dict, found: dict) -> dict:
+    original_work = plan_bookbrainz_original_work(data, i)
+    original_bbid = None
+    if "original" in parts:
+        number = normalize_index(series_number(parts["original"], i))
+        if found["original"].get(number):
+            original_bbid = found["original"][number][0]
+    return {
+        "original": original_work,
+        "translation": plan_bookbrainz_translation_work(
+            data,
+            i,
+            original_work,
+            original_bbid,
+        ),
+    }
+
+
+# Compare the works of a series on BookBrainz with the works planned for it.
+#
+# The series and its works are fetched from the BookBrainz API concurrently.
+# Returns a diff for the original series and the translated series with the missing, duplicate, mismatched, and unplanned entries.
+def verify_bookbrainz_work_series(
+    api: BookBrainzApi, data: dict, range_: list, workers: int = 8
+) -> dict:
+    parts, found, details, aliases, related = fetch_bookbrainz_series_works(
+        api, data, workers
+    )
+
+    diff = {}
+    for part, series in parts.items():
+        diff[part] = {
+            "series": series["id"],
+            "missing": [],
+            "duplicate": {},
+            "mismatched": {},
+            "unplanned": {},
+        }
+    planned_numbers = {part: set() for part in parts}
+    for i in range_:
+        works = plan_bookbrainz_work_parts(data, i, parts, found)
+        for part, series in parts.items():
+            number = normalize_index(series_number(series, i))
+            planned_numbers[part].add(number)
+            bbids = found[part].get(number, [])
+            if not bbids:
+                diff[part]["missing"].append(i)
+                continue
+            if len(bbids) > 1:
+                diff[part]["duplicate"][i] = [
+                    f"https://bookbrainz.org/work/{bbid}" for bbid in bbids
+                ]
+            mismatches = compare_bookbrainz_work(
+                data,
+                i,
+                works[part],
+                details[bbids[0]],
+                aliases[bbids[0]] or {},
+                related[bbids[0]],
+            )
+            if mismatches:
+                diff[part]["mismatched"][i] = {
+                    "url": f"https://bookbrainz.org/work/{bbids[0]}",
+                    "differences": mismatches,
+                }
+    for part in parts:
+        for number, bbids in found[part].items():
+            if number not in planned_numbers[part]:
+                diff[part]["unplanned"][number] = [
+                    f"https://bookbrainz.org/work/{bbid}" for bbid in bbids
+                ]
+    return diff
+
+
+# Compare a planned work with a work returned by the BookBrainz API, listing the fields which differ.
+def compare_bookbrainz_work(
+    data: dict, i: str, work: dict, details: dict, aliases: dict, related: set
+) -> list:
+    differences = diff_bookbrainz_work(
+        work,
+        i,
+        details,
+        aliases,
+        related,
+        data["index_number_format_map"],
+        data["sort_index_number_format_map"],
+    )
+    default_alias = details.get("defaultAlias") or {}
+    mismatches = []
+    if "name" in differences:
+        mismatches.append(
+            {
+                "field": "name",
+                "expected": differences["name"],
+                "actual": default_alias.get("name"),
+            }
+        )
+    if "sort_name" in differences:
+        mismatches.append(
+            {
+                "field": "sort_name",
+                "expected": differences["sort_name"],
+                "actual": default_alias.get("sortName"),
+            }
+        )
+    if "type" in differences:
+        mismatches.append(
+            {
+                "field": "type",
+                "expected": differences["type"],
+                "actual": details.get("workType"),
+            }
+        )
+    if "language" in differences:
+        mismatches.append(
+            {
+                "field": "language",
+                "expected": differences["language"],
+                "actual": work_languages(details),
+            }
+        )
+    if "aliases" in differences:
+        mismatches.append(
+            {
+                "field": "aliases",
+                "missing": [alias["text"] for alias in differences["aliases"]],
+            }
+        )
+    if "alias_sort_names" in differences:
+        mismatches.append(
+            {
+                "field": "alias_sort_names",
+                "expected": {
+                    alias["text"]: alias["sort"]
+                    for alias in differences["alias_sort_names"]
+                },
+            }
+        )
+    if "series" in differences:
+        mismatches.append(
+            {
+                "field": "series",
+                "missing": [
+                    {
+                        "id": bbid_from_url(series["id"]),
+                        "number": series_number(series, i),
+                    }
+                    for series in differences["series"]
+                ],
+                "wrong_number": differences.get("stale_series", []),
+            }
+        )
+    if "relationships" in differences:
+        mismatches.append(
+            {
+                "field": "relationships",
+                "missing": [
+                    {
+                        "id": bbid_from_url(relationship["id"]),
+                        "role": relationship["role"],
+                    }
+                    for relationship in differences["relationships"]
+                ],
+            }
+        )
+    return mismatches
+
+
+# Fill the ledger with the works which are already part of the series of a series file.
+def sync_ledger(ledger: Ledger, api: BookBrainzApi, data: dict) -> int:
+    recorded = 0
+    for part in ["original", "translation"]:
+        work = data[part]["bookbrainz_work"]
+        series = next(
+            (s for s in work.get("series", []) if "id" in s and s["id"]),
+            None,
+        )
+        if series is None:
+            continue
+        for number, bbid in api.series_works(series["id"]):
+            if number is None:
+                continue
+            details = api.get(f"work/{bbid}")
+            if details is None or bookbrainz_language(
+                data[part]["language"]
+            ) not in work_languages(details):
+                continue
+            ledger.record(
+                (series["id"].lower(), normalize_index(number), data[part]["language"]),
+                f"https://bookbrainz.org/work/{bbid}",
+            )
+            recorded += 1
+    return recorded
+
+
+# The type of entity at the other end of each BookBrainz relationship role.
+BOOKBRAINZ_RELATIONSHIP_TARGET_TYPE = {
+    "adaptation": "work",
+    "adapter": "author",
+    "contributor": "author",
+    "edition": "edition",
+    "illustrator": "author",
+    "letterer": "author",
+    "provided art for": "author",
+    "provided story for": "author",
+    "revisor": "author",
+    "series": "series",
+    "translation": "work",
+    "translator": "author",
+    "writer": "author",
+}
+
+# The type and name of BookBrainz entities resolved through the API, keyed by BBID, along with when they were fetched.
+# The relationship editor picks entities by these names.
+BOOKBRAINZ_ENTITIES = {}
+
+
+# Collect the distinct relationship, series, and edition targets of a series file.
+#
+# Returns a dictionary from each BBID to its role.
+def bookbrainz_relationship_targets(data: dict) -> dict:
+    targets = {}
+    for part in ["original", "translation"]:
+        work = data[part]["bookbrainz_work"]
+        for series in work.get("series", []):
+            if series and series.get("id"):
+                targets[series["id"].lower()] = "series"
+        for relationship in work.get("relationships", []):
+            if (
+                relationship
+                and relationship.get("id")
+                and relationship.get("role", "").lower()
+                in BOOKBRAINZ_RELATIONSHIP_TARGET_TYPE
+            ):
+                targets[relationship["id"].lower()] = relationship["role"].lower()
+        for edition in (work.get("editions") or {}).values():
+            if edition:
+                targets[edition.lower()] = "edition"
+    return targets
+
+
+# Resolve every relationship target of the given series files through the BookBrainz API before any browser is started.
+#
+# The type and name of each target is cached in BOOKBRAINZ_ENTITIES and on disk.
+# Cached targets are resolved again once they're older than the TTL, so that entities which were merged or deleted since are caught.
+# Returns the targets which don't exist as a list of tuples of the BBID, the role, and the name of the series.
+def resolve_bookbrainz_relationship_targets(
+    api: BookBrainzApi, series_list: list, workers: int = 8, ttl: float = 86_400.0
+) -> list:
+    if not BOOKBRAINZ_ENTITIES:
+        try:
+            with open(ENTITIES_CACHE_FILE) as f:
+                BOOKBRAINZ_ENTITIES.update(json.load(f))
+        except FileNotFoundError:
+            pass
+    roles = {}
+    for name, data, _ in series_list:
+        for bbid, role in bookbrainz_relationship_targets(data).items():
+            roles.setdefault((bbid, role), []).append(name)
+    now = time.time()
+    unresolved = [
+        (bbid, role)
+        for bbid, role in roles
+        if bbid not in BOOKBRAINZ_ENTITIES
+        or BOOKBRAINZ_ENTITIES[bbid]["type"]
+        != BOOKBRAINZ_RELATIONSHIP_TARGET_TYPE[role]
+        or now - BOOKBRAINZ_ENTITIES[bbid].get("fetched", 0) >= ttl
+    ]
+
+    def resolve(target):
+        bbid, role = target
+        entity_type = BOOKBRAINZ_RELATIONSHIP_TARGET_TYPE[role]
+        return api.get(f"{entity_type}/{bbid}")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        entities = list(executor.map(resolve, unresolved))
+    invalid = []
+    for (bbid, role), entity in zip(unresolved, entities):
+        if entity is None:
+            BOOKBRAINZ_ENTITIES.pop(bbid, None)
+            invalid.extend((bbid, role, name) for name in roles[(bbid, role)])
+            continue
+        BOOKBRAINZ_ENTITIES[bbid] = {
+            "type": BOOKBRAINZ_RELATIONSHIP_TARGET_TYPE[role],
+            "name": (entity.get("defaultAlias") or {}).get("name"),
+            "fetched": now,
+        }
+    if unresolved:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(ENTITIES_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(BOOKBRAINZ_ENTITIES, f, ensure_ascii=False, indent=4)
+    return invalid
+
+
+# The errors which fail a single work rather than the whole run, such as the browser or a web service failing or an editor rejecting a work.
+#
+# This is a function so that Selenium and Requests are only imported once a work fails.
+def work_errors() -> tuple:
+    return (
+        selenium_exceptions.WebDriverException,
+        requests.RequestException,
+        RuntimeError,
+    )
+
+
+# The function which creates the entities for an index and the parts of a series that the entities belong to.
+ENTITY_CREATORS = {
+    "bookbrainz_work": (add_bookbrainz_work_pair, ["original", "translation"]),
+    "musicbrainz_work": (add_musicbrainz_work_pair, ["original", "translation"]),
+    "musicbrainz_release_group": (add_musicbrainz_release_group, ["translation"]),
+}
+
+
+# Drain the works of every series through a shared pool of browser sessions.
+#
+# Each entry of series_list is a tuple of the series name, the series data, and the indices to create.
+# The entity is one of ENTITY_CREATORS.
+# Instead of the ranges of the series, the works can be supplied as they arrive by items, an iterable of tuples of the series name, the series data, and the index, such as from read_work_stream.
+# Returns the created works and the failures for each series.
+def run_bookbrainz_work_series(
+    series_list: list,
+    pool: SessionPool,
+    username=None,
+    controller=None,
+    ledger=None,
+    entity: str = "bookbrainz_work",
+    items=None,
+):
+    if controller is None:
+        controller = ConcurrencyController(pool.size, initial=pool.size)
+    results = {
+        name: {"total": len(range_), "created": {}, "failed": {}, "skipped": {}}
+        for name, _, range_ in series_list
+    }
+    results_lock = threading.Lock()
+
+    # Print the progress of a series, counting the works which were skipped as done.
+    def report(name, i, outcome=""):
+        with results_lock:
+            result = results[name]
+            done = (
+                len(result["created"]) + len(result["failed"]) + len(result["skipped"])
+            )
+            print(f"{name}: {outcome}{i} ({done}/{result['total']})")
+
+    def process(name, data, i):
+        create, parts = ENTITY_CREATORS[entity]
+        if ledger is not None:
+            existing = ledger.existing(data, i, entity, parts)
+            if existing is not None:
+                with results_lock:
+                    results[name]["skipped"][i] = existing
+                METRICS.record_work("skipped", entity)
+                report(name, i, "Skipped ")
+                return
+        controller.acquire()
+        driver = None
+        failed = False
+        try:
+            driver = pool.acquire()
+            urls = create(driver, data, i, username=username, ledger=ledger)
+        except work_errors() as error:
+            failed = True
+            logger.error(f"{name}: Failed to create the works for {i}: {error}")
+            controller.record(error=True)
+            with results_lock:
+                results[name]["failed"][i] = str(error)
+        else:
+            controller.record(error=False, latency=RATE_LIMITER.latency())
+            with results_lock:
+                results[name]["created"][i] = urls
+        finally:
+            if driver is not None:
+                pool.release(driver, failed=failed)
+            controller.release()
+        METRICS.record_work("failed" if failed else "created", entity)
+        report(name, i)
+
+    streamed = items is not None
+    METRICS.expect(sum(len(range_) for _, _, range_ in series_list))
+    if items is None:
+        items = ((name, data, i) for name, data, range_ in series_list for i in range_)
+    # Only take the next work once a session is free, so that a stream is read no faster than its works are created.
+    slots = threading.BoundedSemaphore(pool.size)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=pool.size) as executor:
+        futures = []
+        for name, data, i in items:
+            slots.acquire()
+            if streamed:
+                with results_lock:
+                    results[name]["total"] += 1
+                METRICS.expect(1)
+            future = executor.submit(process, name, data, i)
+            future.add_done_callback(lambda _: slots.release())
+            futures.append(future)
+        concurrent.futures.wait(futures)
+    # Any other error is a bug, which stops the run once the other works are done.
+    for future in futures:
+        future.result()
+    return results
+
+
+# Read the works of a series as NDJSON, one index per line, from a file or FIFO, or from standard input when the path is "-".
+#
+#   {"index": "12", "original": {"subtitles": {"0": {"title": "..."}}}, "translation": {...}}
+#
+# The tables in the original and translated parts of each line, such as subtitles or musicbrainz_work_identifiers, hold the values for that index.
+# Each work gets its own copy of the series data with these values laid over it, so a work is planned exactly as if the values were in the series file.
+# The series data itself is never changed, as works which are already being created share it, and it may write to a subtitle store.
+# Works are yielded as soon as their line is read, so an upstream generator such as parse_wikipedia_chapters.py can run while the works are created.
+# The prepare function is called with the series data and the index before each work is yielded.
+def read_work_stream(path: str, name: str, data: dict, prepare=None):
+    if path != "-":
+        with open(path, encoding="utf-8") as stream:
+            yield from read_work_stream_lines(stream, name, data, prepare)
+    else:
+        yield from read_work_stream_lines(sys.stdin, name, data, prepare)
+
+
+# Copy the series data with the tables of a line of a work stream laid over it for the index.
+#
+# Only the series and its parts are copied, and each streamed table only holds the index, as a work is planned from its own index alone.
+def stream_overlay(data: dict, i: str, spec: dict) -> dict:
+    overlay = dict(data)
+    for part in ["original", "translation"]:
+        tables = spec.get(part) or {}
+        if not tables:
+            continue
+        overlay[part] = dict(data[part])
+        for table, value in tables.items():
+            overlay[part][table] = {i: value}
+    return overlay
+
+
+def read_work_stream_lines(stream, name: str, data: dict, prepare=None):
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            spec = json.loads(line)
+            i = str(spec["index"])
+        except (ValueError, KeyError, TypeError) as error:
+            logger.error(f"{name}: Skipping line {number} of the stream: {error}")
+            continue
+        overlay = stream_overlay(data, i, spec)
+        problems = validate_series_index(overlay, i)
+        if problems:
+            for problem in problems:
+                logger.error(f"{name}: Skipping line {number} of the stream: {problem}")
+            continue
+        if prepare is not None:
+            prepare(overlay, i)
+        yield name, overlay, i
+
+
+# A queue of planned works shared by worker processes on any number of hosts.
+#
+# The queue is a SQLite database which can live on a shared volume.
+# Workers lease one index at a time.
+# A lease which isn't renewed before it expires is handed to the next worker, so items held by a crashed worker aren't lost.
+class WorkQueue:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS series (
+                    name TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS items (
+                    series TEXT NOT NULL,
+                    idx TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    original_url TEXT,
+                    translation_url TEXT,
+                    error TEXT,
+                    entity TEXT NOT NULL DEFAULT 'bookbrainz_work',
+                    PRIMARY KEY (series, idx)
+                );
+                """
+            )
+            # Queues created before the entity was recorded only hold BookBrainz works.
+            columns = [
+                column[1] for column in connection.execute("PRAGMA table_info(items)")
+            ]
+            if "entity" not in columns:
+                connection.execute(
+                    "ALTER TABLE items ADD COLUMN entity TEXT NOT NULL DEFAULT 'bookbrainz_work'"
+                )
+
+    # SQLite connections can't be shared between threads, so each thread gets its own.
+    def _connection(self):
+        if not hasattr(self._local, "connection"):
+            self._local.connection = sqlite3.connect(
+                self.path, timeout=60, isolation_level=None
+            )
+        return self._local.connection
+
+    # Add the indices of a series to the queue, to be created as the entity, which is one of ENTITY_CREATORS.
+    # Indices which are already queued keep their state, so a series can be enqueued again after extending its range.
+    def enqueue(
+        self, name: str, data: dict, range_: list, entity: str = "bookbrainz_work"
+    ) -> int:
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "INSERT OR REPLACE INTO series (name, data) VALUES (?, ?)",
+                # Subtitle stores are written inline so that workers on other hosts don't need them.
+                (name, json.dumps(data, ensure_ascii=False, default=dict)),
+            )
+            cursor = connection.executemany(
+                "INSERT OR IGNORE INTO items (series, idx, position, entity) VALUES (?, ?, ?, ?)",
+                [(name, i, position, entity) for position, i in enumerate(range_)],
+            )
+            return cursor.rowcount
+
+    # Lease the next available index, returning the series name, the series data, the index, and the entity to create.
+    #
+    # An index whose lease expired is leased again, unless it has already been attempted max_attempts times, such as when it keeps crashing its worker.
+    def lease(self, worker: str, timeout: float, max_attempts: int = 3):
+        connection = self._connection()
+        now = time.time()
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                """
+                UPDATE items SET status = 'failed', lease_expires = NULL,
+                    error = COALESCE(error, 'The lease expired after ' || attempts || ' attempts')
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, max_attempts),
+            )
+            row = connection.execute(
+                """
+                SELECT items.series, items.idx, series.data, items.entity FROM items
+                JOIN series ON series.name = items.series
+                WHERE items.status = 'pending'
+                    OR (items.status = 'leased' AND items.lease_expires < ?)
+                ORDER BY items.series, items.position
+                LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                """
+                UPDATE items SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE series = ? AND idx = ?
+                """,
+                (worker, now + timeout, row[0], row[1]),
+            )
+        return row[0], json.loads(row[2]), row[1], row[3]
+
+    def renew(self, worker: str, timeout: float):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "UPDATE items SET lease_expires = ? WHERE status = 'leased' AND worker = ?",
+                (time.time() + timeout, worker),
+            )
+
+    def complete(self, worker: str, name: str, i: str, urls):
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(
+                """
+                UPDATE items SET status = 'done', original_url = ?, translation_url = ?, error = NULL, lease_expires = NULL
+                WHERE series = ? AND idx = ? AND worker = ?
+                """,
+                (urls[0], urls[1], name, i, worker),
+            )
+            if cursor.rowcount == 0:
+                logger.warning(
+                    f"{name}: The lease on {i} expired before it was completed, the works may have been created twice."
+                )
+                connection.execute(
+                    """
+                    UPDATE items SET status = 'done', original_url = ?, translation_url = ?, error = NULL, lease_expires = NULL
+                    WHERE series = ? AND idx = ?
+                    """,
+                    (urls[0], urls[1], name, i),
+                )
+
+    # Return a failed index to the queue until it has been attempted max_attempts times.
+    def fail(self, worker: str, name: str, i: str, error: str, max_attempts: int):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                """
+                UPDATE items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    error = ?, lease_expires = NULL
+                WHERE series = ? AND idx = ? AND worker = ?
+                """,
+                (max_attempts, error, name, i, worker),
+            )
+
+    # Count the items which are pending or leased.
+    def outstanding(self) -> int:
+        return (
+            self._connection()
+            .execute("SELECT COUNT(*) FROM items WHERE status IN ('pending', 'leased')")
+            .fetchone()[0]
+        )
+
+    def status(self) -> dict:
+        status = {}
+        for (
+            name,
+            i,
+            state,
+            attempts,
+            original_url,
+            translation_url,
+            error,
+        ) in self._connection().execute(
+            """
+                SELECT series, idx, status, attempts, original_url, translation_url, error
+                FROM items ORDER BY series, position
+                """
+        ):
+            series = status.setdefault(name, {"counts": {}, "items": {}})
+            series["counts"][state] = series["counts"].get(state, 0) + 1
+            series["items"][i] = {
+                "status": state,
+                "attempts": attempts,
+                "original_url": original_url,
+                "translation_url": translation_url,
+                "error": error,
+            }
+        return status
+
+
+# The URLs of the original and the translated entity, as recorded in the queue, from the URLs of the parts of an entity in ENTITY_CREATORS.
+def queued_urls(parts: list, urls) -> tuple:
+    by_part = dict(zip(parts, urls))
+    return by_part.get("original"), by_part.get("translation")
+
+
+# Lease works from a shared queue and create them, as the entity each was queued as, until the queue is drained.
+def run_queue_worker(
+    work_queue: WorkQueue,
+    pool: SessionPool,
+    username=None,
+    controller=None,
+    lease_timeout: float = 600.0,
+    max_attempts: int = 3,
+    poll_interval: float = 10.0,
+    ledger=None,
+):
+    if controller is None:
+        controller = ConcurrencyController(pool.size, initial=pool.size)
+    results = {}
+    results_lock = threading.Lock()
+    stop = threading.Event()
+    worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    # Keep the leases of the works in progress alive while they are being created.
+    def heartbeat():
+        heartbeat_queue = WorkQueue(work_queue.path)
+        while not stop.wait(lease_timeout / 3):
+            for thread in range(pool.size):
+                heartbeat_queue.renew(f"{worker_prefix}:{thread}", lease_timeout)
+
+    def process(thread):
+        worker = f"{worker_prefix}:{thread}"
+        while True:
+            controller.acquire()
+            driver = None
+            failed = False
+            try:
+                item = work_queue.lease(worker, lease_timeout, max_attempts)
+                if item is None:
+                    if work_queue.outstanding() == 0:
+                        return
+                    # Wait for works leased by other workers to finish or for their leases to expire.
+                    time.sleep(poll_interval)
+                    continue
+                name, data, i, entity = item
+                create, parts = ENTITY_CREATORS[entity]
+                with results_lock:
+                    result = results.setdefault(
+                        name, {"total": 0, "created": {}, "failed": {}, "skipped": {}}
+                    )
+                    result["total"] += 1
+                METRICS.expect(1)
+                existing = (
+                    None if ledger is None else ledger.existing(data, i, entity, parts)
+                )
+                if existing is not None:
+                    work_queue.complete(worker, name, i, queued_urls(parts, existing))
+                    with results_lock:
+                        result["skipped"][i] = existing
+                    METRICS.record_work("skipped", entity)
+                    continue
+                try:
+                    driver = pool.acquire()
+                    urls = create(driver, data, i, username=username, ledger=ledger)
+                except work_errors() as error:
+                    failed = True
+                    logger.error(f"{name}: Failed to create the works for {i}: {error}")
+                    controller.record(error=True)
+                    work_queue.fail(worker, name, i, str(error), max_attempts)
+                    with results_lock:
+                        result["failed"][i] = str(error)
+                    METRICS.record_work("failed", entity)
+                else:
+                    controller.record(error=False, latency=RATE_LIMITER.latency())
+                    work_queue.complete(worker, name, i, queued_urls(parts, urls))
+                    with results_lock:
+                        result["created"][i] = urls
+                    METRICS.record_work("created", entity)
+                print(f"{name}: {i} ({worker})")
+            finally:
+                if driver is not None:
+                    pool.release(driver, failed=failed)
+                controller.release()
+
+    heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+    heartbeat_thread.start()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=pool.size) as executor:
+            futures = [executor.submit(process, thread) for thread in range(pool.size)]
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+    finally:
+        stop.set()
+    return results
+
+
+def print_series_summary(results: dict):
+    for name, result in results.items():
+        print(
+            f"{name}: {len(result['created'])} of {result['total']} created, {len(result['skipped'])} skipped, {len(result['failed'])} failed"
+        )
+        if result["skipped"]:
+            print(f"  Skipped existing works: {', '.join(result['skipped'])}")
+        for i, error in result["failed"].items():
+            print(f"  {i}: {error}")
+
+
+# Bring the existing works of each series in line with the planned works.
+#
+# The works are fetched from the BookBrainz API and compared with the planned works first.
+# Only works which differ are opened in a browser session, where only the changed fields are edited.
+# Works which already match and planned works which don't exist on BookBrainz are skipped.
+def run_bookbrainz_work_updates(
+    series_list: list,
+    pool: SessionPool,
+    api: BookBrainzApi,
+    username=None,
+    controller=None,
+    api_workers: int = 8,
+):
+    if controller is None:
+        controller = ConcurrencyController(pool.size, initial=pool.size)
+    results = {}
+    updates = []
+    for name, data, range_ in series_list:
+        results[name] = {
+            "total": 0,
+            "updated": {},
+            "unchanged": [],
+            "missing": [],
+            "failed": {},
+        }
+        parts, found, details, aliases, related = fetch_bookbrainz_series_works(
+            api, data, api_workers
+        )
+        for i in range_:
+            works = plan_bookbrainz_work_parts(data, i, parts, found)
+            for part, series in parts.items():
+                key = f"{i} {part}"
+                results[name]["total"] += 1
+                bbids = found[part].get(normalize_index(series_number(series, i)))
+                if not bbids:
+                    results[name]["missing"].append(key)
+                    continue
+                differences = diff_bookbrainz_work(
+                    works[part],
+                    i,
+                    details[bbids[0]],
+                    aliases[bbids[0]] or {},
+                    related[bbids[0]],
+                    data["index_number_format_map"],
+                    data["sort_index_number_format_map"],
+                )
+                if not differences:
+                    results[name]["unchanged"].append(key)
+                    continue
+                updates.append((name, key, bbids[0], data, works[part], i, differences))
+    results_lock = threading.Lock()
+
+    METRICS.expect(len(updates))
+
+    def process(name, key, bbid, data, work, i, differences):
+        controller.acquire()
+        driver = None
+        failed = False
+        try:
+            driver = pool.acquire()
+            bookbrainz_update_work(
                 driver,
-                translation_work,
+                bbid,
+                work,
                 i,
+                differences,
                 username=username,
                 index_number_format_map=data["index_number_format_map"],
                 sort_index_number_format_map=data["sort_index_number_format_map"],
             )
+        except work_errors() as error:
+            failed = True
+            logger.error(f"{name}: Failed to update the work for {key}: {error}")
+            controller.record(error=True)
+            with results_lock:
+                results[name]["failed"][key] = str(error)
+        else:
+            controller.record(error=False, latency=RATE_LIMITER.latency())
+            with results_lock:
+                results[name]["updated"][key] = sorted(
+                    field for field in differences if field != "existing_aliases"
+                )
+            print(f"{name}: Updated {key} (https://bookbrainz.org/work/{bbid})")
+        finally:
+            if driver is not None:
+                pool.release(driver, failed=failed)
+            controller.release()
+        METRICS.record_work("failed" if failed else "updated", "bookbrainz_work")
+
+    if updates:
+        pool.start()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=pool.size) as executor:
+            futures = [executor.submit(process, *update) for update in updates]
+            concurrent.futures.wait(futures)
+        for future in futures:
+            future.result()
+    return results
+
+
+def print_update_summary(results: dict):
+    for name, result in results.items():
+        print(
+            f"{name}: {len(result['updated'])} of {result['total']} updated, {len(result['unchanged'])} unchanged, {len(result['missing'])} missing, {len(result['failed'])} failed"
+        )
+        for key, fields in result["updated"].items():
+            print(f"  {key}: {', '.join(fields)}")
+        if result["missing"]:
+            print(f"  Missing works: {', '.join(result['missing'])}")
+        for key, error in result["failed"].items():
+            print(f"  {key}: {error}")
+
+
+def main():
+    global MUSICBRAINZ_SERVER
+
+    parser = argparse.ArgumentParser(
+        prog="driverbrainz.py",
+        description="Automate time-consuming tasks contributing metadata to BookBrainz and MusicBrainz",
+    )
+
+    parser.add_argument("command", nargs="?", default="add_bookbrainz_work_series")
+    parser.add_argument(
+        "filenames",
+        metavar="filename",
+        nargs="*",
+        help='The series file. The "batch", "enqueue", "verify", and "update_bookbrainz_work_series" commands accept several files or glob patterns, and the "index_musicbrainz_dump" command accepts MusicBrainz JSON dumps.',
+    )
+    parser.add_argument("--range-start", type=int)
+    parser.add_argument("--range-end", type=int)
+    parser.add_argument(
+        "--range",
+        metavar="SELECTOR",
+        help='The indices to process, such as "1-20,28.5,>90,!14.5". Use "missing" to only process the indices without works in the ledger.',
+    )
+    parser.add_argument("--no-headless", action="store_true")
+    parser.add_argument(
+        "--browser",
+        choices=list(BROWSER_BACKENDS),
+        default="firefox",
+        help="The browser to drive, locally or on the remote WebDriver endpoints",
+    )
+    parser.add_argument(
+        "--musicbrainz-server",
+        default=MUSICBRAINZ_SERVER,
+        help="The MusicBrainz server in which to create works and release groups",
+    )
+    parser.add_argument("--username")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="The number of browser sessions to run concurrently",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Start with one browser session and adjust the number of active sessions up to --workers based on latency and errors",
+    )
+    parser.add_argument(
+        "--target-latency",
+        type=float,
+        default=10.0,
+        help="The page load latency in seconds above which the adaptive controller reduces the number of sessions",
+    )
+    parser.add_argument(
+        "--rate-limit",
+        action="append",
+        default=[],
+        metavar="HOST=RATE",
+        help="The maximum number of page loads, entity searches, and submits per second for a host",
+    )
+    parser.add_argument(
+        "--queue",
+        help='The SQLite database of the work queue shared by the "enqueue", "work", and "queue_status" commands',
+    )
+    parser.add_argument(
+        "--entity",
+        choices=list(ENTITY_CREATORS),
+        default="bookbrainz_work",
+        help='The kind of entity which the "enqueue" command queues the works to be created as',
+    )
+    parser.add_argument(
+        "--lease-timeout",
+        type=float,
+        default=600.0,
+        help="The number of seconds a worker may hold a work before it is handed to another worker",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="The number of times a worker attempts a work from the queue before it is marked as failed",
+    )
+    parser.add_argument(
+        "--remote-webdriver",
+        action="append",
+        default=[],
+        metavar="URL",
+        help="The URL of a remote WebDriver endpoint, such as a Selenium Grid. Supply it several times to balance sessions across endpoints.",
+    )
+    parser.add_argument(
+        "--health-check-interval",
+        type=float,
+        default=30.0,
+        help="The number of seconds between health checks of the remote WebDriver endpoints",
+    )
+    parser.add_argument(
+        "--recycle-after-works",
+        type=int,
+        help="Restart a browser session after it has created this many works",
+    )
+    parser.add_argument(
+        "--recycle-rss-mib",
+        type=int,
+        help="Restart a local browser session once the memory of its process tree exceeds this many MiB",
+    )
+    parser.add_argument(
+        "--ledger",
+        default=LEDGER_FILE,
+        help="The SQLite database recording the works which already exist",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        metavar="PATH",
+        help="Write the counters and phase latency histograms of the run to this file in the Prometheus text format",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        metavar="PATH",
+        help="Write a JSON summary of the works per minute and the latency of each phase of the run to this file",
+    )
+    parser.add_argument(
+        "--history",
+        default=HISTORY_FILE,
+        help="The SQLite database recording the timing of every run",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=int,
+        help='The ID of the run with which the "compare" command compares the latest run, by default the previous run of the same command and series',
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help='The significance level at which the "compare" command flags a slower phase',
+    )
+    parser.add_argument(
+        "--min-slowdown",
+        type=float,
+        default=0.1,
+        help='The fraction by which the mean latency of a phase must rise for the "compare" command to flag it',
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Show a progress line with the works per minute and the estimated time remaining",
+    )
+    parser.add_argument(
+        "--subtitle-store",
+        metavar="PATH",
+        help='The SQLite file into which the "import_subtitles" command moves the subtitles, next to the series file by default',
+    )
+    parser.add_argument(
+        "--stream",
+        metavar="PATH",
+        help='Read the works to create as NDJSON from a file or FIFO, or from standard input with "-", and create each one as soon as it arrives instead of the range of the series file',
+    )
+    parser.add_argument(
+        "--no-ledger",
+        action="store_true",
+        help="Create every work without checking the ledger for existing works",
+    )
+    parser.add_argument(
+        "--sync-ledger",
+        action="store_true",
+        help="Record the works which are already part of each series in the ledger before creating any works",
+    )
+    parser.add_argument(
+        "--api-workers",
+        type=int,
+        default=8,
+        help="The number of concurrent requests to the BookBrainz API",
+    )
+    parser.add_argument(
+        "--musicbrainz-cache-ttl",
+        type=float,
+        default=86_400.0,
+        help="The number of seconds for which responses from the MusicBrainz web service are cached",
+    )
+    parser.add_argument(
+        "--musicbrainz-dump-index",
+        default=MUSICBRAINZ_DUMP_INDEX_FILE,
+        help="The index of MusicBrainz series built by the index_musicbrainz_dump command, which is used instead of the MusicBrainz web service when it exists",
+    )
+    parser.add_argument(
+        "--no-preflight",
+        action="store_true",
+        help="Skip resolving the relationship targets through the BookBrainz API before starting the browser",
+    )
+    args = parser.parse_args()
+
+    MUSICBRAINZ_SERVER = args.musicbrainz_server.rstrip("/")
+    METRICS.textfile = args.metrics_textfile
+    METRICS.json_path = args.metrics_json
+    METRICS.progress = args.progress
+
+    if args.range_start and not args.range_end:
+        logger.error(
+            'Given option "--range-start" but missing option "--range-end". Pleas supply the "--range-end" option.'
+        )
+        exit(1)
+
+    if args.range is not None and (args.range_start or args.range_end):
+        logger.error(
+            'The "--range" option can\'t be combined with "--range-start" and "--range-end".'
+        )
+        exit(1)
+
+    for rate_limit in args.rate_limit:
+        host, _, rate = rate_limit.partition("=")
+        try:
+            RATE_LIMITER.set_rate(host, float(rate))
+        except ValueError:
+            logger.error(
+                f'Invalid rate limit "{rate_limit}". Please supply it in the form HOST=RATE.'
+            )
+            exit(1)
+
+    if args.command in ["enqueue", "work", "queue_status"] and args.queue is None:
+        logger.error(
+            f'The "{args.command}" command requires the queue database. Please supply it with the "--queue" option.'
+        )
+        exit(1)
+
+    # Compare the latest run with a baseline run to find slower phases
+    if args.command == "compare":
+        history = RunHistory(args.history)
+        latest = history.run()
+        if latest is None:
+            logger.error("There are no runs in the history to compare.")
+            exit(1)
+        baseline = (
+            history.previous(latest)
+            if args.baseline is None
+            else history.run(args.baseline)
+        )
+        if baseline is None:
+            logger.error(f"There's no baseline run to compare with run {latest['id']}.")
+            exit(1)
+        report = compare_runs(baseline, latest, args.alpha, args.min_slowdown)
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        if report["slower"]:
+            exit(1)
+        return
+
+    # Move the subtitles of series files into subtitle stores, or write them inline again
+    if args.command in ["import_subtitles", "export_subtitles"]:
+        if len(args.filenames) != 1:
+            logger.error(f'The "{args.command}" command requires a single series file.')
+            exit(1)
+        if args.command == "import_subtitles":
+            imported = import_subtitles(args.filenames[0], args.subtitle_store)
+            for part, count in imported.items():
+                print(
+                    f"{args.filenames[0]}: Moved the {part} subtitles of {count} indices"
+                )
+        else:
+            print(
+                json.dumps(
+                    export_subtitles(args.filenames[0]), indent=2, ensure_ascii=False
+                )
+            )
+        return
+
+    # Index the works of each series in MusicBrainz JSON dumps
+    if args.command == "index_musicbrainz_dump":
+        if not args.filenames:
+            logger.error(
+                'The "index_musicbrainz_dump" command requires the MusicBrainz JSON dumps, such as series.tar.xz or work.tar.xz.'
+            )
+            exit(1)
+        index = MusicBrainzDumpIndex(args.musicbrainz_dump_index)
+        for filename in args.filenames:
+            counts = index.index_dump(filename)
+            print(
+                f"{filename}: Indexed {counts['works']} series works from {counts['entities']} entities"
+            )
+        return
+
+    if args.stream is not None and args.command not in [
+        "add_bookbrainz_work_series",
+        "add_musicbrainz_work_series",
+        "add_musicbrainz_release_group_series",
+    ]:
+        logger.error(
+            'The "--stream" option only applies to the "add_bookbrainz_work_series", "add_musicbrainz_work_series", and "add_musicbrainz_release_group_series" commands.'
+        )
+        exit(1)
+
+    if args.command == "queue_status":
+        print(json.dumps(WorkQueue(args.queue).status(), indent=2, ensure_ascii=False))
+        return
+
+    username = None
+    if args.command in [
+        "add_bookbrainz_work_series",
+        "batch",
+        "work",
+        "update_bookbrainz_work_series",
+        "add_musicbrainz_work_series",
+        "add_musicbrainz_release_group_series",
+    ]:
+        username = args.username
+        if username is None:
+            username = os.environ.get("MUSICBRAINZ_USERNAME")
+        if username is None:
+            logger.error(
+                'Missing MusicBrainz username. Please supply it with the "--username" flag or the "MUSICBRAINZ_USERNAME" environment variable.'
+            )
+            exit(1)
+
+        if os.environ.get("MUSICBRAINZ_PASSWORD") is None:
+            logger.error(
+                'Missing MusicBrainz password. Please supply it through the "MUSICBRAINZ_PASSWORD" environment variable.'
+            )
+            exit(1)
+
+    filenames = args.filenames
+    if args.command == "work":
+        filenames = []
+    elif args.command in [
+        "batch",
+        "enqueue",
+        "verify",
+        "update_bookbrainz_work_series",
+    ]:
+        filenames = []
+        for pattern in args.filenames:
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                logger.error(f"No series files match {pattern}")
+                exit(1)
+            filenames.extend(matches)
+        if not filenames:
+            logger.error(
+                f'The "{args.command}" command requires at least one series file.'
+            )
+            exit(1)
+    elif not filenames:
+        filenames = [
+            os.path.join(os.path.dirname(os.path.realpath(__file__)), "data.json")
+        ]
+    elif len(filenames) > 1:
+        logger.error(
+            f'The "{args.command}" command accepts a single series file. Use the "batch" command for several.'
+        )
+        exit(1)
+
+    entity = {
+        "add_musicbrainz_work_series": "musicbrainz_work",
+        "add_musicbrainz_release_group_series": "musicbrainz_release_group",
+    }.get(args.command, "bookbrainz_work")
+    # The ledger is opened before the series files are loaded when the range selects the missing works.
+    ledger = None
+    if (
+        args.range is not None
+        and "missing" in args.range
+        and not args.no_ledger
+        and args.command != "update_bookbrainz_work_series"
+    ):
+        ledger = Ledger(args.ledger)
+
+    series_list = []
+    for filename in filenames:
+        try:
+            data = load_series(filename)
+        except FileNotFoundError:
+            logger.error(f"Failed to open the file {filename}")
+            exit(1)
+        data = prepare_series(data)
+        range_ = []
+        if args.stream is None:
+            range_ = series_range(data, args.range_start, args.range_end)
+        if args.stream is None and args.range is not None:
+            try:
+                range_ = select_range(
+                    range_,
+                    args.range,
+                    missing=None
+                    if ledger is None
+                    else lambda i, data=data: (
+                        ledger.existing(data, i, entity, ENTITY_CREATORS[entity][1])
+                        is None
+                    ),
+                )
+            except ValueError as error:
+                logger.error(f"{filename}: {error}")
+                exit(1)
+        name = os.path.splitext(os.path.basename(filename))[0]
+        series_list.append((name, data, range_))
+
+    # Check every series file before anything is fetched or any browser is started
+    invalid = False
+    for name, data, range_ in series_list:
+        for problem in validate_series(data, range_):
+            logger.error(f"{name}: {problem}")
+            invalid = True
+    if invalid:
+        exit(1)
+
+    # Resolve every relationship target before any browser is started so that invalid IDs fail early
+    if (
+        args.command
+        in [
+            "add_bookbrainz_work_series",
+            "batch",
+            "enqueue",
+            "update_bookbrainz_work_series",
+        ]
+        and not args.no_preflight
+    ):
+        invalid = resolve_bookbrainz_relationship_targets(
+            BookBrainzApi(pool_size=args.api_workers),
+            series_list,
+            workers=args.api_workers,
+        )
+        for bbid, role, name in invalid:
+            logger.error(
+                f"{name}: The {role} {bbid} doesn't exist as a BookBrainz {BOOKBRAINZ_RELATIONSHIP_TARGET_TYPE[role]}"
+            )
+        if invalid:
+            exit(1)
+
+    # Look up the works in the MusicBrainz series so that works are linked to their MusicBrainz counterparts without copying their IDs by hand
+    musicbrainz_api = None
+    if args.command in [
+        "add_bookbrainz_work_series",
+        "batch",
+        "enqueue",
+        "add_musicbrainz_work_series",
+    ]:
+        musicbrainz_api = MusicBrainzApi(ttl=args.musicbrainz_cache_ttl)
+        if os.path.exists(args.musicbrainz_dump_index):
+            musicbrainz_api = MusicBrainzDumpIndex(
+                args.musicbrainz_dump_index, fallback=musicbrainz_api
+            )
+        for _, data, range_ in series_list:
+            fill_musicbrainz_work_identifiers(musicbrainz_api, data, range_)
+
+    # Compare the works of each series on BookBrainz with the planned works
+    if args.command == "verify":
+        api = BookBrainzApi(pool_size=args.api_workers)
+        report = {}
+        for name, data, range_ in series_list:
+            report[name] = verify_bookbrainz_work_series(
+                api, data, range_, workers=args.api_workers
+            )
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        if any(
+            part["missing"] or part["duplicate"] or part["mismatched"]
+            for diff in report.values()
+            for part in diff.values()
+        ):
+            exit(1)
+        return
+
+    # Put the works of each series in the shared queue for workers to create
+    if args.command == "enqueue":
+        work_queue = WorkQueue(args.queue)
+        for name, data, range_ in series_list:
+            added = work_queue.enqueue(name, data, range_, args.entity)
+            print(f"{name}: Queued {added} of {len(range_)} works")
+
+    # Create a series of BookBrainz works with their translated works
+    if args.command in [
+        "add_bookbrainz_work_series",
+        "batch",
+        "work",
+        "update_bookbrainz_work_series",
+        "add_musicbrainz_work_series",
+        "add_musicbrainz_release_group_series",
+    ]:
+        if (
+            ledger is None
+            and not args.no_ledger
+            and args.command != "update_bookbrainz_work_series"
+        ):
+            ledger = Ledger(args.ledger)
+            if args.sync_ledger:
+                api = BookBrainzApi()
+                for name, data, _ in series_list:
+                    recorded = sync_ledger(ledger, api, data)
+                    print(f"{name}: Found {recorded} existing works")
+        endpoints = None
+        if args.remote_webdriver:
+            endpoints = EndpointPool(
+                args.remote_webdriver,
+                health_check_interval=args.health_check_interval,
+            )
+        pool = SessionPool(
+            size=args.workers,
+            headless=not args.no_headless,
+            username=username,
+            endpoints=endpoints,
+            recycle_after_works=args.recycle_after_works,
+            recycle_rss=args.recycle_rss_mib * 1_048_576
+            if args.recycle_rss_mib
+            else None,
+            log_in=musicbrainz_log_in_session
+            if args.command
+            in ["add_musicbrainz_work_series", "add_musicbrainz_release_group_series"]
+            else None,
+            browser=args.browser,
+        )
+        controller = ConcurrencyController(
+            args.workers,
+            initial=1 if args.adaptive else args.workers,
+            minimum=1 if args.adaptive else args.workers,
+            target_latency=args.target_latency,
+        )
+        try:
+            if args.command == "update_bookbrainz_work_series":
+                results = run_bookbrainz_work_updates(
+                    series_list,
+                    pool,
+                    BookBrainzApi(pool_size=args.api_workers),
+                    username=username,
+                    controller=controller,
+                    api_workers=args.api_workers,
+                )
+                print_update_summary(results)
+                if args.progress:
+                    print(file=sys.stderr)
+                if any(result["failed"] for result in results.values()):
+                    exit(1)
+                print("Complete")
+                return
+            pool.start()
+            if args.command == "work":
+                results = run_queue_worker(
+                    WorkQueue(args.queue),
+                    pool,
+                    username=username,
+                    controller=controller,
+                    lease_timeout=args.lease_timeout,
+                    max_attempts=args.max_attempts,
+                    ledger=ledger,
+                )
+            else:
+                items = None
+                if args.stream is not None:
+                    name, data, _ = series_list[0]
+                    items = read_work_stream(
+                        args.stream,
+                        name,
+                        data,
+                        prepare=None
+                        if musicbrainz_api is None
+                        else lambda data, i: fill_musicbrainz_work_identifiers(
+                            musicbrainz_api, data, [i]
+                        ),
+                    )
+                results = run_bookbrainz_work_series(
+                    series_list,
+                    pool,
+                    username=username,
+                    controller=controller,
+                    ledger=ledger,
+                    entity=entity,
+                    items=items,
+                )
+        finally:
+            pool.close()
+            METRICS.flush()
+            if METRICS.done():
+                RunHistory(args.history).record(
+                    args.command,
+                    [name for name, _, _ in series_list],
+                    args.workers,
+                    METRICS.summary(),
+                )
+        if args.progress:
+            print(file=sys.stderr)
+        print_series_summary(results)
+        if any(result["failed"] for result in results.values()):
+            exit(1)
 
-    driver.quit()
     print("Complete")
 
 
@@ -55,6 +55,8 @@
             with pkgs;
             [
               asciidoctor
+              chromedriver
+              chromium
               firefox
               fish
               geckodriver
@@ -65,6 +67,7 @@
               pyright
               python3Packages.platformdirs
               python3Packages.pykakasi
+              python3Packages.pytest
               python3Packages.python
               python3Packages.requests
               python3Packages.selenium
@@ -1,16 +1,29 @@
 #!/usr/bin/env python
 import argparse
+import bisect
+import bz2
+import concurrent.futures
 import json
 import logging
 import math
+import os
+import platformdirs
 import pykakasi
 import re
 import requests
+import sqlite3
+import threading
+import time
+import urllib.parse
 import wikitextparser as wtp
+import xml.etree.ElementTree as ET
 
 logger = logging.getLogger(__name__)
 
 APP_NAME = "parse_wikipedia_chapters"
+# Share the cache directory of DriverBrainz.
+CACHE_DIR = platformdirs.user_cache_dir(appname="DriverBrainz", appauthor=False)
+WIKIPEDIA_CACHE_FILE = os.path.join(CACHE_DIR, "wikipedia.sqlite")
 
 CHAPTER_PREFIX_DICTIONARY = {
     "chapter": {
@@ -127,29 +140,362 @@ def remove_extra_spaces_hiragana(input: str) -> str:
     return output
 
 
+# The wikitext of sections of a page.
+#
+# Section 0 is the lead and each section includes its subsections.
+# Without any section numbers, the whole page is returned as a single section.
+#
+# With the sections of the page from the MediaWiki parse API, sections are numbered exactly as in the section parameter of the API.
+# Otherwise, such as for pages from a dump, every heading in the wikitext starts a section.
+# That can number sections differently than the API when headings are inside comments, nowiki or pre tags, or templates, so check the section numbers of such pages.
+def split_sections(
+    page_title: str, wikitext: str, section_numbers: list, api_sections=None
+) -> list:
+    if not section_numbers:
+        return [wikitext]
+    if api_sections is not None:
+        return split_api_sections(page_title, wikitext, section_numbers, api_sections)
+    sections = wtp.parse(wikitext).sections
+    texts = []
+    for section_number in section_numbers:
+        if section_number >= len(sections):
+            logger.error(f"{page_title} doesn't have a section {section_number}")
+            texts.append("")
+        else:
+            texts.append(sections[section_number].string)
+    return texts
+
+
+# Split the wikitext of a page at the byte offsets of its sections from the MediaWiki parse API.
+#
+# Sections transcluded from templates have no offset in the page and aren't numbered.
+def split_api_sections(
+    page_title: str, wikitext: str, section_numbers: list, api_sections: list
+) -> list:
+    encoded = wikitext.encode("utf-8")
+    sections = sorted(
+        (int(section["byteoffset"]), int(section["level"]), int(section["index"]))
+        for section in api_sections
+        if section.get("byteoffset") is not None and str(section["index"]).isdigit()
+    )
+    spans = {0: (0, sections[0][0] if sections else len(encoded))}
+    for position, (start, level, index) in enumerate(sections):
+        end = next(
+            (
+                next_start
+                for next_start, next_level, _ in sections[position + 1 :]
+                if next_level <= level
+            ),
+            len(encoded),
+        )
+        spans[index] = (start, end)
+    texts = []
+    for section_number in section_numbers:
+        if section_number not in spans:
+            logger.error(f"{page_title} doesn't have a section {section_number}")
+            texts.append("")
+        else:
+            start, end = spans[section_number]
+            texts.append(encoded[start:end].decode("utf-8"))
+    return texts
+
+
+# A client for the wikitext of Wikipedia pages which reuses its connections and caches each page on disk.
+#
+# Whole pages are fetched through the REST API, so a whole chapter list article costs a single request.
+# Picking out sections costs one more request for the offsets of the sections of the revision, which are cached along with the page.
+# A cached page is revalidated with its ETag, which changes with each revision of the page, so an unchanged page isn't downloaded again.
+# Create a single client for a run so that its connections are reused.
+class WikipediaClient:
+    def __init__(self, cache_path: str = WIKIPEDIA_CACHE_FILE, pool_size: int = 8):
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4, pool_maxsize=pool_size
+        )
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = (
+            f"{APP_NAME} ( https://github.com/jwillikers/driverbrainz )"
+        )
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        self._cache = sqlite3.connect(cache_path, check_same_thread=False)
+        with self._cache:
+            self._cache.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pages (
+                    language_code TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    revision INTEGER,
+                    etag TEXT,
+                    fetched REAL NOT NULL,
+                    wikitext TEXT NOT NULL,
+                    sections TEXT,
+                    PRIMARY KEY (language_code, title)
+                )
+                """
+            )
+            # Caches written before the sections were cached lack the column.
+            columns = [
+                column[1] for column in self._cache.execute("PRAGMA table_info(pages)")
+            ]
+            if "sections" not in columns:
+                self._cache.execute("ALTER TABLE pages ADD COLUMN sections TEXT")
+
+    # The revision and the wikitext of a whole page.
+    def _page(self, title: str, language_code: str) -> tuple:
+        with self._lock:
+            cached = self._cache.execute(
+                "SELECT etag, revision, wikitext FROM pages WHERE language_code = ? AND title = ?",
+                (language_code, title),
+            ).fetchone()
+        headers = {}
+        if cached is not None and cached[0]:
+            headers["If-None-Match"] = cached[0]
+        response = self.session.get(
+            f"https://{language_code}.wikipedia.org/w/rest.php/v1/page/{urllib.parse.quote(title, safe='')}",
+            headers=headers,
+            timeout=30,
+        )
+        if response.status_code == 304 and cached is not None:
+            return cached[1], cached[2]
+        response.raise_for_status()
+        data = response.json()
+        revision = data.get("latest", {}).get("id")
+        with self._lock, self._cache:
+            self._cache.execute(
+                "INSERT OR REPLACE INTO pages (language_code, title, revision, etag, fetched, wikitext, sections) VALUES (?, ?, ?, ?, ?, ?, NULL)",
+                (
+                    language_code,
+                    title,
+                    revision,
+                    response.headers.get("ETag"),
+                    time.time(),
+                    data["source"],
+                ),
+            )
+        return revision, data["source"]
+
+    # The wikitext of a whole page.
+    def page(self, page_title: str, language_code: str = "en") -> str:
+        return self._page(page_title.replace(" ", "_"), language_code)[1]
+
+    # The sections of a revision of a page from the MediaWiki parse API, which never change and so are cached along with the page.
+    def _api_sections(self, title: str, revision: int, language_code: str) -> list:
+        with self._lock:
+            cached = self._cache.execute(
+                "SELECT sections FROM pages WHERE language_code = ? AND title = ? AND revision = ?",
+                (language_code, title, revision),
+            ).fetchone()
+        if cached is not None and cached[0] is not None:
+            return json.loads(cached[0])
+        response = self.session.get(
+            f"https://{language_code}.wikipedia.org/w/api.php",
+            params={
+                "action": "parse",
+                "oldid": revision,
+                "prop": "sections",
+                "format": "json",
+                "formatversion": 2,
+            },
+            timeout=30,
+        )
+        response.raise_for_status()
+        sections = response.json()["parse"]["sections"]
+        with self._lock, self._cache:
+            self._cache.execute(
+                "UPDATE pages SET sections = ? WHERE language_code = ? AND title = ? AND revision = ?",
+                (json.dumps(sections), language_code, title, revision),
+            )
+        return sections
+
+    # The wikitext of sections of a page, numbered as in the section parameter of the MediaWiki API.
+    def sections(
+        self, page_title: str, section_numbers: list, language_code: str = "en"
+    ) -> list:
+        title = page_title.replace(" ", "_")
+        revision, wikitext = self._page(title, language_code)
+        if not section_numbers:
+            return [wikitext]
+        return split_sections(
+            page_title,
+            wikitext,
+            section_numbers,
+            self._api_sections(title, revision, language_code),
+        )
+
+    # Fetch the sections of several pages at once.
+    #
+    # Returns the sections of each page in the order of the pages.
+    def fetch_many(
+        self, page_titles: list, section_numbers: list, language_code: str = "en"
+    ) -> list:
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.pool_size
+        ) as executor:
+            return list(
+                executor.map(
+                    lambda page_title: self.sections(
+                        page_title, section_numbers, language_code
+                    ),
+                    page_titles,
+                )
+            )
+
+
+# Titles are stored with spaces and an upper case first letter in the dumps.
+def normalize_title(page_title: str) -> str:
+    title = page_title.replace("_", " ").strip()
+    return title[:1].upper() + title[1:]
+
+
+# Reads pages from a local pages-articles-multistream.xml.bz2 dump of Wikipedia.
+#
+# The multistream dump is made up of separate bz2 streams of 100 pages each.
+# Its index lists the byte offset of the stream of every title, so only the streams of the requested pages are decompressed.
+# Reading the index is the slow part, so request every page at once with pages.
+class WikipediaDump:
+    def __init__(self, dump_path: str, index_path=None, workers: int = 4):
+        self.dump_path = dump_path
+        if index_path is None:
+            index_path = dump_path.replace(".xml.bz2", "-index.txt.bz2")
+        self.index_path = index_path
+        self.workers = workers
+
+    # The offsets of the streams which contain the given titles.
+    def offsets(self, titles: set) -> dict:
+        offsets = {}
+        with bz2.open(self.index_path, "rt", encoding="utf-8") as index:
+            for line in index:
+                offset, _page_id, title = line.rstrip("\n").split(":", 2)
+                if title in titles:
+                    offsets[title] = int(offset)
+                    if len(offsets) == len(titles):
+                        break
+        return offsets
+
+    # The pages of the stream at the offset as a dictionary of titles and wikitext.
+    def stream(self, offset: int) -> dict:
+        decompressor = bz2.BZ2Decompressor()
+        chunks = []
+        with open(self.dump_path, "rb") as dump:
+            dump.seek(offset)
+            while not decompressor.eof:
+                data = dump.read(1 << 18)
+                if not data:
+                    break
+                chunks.append(decompressor.decompress(data))
+        root = ET.fromstring(b"<pages>" + b"".join(chunks) + b"</pages>")
+        return {
+            page.findtext("title"): page.findtext("revision/text") or ""
+            for page in root.iter("page")
+        }
+
+    # The wikitext of each of the pages, which is missing for the pages which aren't in the dump.
+    def pages(self, page_titles: list) -> dict:
+        titles = {normalize_title(page_title) for page_title in page_titles}
+        offsets = self.offsets(titles)
+        for title in titles - offsets.keys():
+            logger.error(f"{title} isn't in the dump {self.dump_path}")
+        wikitexts = {}
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.workers
+        ) as executor:
+            for stream in executor.map(self.stream, set(offsets.values())):
+                wikitexts.update(
+                    (title, wikitext)
+                    for title, wikitext in stream.items()
+                    if title in titles
+                )
+        return {
+            page_title: wikitexts[normalize_title(page_title)]
+            for page_title in page_titles
+            if normalize_title(page_title) in wikitexts
+        }
+
+    # Fetch the sections of several pages at once, just like WikipediaClient.
+    #
+    # The language of the dump is fixed, so the language code is ignored.
+    def fetch_many(
+        self, page_titles: list, section_numbers: list, language_code: str = "en"
+    ) -> list:
+        wikitexts = self.pages(page_titles)
+        return [
+            split_sections(page_title, wikitexts[page_title], section_numbers)
+            if page_title in wikitexts
+            else []
+            for page_title in page_titles
+        ]
+
+
+# The client shared by the calls of fetch_wikipedia_section which aren't given a client, created on first use.
+WIKIPEDIA_CLIENT = None
+WIKIPEDIA_CLIENT_LOCK = threading.Lock()
+
+
 def fetch_wikipedia_section(
-    page_title: str, section_number: int, language_code: str = "en"
+    page_title: str, section_number: int, language_code: str = "en", client=None
 ) -> str:
-    url = f"https://{language_code}.wikipedia.org/w/api.php?action=parse&page={page_title}&section={section_number}&contentmodel=wikitext&prop=wikitext&format=json"
-    response = requests.get(url, timeout=10)
-    response.raise_for_status()
-    data = response.json()
-    if "parse" not in data:
-        return ""
-    return data["parse"]["wikitext"]["*"]
+    global WIKIPEDIA_CLIENT
+    if client is None:
+        with WIKIPEDIA_CLIENT_LOCK:
+            if WIKIPEDIA_CLIENT is None:
+                WIKIPEDIA_CLIENT = WikipediaClient()
+        client = WIKIPEDIA_CLIENT
+    return client.sections(page_title, [section_number], language_code)[0]
+
 
+# The templates of a parsed page in the order of where they start, for looking up the templates within a span with a binary search.
+#
+# Spans are positions in the wikitext of the whole page.
+# The name of each template is only normalized once.
+class TemplateIndex:
+    def __init__(self, parsed):
+        self.templates = parsed.templates
+        self.spans = [template.span for template in self.templates]
+        self.starts = [start for start, _end in self.spans]
+        self.normal_names = [template.normal_name() for template in self.templates]
+
+    # The templates within the span, including nested templates, with one of the normalized names when given.
+    def within(self, span: tuple, normal_names=None):
+        start, end = span
+        for i in range(
+            bisect.bisect_right(self.starts, start),
+            bisect.bisect_left(self.starts, end),
+        ):
+            if self.spans[i][1] <= end and (
+                normal_names is None or self.normal_names[i] in normal_names
+            ):
+                yield self.templates[i]
+
+    # The first template which lies entirely within the span.
+    def first_within(self, span: tuple):
+        start, end = span
+        for i in range(
+            bisect.bisect_left(self.starts, start), bisect.bisect_left(self.starts, end)
+        ):
+            if self.spans[i][1] <= end:
+                return self.templates[i]
+        return None
 
-def filter_templates_by_normal_name(templates: list, normal_names: list):
-    for template in templates:
-        if template.normal_name() in normal_names:
-            yield template
+    # The templates of the page with one of the normalized names.
+    def named(self, normal_names: list):
+        return self.within((-1, math.inf), normal_names)
 
 
-def find_template_where_string_contains(templates: list, container: str):
-    for template in templates:
-        if template.string in container:
-            return template
-    return None
+# The spans of the items of a list.
+#
+# The items are found in order in the wikitext of the list, so the whole list is only searched once.
+def item_spans(wiki_list) -> list:
+    offset = wiki_list.span[0]
+    string = wiki_list.string
+    spans = []
+    cursor = 0
+    for item in wiki_list.items:
+        start = string.find(item, cursor)
+        cursor = start + len(item)
+        spans.append((offset + start, offset + cursor))
+    return spans
 
 
 def parse_chapter_from_template_and_item(template, item: str) -> dict:
@@ -185,24 +531,25 @@ def parse_chapter_from_template_and_item(template, item: str) -> dict:
         else:
             # Assume it is a regular chapter
             chapter_type = "Chapter"
-    english = template.arguments[0].value
+    arguments = template.arguments
+    english = arguments[0].value
     if english.startswith('"') and english.endswith('"'):
         english = english.strip('"')
     # todo Fix spaces in Japanese conversion
     # todo Replace double quotes with unicode counterparts
     # logger.info(f"english: {english}")
     english = use_unicode_punctuation(english)
-    if len(template.arguments) == 1:
+    if len(arguments) == 1:
         chapter["type"] = chapter_type
         chapter["index"] = index
         chapter["english"] = english
         chapter["kanji"] = english
         chapter["hepburn"] = english
-    elif len(template.arguments) == 2:
+    elif len(arguments) == 2:
         chapter["type"] = chapter_type
         chapter["index"] = index
         chapter["english"] = english
-        chapter["kanji"] = use_unicode_punctuation(template.arguments[1].value)
+        chapter["kanji"] = use_unicode_punctuation(arguments[1].value)
         chapter["hepburn"] = english
     else:
         # print(f"english: {english}")
@@ -210,10 +557,8 @@ def parse_chapter_from_template_and_item(template, item: str) -> dict:
         chapter["type"] = chapter_type
         chapter["index"] = index
         chapter["english"] = english
-        chapter["kanji"] = use_unicode_punctuation(template.arguments[1].value)
-        chapter["hepburn"] = use_unicode_punctuation(template.arguments[2].value).strip(
-            '"'
-        )
+        chapter["kanji"] = use_unicode_punctuation(arguments[1].value)
+        chapter["hepburn"] = use_unicode_punctuation(arguments[2].value).strip('"')
     return chapter
 
 
@@ -263,66 +608,65 @@ def parse_chapter_from_item(item: str) -> dict:
 def parse_chapter_from_template(template, index: int = -1) -> dict:
     chapter = {}
     chapter_type = "Chapter"
-    english = template.arguments[0].value
+    arguments = template.arguments
+    english = arguments[0].value
     if english.startswith('"') and english.endswith('"'):
         english = english.strip('"')
     english = use_unicode_punctuation(english)
-    if len(template.arguments) == 1:
+    if len(arguments) == 1:
         chapter["type"] = chapter_type
         chapter["index"] = index if index >= 0 else None
         chapter["english"] = english
         chapter["kanji"] = english
         chapter["hepburn"] = english
-    elif len(template.arguments) == 2:
+    elif len(arguments) == 2:
         chapter["type"] = chapter_type
         chapter["index"] = index if index >= 0 else None
         chapter["english"] = english
-        chapter["kanji"] = use_unicode_punctuation(template.arguments[1].value)
+        chapter["kanji"] = use_unicode_punctuation(arguments[1].value)
         chapter["hepburn"] = english
     else:
         chapter["type"] = chapter_type
         chapter["index"] = index if index >= 0 else None
         chapter["english"] = english
-        chapter["kanji"] = use_unicode_punctuation(template.arguments[1].value)
-        chapter["hepburn"] = use_unicode_punctuation(template.arguments[2].value)
+        chapter["kanji"] = use_unicode_punctuation(arguments[1].value)
+        chapter["hepburn"] = use_unicode_punctuation(arguments[2].value)
     return chapter
 
 
+# Parse the chapters of a page in a single pass over its templates.
+#
+# The template of each list item is looked up by its position in the TemplateIndex instead of comparing the item with every template of the list.
 def parse_wikipedia_page(wikitext: str) -> list:
     parsed = wtp.parse(wikitext)
-    graphic_novel_lists = filter_templates_by_normal_name(
-        parsed.templates, ["Graphic novel list", "Volume Manga", "Numbered list"]
-    )
+    templates = TemplateIndex(parsed)
     chapters = []
-    for graphic_novel_list in graphic_novel_lists:
-        lists = graphic_novel_list.get_lists()
-        for row in lists:
-            for index, item in enumerate(row.items):
-                template = find_template_where_string_contains(row.templates, item)
-                chapter = {}
+    kanji = set()
+    for graphic_novel_list in templates.named(
+        ["Graphic novel list", "Volume Manga", "Numbered list"]
+    ):
+        for row in graphic_novel_list.get_lists():
+            for item, span in zip(row.items, item_spans(row)):
+                template = templates.first_within(span)
                 if template is None:
                     chapter = parse_chapter_from_item(item)
                 else:
                     chapter = parse_chapter_from_template_and_item(template, item)
                 chapters.append(chapter)
+                kanji.add(chapter["kanji"])
         if graphic_novel_list.normal_name() in ["Graphic novel list", "Volume Manga"]:
-            templates = filter_templates_by_normal_name(
-                graphic_novel_list.templates, ["Nihongo", "nihongo", "nihongo4"]
-            )
-            for index, template in enumerate(templates):
+            for template in templates.within(
+                graphic_novel_list.span, ["Nihongo", "nihongo", "nihongo4"]
+            ):
                 chapter = parse_chapter_from_template(
                     template, 1 if len(chapters) == 0 else -1
                 )
                 # This assumes that chapter names are not repeated, which may not always be the case.
-                if chapter["kanji"] not in [
-                    c.get("kanji") for c in chapters if "kanji" in c
-                ]:
+                if chapter["kanji"] not in kanji:
                     chapters.append(chapter)
+                    kanji.add(chapter["kanji"])
     if len(chapters) == 0:
-        numbered_lists = filter_templates_by_normal_name(
-            parsed.templates, ["Numbered list"]
-        )
-        for numbered_list in numbered_lists:
+        for numbered_list in templates.named(["Numbered list"]):
             start_index = None
             if numbered_list.get_arg("start"):
                 value = numbered_list.get_arg("start").value.strip()
@@ -331,8 +675,8 @@ def parse_wikipedia_page(wikitext: str) -> list:
                     if value.is_integer():
                         value = int(value)
                     start_index = value
-            nihongo_templates = filter_templates_by_normal_name(
-                numbered_list.templates, ["Nihongo", "nihongo", "nihongo4"]
+            nihongo_templates = templates.within(
+                numbered_list.span, ["Nihongo", "nihongo", "nihongo4"]
             )
             for template_index, template in enumerate(nihongo_templates):
                 index: int = -1
@@ -616,39 +960,168 @@ def convert_chapters_for_driverbrainz(chapters: list) -> dict:
     return converted
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        prog="parse_wikipedia_chapters.py",
-        description="Parse chapters from Wikipedia",
-    )
-    parser.add_argument("page_title")
-    parser.add_argument("section_number", type=int)
-    parser.add_argument("--use-brackets-japanese", action="store_true")
-    parser.add_argument("--english-chapter-prefix", type=str)
-    parser.add_argument("--wikipedia-language-code", type=str, default="en")
-    args = parser.parse_args()
-    wikitext = fetch_wikipedia_section(
-        args.page_title, args.section_number, language_code=args.wikipedia_language_code
-    )
-    chapters = parse_wikipedia_page(wikitext)
+# Parse the chapters of the sections of each page and convert them for DriverBrainz.
+def chapters_from_sections(
+    pages: list, use_brackets_japanese: bool, english_chapter_prefix: str
+) -> tuple:
+    chapters = [
+        chapter
+        for sections in pages
+        for wikitext in sections
+        for chapter in parse_wikipedia_page(wikitext)
+    ]
     # print(chapters)
     chapters = generate_missing_chapter_indices(chapters)
     chapters = generate_kana(chapters)
     chapters = prefix_chapter_titles(
-        chapters, args.use_brackets_japanese, args.english_chapter_prefix
+        chapters, use_brackets_japanese, english_chapter_prefix
     )
-    converted_chapters = convert_chapters_for_driverbrainz(chapters)
+    return chapters, convert_chapters_for_driverbrainz(chapters)
+
+
+def print_chapters(chapters: list, converted_chapters: dict, ndjson: bool, file=None):
+    if ndjson:
+        for index, subtitles in converted_chapters.items():
+            print(
+                json.dumps(
+                    {"index": index, "original": {"subtitles": subtitles}},
+                    ensure_ascii=False,
+                ),
+                file=file,
+                flush=True,
+            )
+        return
     chapters_json = json.dumps(
         {"subtitles": converted_chapters}, indent=2, ensure_ascii=False
     )
-    print(chapters_json)
+    print(chapters_json, file=file)
     the_range = [str(chapter["index"]) for chapter in chapters]
     # the_range = []
     # for chapter in [chapter['index'] for chapter in chapters]:
     #     if not chapter.is_integer():
     #         the_range.append(str(chapter))
     the_range_json = json.dumps({"range": the_range}, ensure_ascii=False)
-    print(the_range_json)
+    print(the_range_json, file=file)
+
+
+# Parse the chapters of every series in a manifest from a dump.
+#
+# Each line of the manifest is a JSON object with the page_title, the section_numbers, any further pages, and the output file of a series.
+# The pages of every series are read from the dump at once.
+# A series with a page which isn't in the dump is skipped rather than written without its chapters.
+# Returns the page titles of the skipped series.
+def parse_manifest(dump: WikipediaDump, manifest_path: str, args) -> list:
+    with open(manifest_path, encoding="utf-8") as manifest:
+        entries = [json.loads(line) for line in manifest if line.strip()]
+    wikitexts = dump.pages(
+        [
+            page_title
+            for entry in entries
+            for page_title in [entry["page_title"], *entry.get("pages", [])]
+        ]
+    )
+    skipped = []
+    for entry in entries:
+        page_titles = [entry["page_title"], *entry.get("pages", [])]
+        missing = [
+            page_title for page_title in page_titles if page_title not in wikitexts
+        ]
+        if missing:
+            for page_title in missing:
+                logger.error(
+                    f"Skipping {entry['output']}: The page {page_title} isn't in the dump"
+                )
+            skipped.append(entry["page_title"])
+            continue
+        pages = [
+            split_sections(
+                page_title, wikitexts[page_title], entry.get("section_numbers", [])
+            )
+            for page_title in page_titles
+        ]
+        chapters, converted_chapters = chapters_from_sections(
+            pages,
+            entry.get("use_brackets_japanese", args.use_brackets_japanese),
+            entry.get("english_chapter_prefix", args.english_chapter_prefix),
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(entry["output"])), exist_ok=True)
+        with open(entry["output"], "w", encoding="utf-8") as output:
+            print_chapters(chapters, converted_chapters, args.ndjson, output)
+        logger.info(f"Wrote {len(chapters)} chapters of {entry['page_title']}")
+    return skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="parse_wikipedia_chapters.py",
+        description="Parse chapters from Wikipedia",
+    )
+    parser.add_argument("page_title", nargs="?")
+    parser.add_argument(
+        "section_numbers",
+        metavar="section_number",
+        type=int,
+        nargs="*",
+        help="The sections of the page which list the chapters, or the whole page when none are given",
+    )
+    parser.add_argument(
+        "--page",
+        action="append",
+        default=[],
+        help="Another page from which to parse the same sections, such as the next page of a long list of chapters",
+    )
+    parser.add_argument("--use-brackets-japanese", action="store_true")
+    parser.add_argument("--english-chapter-prefix", type=str)
+    parser.add_argument("--wikipedia-language-code", type=str, default="en")
+    parser.add_argument(
+        "--ndjson",
+        action="store_true",
+        help="Print each chapter on its own line for the --stream option of DriverBrainz",
+    )
+    parser.add_argument(
+        "--dump",
+        help="Read the pages from a local pages-articles-multistream.xml.bz2 dump of Wikipedia instead",
+    )
+    parser.add_argument(
+        "--dump-index",
+        help="The index of the dump, which defaults to the pages-articles-multistream-index.txt.bz2 file next to the dump",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Parse every series listed in this file from the dump, one JSON object per line",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.manifest is not None:
+        if args.dump is None:
+            logger.error("The --manifest option requires --dump")
+            exit(1)
+        skipped = parse_manifest(
+            WikipediaDump(args.dump, args.dump_index), args.manifest, args
+        )
+        if skipped:
+            logger.error(
+                f"Skipped {len(skipped)} series of the manifest: {', '.join(skipped)}"
+            )
+            exit(1)
+        return
+    if args.page_title is None:
+        logger.error("A page title is required without --manifest")
+        exit(1)
+    source = (
+        WikipediaClient()
+        if args.dump is None
+        else WikipediaDump(args.dump, args.dump_index)
+    )
+    pages = source.fetch_many(
+        [args.page_title, *args.page],
+        args.section_numbers,
+        language_code=args.wikipedia_language_code,
+    )
+    chapters, converted_chapters = chapters_from_sections(
+        pages, args.use_brackets_japanese, args.english_chapter_prefix
+    )
+    print_chapters(chapters, converted_chapters, args.ndjson)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+import driverbrainz
+
+SERIES = {
+    "original": {
+        "bookbrainz_work": {
+            "series": [{"id": "S1"}],
+            "relationships": [{"role": "writer", "id": "A1"}],
+        }
+    },
+    "translation": {"bookbrainz_work": {}},
+}
+
+
+class FakeApi:
+    def __init__(self, entities):
+        self.entities = entities
+        self.paths = []
+
+    def get(self, path):
+        self.paths.append(path)
+        return self.entities.get(path)
+
+
+@pytest.fixture
+def entities(tmp_path, monkeypatch):
+    monkeypatch.setattr(driverbrainz, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        driverbrainz, "ENTITIES_CACHE_FILE", str(tmp_path / "entities.json")
+    )
+    monkeypatch.setattr(driverbrainz, "BOOKBRAINZ_ENTITIES", {})
+    return driverbrainz.BOOKBRAINZ_ENTITIES
+
+
+def test_targets_are_resolved_once_until_they_expire(entities):
+    api = FakeApi(
+        {
+            "series/s1": {"defaultAlias": {"name": "Series"}},
+            "author/a1": {"defaultAlias": {"name": "Author"}},
+        }
+    )
+    series_list = [("series", SERIES, [])]
+    assert driverbrainz.resolve_bookbrainz_relationship_targets(api, series_list) == []
+    assert sorted(api.paths) == ["author/a1", "series/s1"]
+    assert entities["s1"]["name"] == "Series"
+    assert entities["a1"]["type"] == "author"
+
+    api.paths.clear()
+    driverbrainz.resolve_bookbrainz_relationship_targets(api, series_list)
+    assert api.paths == []
+
+    entities["a1"]["fetched"] = time.time() - 2 * 86_400
+    driverbrainz.resolve_bookbrainz_relationship_targets(api, series_list)
+    assert api.paths == ["author/a1"]
+
+
+def test_deleted_target_is_dropped_from_the_cache(entities):
+    api = FakeApi({"series/s1": {"defaultAlias": {"name": "Series"}}})
+    entities["a1"] = {"type": "author", "name": "Author", "fetched": 0}
+    invalid = driverbrainz.resolve_bookbrainz_relationship_targets(
+        api, [("series", SERIES, [])]
+    )
+    assert invalid == [("a1", "writer", "series")]
+    assert "a1" not in entities
+
+
+def test_selecting_an_entity_of_the_wrong_type_fails_early(entities):
+    entities["a1"] = {"type": "author", "name": "Author", "fetched": time.time()}
+    with pytest.raises(RuntimeError):
+        driverbrainz.bookbrainz_select_entity(None, None, "A1", "series")
+
+
+def test_xpath_string_quotes_any_text():
+    assert driverbrainz.xpath_string("Dandadan") == "'Dandadan'"
+    assert driverbrainz.xpath_string("Hell's Paradise") == '"Hell\'s Paradise"'
+    assert (
+        driverbrainz.xpath_string("'a\" b'") == "concat('', \"'\", 'a\" b', \"'\", '')"
+    )
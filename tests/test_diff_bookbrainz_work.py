@@ -0,0 +1,150 @@
+import driverbrainz
+
+WORK = {
+    "titles": [
+        {
+            "text": "かぐや様は告らせたい 第|index|話",
+            "sort": "COPY",
+            "language": "Japanese",
+            "script": "Kanji",
+        },
+        {
+            "text": "Kaguya-sama wa Kokurasetai Chapter |index|",
+            "sort": "Kaguya-sama wa Kokurasetai Chapter |index|",
+            "language": "Japanese",
+            "script": "Latin",
+        },
+        {
+            "text": "Kaguya-sama: Love Is War Chapter |index|",
+            "sort": "Kaguya-sama: Love Is War Chapter |index|",
+            "language": "English",
+            "script": "Latin",
+        },
+    ],
+    "relationships": [
+        {"role": "writer", "id": "https://bookbrainz.org/author/AAAA"},
+    ],
+}
+
+# The work as the BookBrainz API returns it once it matches the planned work, with the languages of the aliases as codes.
+DETAILS = {
+    "defaultAlias": {
+        "name": "かぐや様は告らせたい 第1話",
+        "sortName": "かぐや様は告らせたい 第1話",
+        "language": "jpn",
+    },
+    "languages": ["Japanese"],
+}
+# The relationships of the work as BookBrainzApi.related_links returns them.
+RELATED = {("aaaa", "wrote", None), ("aaaa", "was written by", None)}
+ALIASES = {
+    "aliases": [
+        {"name": "かぐや様は告らせたい 第1話", "language": "jpn"},
+        {
+            "name": "Kaguya-sama wa Kokurasetai Chapter 1",
+            "sortName": "Kaguya-sama wa Kokurasetai Chapter 1",
+            "language": "jpn",
+        },
+        {
+            "name": "Kaguya-sama: Love Is War Chapter 1",
+            "sortName": "Kaguya-sama: Love Is War Chapter 1",
+            "language": "eng",
+        },
+    ]
+}
+
+
+def test_matching_work_has_no_differences():
+    assert driverbrainz.diff_bookbrainz_work(WORK, "1", DETAILS, ALIASES, RELATED) == {}
+
+
+def test_changed_name():
+    details = {**DETAILS, "defaultAlias": {**DETAILS["defaultAlias"], "name": "Old"}}
+    differences = driverbrainz.diff_bookbrainz_work(
+        WORK, "1", details, ALIASES, RELATED
+    )
+    assert differences == {"name": "かぐや様は告らせたい 第1話"}
+
+
+def test_missing_alias_and_relationship():
+    aliases = {"aliases": ALIASES["aliases"][:2]}
+    differences = driverbrainz.diff_bookbrainz_work(WORK, "1", DETAILS, aliases, set())
+    assert [alias["text"] for alias in differences["aliases"]] == [
+        "Kaguya-sama: Love Is War Chapter 1"
+    ]
+    # The default alias isn't counted among the aliases of the editor.
+    assert differences["existing_aliases"] == 1
+    assert differences["relationships"] == WORK["relationships"]
+
+
+def test_alias_in_another_language_is_new():
+    aliases = {
+        "aliases": [
+            {"name": "Kaguya-sama wa Kokurasetai Chapter 1", "language": "jpn"},
+            {"name": "Kaguya-sama: Love Is War Chapter 1", "language": "fra"},
+        ]
+    }
+    differences = driverbrainz.diff_bookbrainz_work(
+        WORK, "1", DETAILS, aliases, RELATED
+    )
+    assert [alias["language"] for alias in differences["aliases"]] == ["English"]
+
+
+def test_corrected_sort_name_of_an_alias():
+    aliases = {
+        "aliases": [
+            ALIASES["aliases"][0],
+            {**ALIASES["aliases"][1], "sortName": "Kaguya-sama, Chapter 1"},
+            ALIASES["aliases"][2],
+        ]
+    }
+    differences = driverbrainz.diff_bookbrainz_work(
+        WORK, "1", DETAILS, aliases, RELATED
+    )
+    assert "aliases" not in differences
+    assert [
+        (alias["position"], alias["sort"]) for alias in differences["alias_sort_names"]
+    ] == [(0, "Kaguya-sama wa Kokurasetai Chapter 1")]
+    assert differences["existing_aliases"] == 2
+
+
+def test_relationship_with_another_role_is_new():
+    related = {("aaaa", "illustrated", None)}
+    differences = driverbrainz.diff_bookbrainz_work(
+        WORK, "1", DETAILS, ALIASES, related
+    )
+    assert differences == {"relationships": WORK["relationships"]}
+
+
+def test_series_type_and_language():
+    work = {
+        **WORK,
+        "type": "Chapter",
+        "language": "Japanese",
+        "series": [{"id": "https://bookbrainz.org/series/SSSS", "offset": 1}],
+    }
+    details = {**DETAILS, "workType": "Novel", "languages": [{"name": "English"}]}
+    related = RELATED | {("ssss", "is part of", "1")}
+    differences = driverbrainz.diff_bookbrainz_work(
+        work, "1", details, ALIASES, related
+    )
+    assert differences == {
+        "type": "Chapter",
+        "language": "Japanese",
+        "series": work["series"],
+        "stale_series": ["ssss"],
+    }
+    related = RELATED | {("ssss", "is part of", "2")}
+    details = {**DETAILS, "workType": "Chapter", "languages": [{"name": "Japanese"}]}
+    assert driverbrainz.diff_bookbrainz_work(work, "1", details, ALIASES, related) == {}
+
+
+def test_bookbrainz_language_maps_names_and_codes_to_codes():
+    assert driverbrainz.bookbrainz_language("English") == "eng"
+    assert driverbrainz.bookbrainz_language("JPN") == "jpn"
+    assert driverbrainz.bookbrainz_language("Klingon") == "Klingon"
+
+
+def test_work_languages_are_codes():
+    assert driverbrainz.work_languages({"languages": [{"name": "Japanese"}]}) == ["jpn"]
+    assert driverbrainz.work_languages({"defaultAlias": {"language": "eng"}}) == ["eng"]
@@ -0,0 +1,221 @@
+import argparse
+import bz2
+import json
+from xml.sax.saxutils import escape
+
+import wikitextparser as wtp
+
+import parse_wikipedia_chapters
+
+GRAPHIC_NOVEL_LIST = """== Volumes ==
+{{Graphic novel list
+| VolumeNumber = 1
+| OriginalRelDate = {{Start date|2021|4|3}}
+| ChapterList =
+* 1. {{Nihongo|"Chapter One"|第一話|Dai Ichi-wa}}{{efn|A note}}
+* 2. {{Nihongo|"Chapter Two"|第二話|Dai Ni-wa}}
+* Bonus. {{Nihongo|"Extra"|番外編}}
+* "Plain Title"
+| Summary = The story of {{Nihongo|Someone|誰か|Dareka}}.
+}}
+"""
+
+
+def test_template_index_finds_the_templates_within_a_span():
+    parsed = wtp.parse("{{a|{{b}}}} {{c}} {{d|{{e|{{f}}}}}}")
+    templates = parse_wikipedia_chapters.TemplateIndex(parsed)
+    d = parsed.templates[3]
+    assert [t.name for t in templates.within(d.span)] == ["e", "f"]
+    assert [t.name for t in templates.within(d.span, ["f"])] == ["f"]
+    assert templates.first_within((12, 17)).name == "c"
+    assert templates.first_within((11, 12)) is None
+    assert [t.name for t in templates.named(["a", "c"])] == ["a", "c"]
+
+
+def test_item_spans_locate_each_item():
+    parsed = wtp.parse("x\n* one\n* two {{t}}\n* one\n")
+    wiki_list = parsed.get_lists()[0]
+    spans = parse_wikipedia_chapters.item_spans(wiki_list)
+    assert [parsed.string[start:end] for start, end in spans] == wiki_list.items
+    assert spans[0] != spans[2]
+
+
+def test_graphic_novel_list():
+    chapters = parse_wikipedia_chapters.parse_wikipedia_page(GRAPHIC_NOVEL_LIST)
+    assert [
+        (chapter["type"], chapter["index"], chapter["english"], chapter["kanji"])
+        for chapter in chapters
+    ] == [
+        ("Chapter", 1, "Chapter One", "第一話"),
+        ("Chapter", 2, "Chapter Two", "第二話"),
+        ("Bonus", None, "Extra", "番外編"),
+        ("Chapter", None, "Plain Title", "Plain Title"),
+        ("Chapter", None, "Someone", "誰か"),
+    ]
+
+
+def test_nihongo_templates_are_only_added_once():
+    wikitext = GRAPHIC_NOVEL_LIST.replace(
+        "{{Nihongo|Someone|誰か|Dareka}}", "{{Nihongo|Chapter One|第一話}}"
+    )
+    chapters = parse_wikipedia_chapters.parse_wikipedia_page(wikitext)
+    assert [chapter["kanji"] for chapter in chapters].count("第一話") == 1
+
+
+def test_several_numbered_lists():
+    wikitext = """== Volume 1 ==
+{{Numbered list|{{Nihongo|One|一}}|{{Nihongo|Two|二}}}}
+== Volume 2 ==
+{{Numbered list|{{Nihongo|Three|三}}}}
+"""
+    chapters = parse_wikipedia_chapters.parse_wikipedia_page(wikitext)
+    assert [chapter["english"] for chapter in chapters] == ["One", "Two", "Three"]
+    assert chapters[0]["index"] == 1
+
+
+SECTIONED_PAGE = "Lead é\n== A ==\na\n=== A1 ===\na1\n== B ==\nb\n"
+
+
+# The sections of SECTIONED_PAGE as the MediaWiki parse API lists them, with a section transcluded from a template.
+def api_sections() -> list:
+    encoded = SECTIONED_PAGE.encode("utf-8")
+    return [
+        {"index": "1", "level": "2", "byteoffset": encoded.index(b"== A ==")},
+        {"index": "2", "level": "3", "byteoffset": encoded.index(b"=== A1 ===")},
+        {"index": "3", "level": "2", "byteoffset": encoded.index(b"== B ==")},
+        {"index": "T-1", "level": "2", "byteoffset": None},
+    ]
+
+
+def test_api_sections_include_their_subsections():
+    assert parse_wikipedia_chapters.split_sections(
+        "Page", SECTIONED_PAGE, [0, 1, 2, 3, 4], api_sections()
+    ) == [
+        "Lead é\n",
+        "== A ==\na\n=== A1 ===\na1\n",
+        "=== A1 ===\na1\n",
+        "== B ==\nb\n",
+        "",
+    ]
+
+
+def test_local_sections_match_the_api_sections_of_a_plain_page():
+    assert parse_wikipedia_chapters.split_sections(
+        "Page", SECTIONED_PAGE, [0, 1, 2, 3]
+    ) == parse_wikipedia_chapters.split_sections(
+        "Page", SECTIONED_PAGE, [0, 1, 2, 3], api_sections()
+    )
+
+
+def test_no_section_numbers_is_the_whole_page():
+    assert parse_wikipedia_chapters.split_sections("Page", SECTIONED_PAGE, []) == [
+        SECTIONED_PAGE
+    ]
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, data=None, headers=None):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self.data
+
+    def raise_for_status(self):
+        pass
+
+
+# Answers like the REST page endpoint and the parse API of Wikipedia, recording each request.
+class FakeSession:
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, headers=None, params=None, timeout=None):
+        self.requests.append(url)
+        if "/rest.php/" in url:
+            if (headers or {}).get("If-None-Match") == '"1"':
+                return FakeResponse(304)
+            return FakeResponse(
+                200, {"source": SECTIONED_PAGE, "latest": {"id": 1}}, {"ETag": '"1"'}
+            )
+        return FakeResponse(200, {"parse": {"sections": api_sections()}})
+
+
+def test_client_revalidates_cached_pages_and_caches_sections(tmp_path):
+    client = parse_wikipedia_chapters.WikipediaClient(str(tmp_path / "cache.sqlite"))
+    client.session = FakeSession()
+    assert client.sections("Page", [3]) == ["== B ==\nb\n"]
+    assert len(client.session.requests) == 2
+    assert parse_wikipedia_chapters.fetch_wikipedia_section(
+        "Page", 1, client=client
+    ).startswith("== A ==")
+    # The page is revalidated, and the sections of its revision come from the cache.
+    assert len(client.session.requests) == 3
+    assert client.fetch_many(["Page", "Page"], []) == [
+        [SECTIONED_PAGE],
+        [SECTIONED_PAGE],
+    ]
+
+
+# Write a multistream dump of the pages, 100 pages to each bz2 stream, along with its index.
+def write_dump(path, pages: dict):
+    index = []
+    with open(path / "pages-articles-multistream.xml.bz2", "wb") as dump:
+        dump.write(bz2.compress(b"<mediawiki>\n"))
+        titles = list(pages)
+        for start in range(0, len(titles), 100):
+            offset = dump.tell()
+            stream = ""
+            for page_id, title in enumerate(titles[start : start + 100], start + 1):
+                stream += f'<page><title>{escape(title)}</title><id>{page_id}</id><revision><text xml:space="preserve">{escape(pages[title])}</text></revision></page>\n'
+                index.append(f"{offset}:{page_id}:{title}\n")
+            dump.write(bz2.compress(stream.encode("utf-8")))
+        dump.write(bz2.compress(b"</mediawiki>"))
+    with bz2.open(
+        path / "pages-articles-multistream-index.txt.bz2", "wt", encoding="utf-8"
+    ) as index_file:
+        index_file.writelines(index)
+    return str(path / "pages-articles-multistream.xml.bz2")
+
+
+def test_dump_reads_only_the_requested_pages(tmp_path):
+    pages = {f"Page {i}": f"Text of page {i}" for i in range(250)}
+    pages["List of chapters"] = SECTIONED_PAGE
+    dump = parse_wikipedia_chapters.WikipediaDump(write_dump(tmp_path, pages))
+    assert dump.pages(["page_120", "List of chapters", "Missing"]) == {
+        "page_120": "Text of page 120",
+        "List of chapters": SECTIONED_PAGE,
+    }
+    assert dump.fetch_many(["List of chapters", "Missing"], [3]) == [
+        ["== B ==\nb\n"],
+        [],
+    ]
+
+
+def test_manifest_skips_series_with_pages_missing_from_the_dump(tmp_path):
+    dump = parse_wikipedia_chapters.WikipediaDump(
+        write_dump(tmp_path, {"List of chapters": GRAPHIC_NOVEL_LIST})
+    )
+    manifest = tmp_path / "series.ndjson"
+    manifest.write_text(
+        json.dumps({"page_title": "List of chapters", "output": str(tmp_path / "a")})
+        + "\n"
+        + json.dumps(
+            {
+                "page_title": "List of chapters",
+                "pages": ["Missing"],
+                "output": str(tmp_path / "b"),
+            }
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    args = argparse.Namespace(
+        use_brackets_japanese=False, english_chapter_prefix=None, ndjson=True
+    )
+    assert parse_wikipedia_chapters.parse_manifest(dump, str(manifest), args) == [
+        "List of chapters"
+    ]
+    assert (tmp_path / "a").exists()
+    assert not (tmp_path / "b").exists()
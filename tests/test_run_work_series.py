@@ -0,0 +1,44 @@
+import driverbrainz
+
+
+class FakePool:
+    size = 2
+
+    def acquire(self):
+        return object()
+
+    def release(self, driver, failed=False):
+        pass
+
+
+class FakeLedger:
+    def __init__(self, existing):
+        self.works = existing
+
+    def existing(self, data, i, entity, parts):
+        return self.works.get(i)
+
+
+def test_progress_counts_skipped_works(monkeypatch, capsys):
+    def create(driver, data, i, username=None, ledger=None):
+        return (f"original {i}", f"translation {i}")
+
+    monkeypatch.setitem(
+        driverbrainz.ENTITY_CREATORS,
+        "bookbrainz_work",
+        (create, ["original", "translation"]),
+    )
+    ledger = FakeLedger({"1": ("o", "t"), "3": ("o", "t")})
+    results = driverbrainz.run_bookbrainz_work_series(
+        [("series", {}, ["1", "2", "3", "4"])], FakePool(), ledger=ledger
+    )
+    assert sorted(results["series"]["skipped"]) == ["1", "3"]
+    assert sorted(results["series"]["created"]) == ["2", "4"]
+    lines = capsys.readouterr().out.splitlines()
+    assert sorted(line.rsplit(" ", 1)[1] for line in lines) == [
+        "(1/4)",
+        "(2/4)",
+        "(3/4)",
+        "(4/4)",
+    ]
+    assert sum(line.startswith("series: Skipped ") for line in lines) == 2
@@ -0,0 +1,42 @@
+import pytest
+
+import driverbrainz
+
+RANGE = ["1", "2", "3", "4", "5", "5.5", "6", "10", "14.5", "20"]
+
+
+def test_spans_include_the_whole_numbers_between_their_ends():
+    assert driverbrainz.select_range(RANGE, "4-7") == ["4", "5", "5.5", "6", "7"]
+
+
+def test_single_indices_and_comparisons():
+    assert driverbrainz.select_range(RANGE, "2,>=14.5") == ["2", "14.5", "20"]
+    assert driverbrainz.select_range(RANGE, "<2") == ["1"]
+
+
+def test_exclusions_alone_exclude_from_the_whole_range():
+    assert driverbrainz.select_range(RANGE, "!5.5,!>5") == ["1", "2", "3", "4", "5"]
+
+
+def test_indices_are_ordered_numerically():
+    assert driverbrainz.select_range(RANGE, "20,10,2") == ["2", "10", "20"]
+
+
+def test_missing_keeps_the_indices_without_works():
+    assert driverbrainz.select_range(
+        RANGE, "1-5,missing", missing=lambda i: i in {"2", "4"}
+    ) == ["2", "4"]
+
+
+@pytest.mark.parametrize(
+    ("selector", "message"),
+    [
+        ("1,,2", "empty term"),
+        ("a-b", "invalid term"),
+        ("!missing", "can't be excluded"),
+        ("missing", "requires the ledger"),
+    ],
+)
+def test_invalid_selectors(selector, message):
+    with pytest.raises(ValueError, match=message):
+        driverbrainz.select_range(RANGE, selector)
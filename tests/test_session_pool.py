@@ -0,0 +1,76 @@
+import pytest
+from selenium.common import exceptions as selenium_exceptions
+
+import driverbrainz
+
+
+class FakeDriver:
+    current_url = "about:blank"
+
+    def __init__(self):
+        self.quit_count = 0
+
+    def quit(self):
+        self.quit_count += 1
+
+
+@pytest.fixture
+def drivers(monkeypatch):
+    started = []
+    failures = []
+
+    def create_driver(headless, remote_url=None, browser="firefox"):
+        if failures:
+            raise failures.pop()
+        driver = FakeDriver()
+        started.append(driver)
+        return driver
+
+    monkeypatch.setattr(driverbrainz, "create_driver", create_driver)
+    return started, failures
+
+
+def pool():
+    return driverbrainz.SessionPool(
+        size=1, recycle_after_works=1, log_in=lambda driver, username: None
+    )
+
+
+def test_recycled_session_replaces_the_old_one(drivers):
+    started, _ = drivers
+    session_pool = pool()
+    session_pool.start()
+    old = session_pool.acquire()
+    session_pool.release(old)
+    new = session_pool.acquire()
+    assert new is started[1]
+    assert old.quit_count == 1
+    assert session_pool._sessions == [new]
+    assert session_pool._starting == 0
+
+
+def test_session_which_fails_to_restart_is_kept(drivers):
+    _, failures = drivers
+    session_pool = pool()
+    session_pool.start()
+    old = session_pool.acquire()
+    failures.append(selenium_exceptions.WebDriverException("no browser"))
+    session_pool.release(old)
+    assert session_pool.acquire() is old
+    assert old.quit_count == 0
+    assert session_pool._sessions == [old]
+    assert session_pool._starting == 0
+
+
+def test_session_which_fails_to_log_in_gives_back_its_slot(drivers):
+    started, _ = drivers
+
+    def log_in(driver, username):
+        raise RuntimeError("log in failed")
+
+    session_pool = driverbrainz.SessionPool(size=1, log_in=log_in)
+    with pytest.raises(RuntimeError):
+        session_pool.start()
+    assert started[0].quit_count == 1
+    assert session_pool._starting == 0
+    assert session_pool._sessions == []
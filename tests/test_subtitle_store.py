@@ -0,0 +1,65 @@
+import json
+
+import driverbrainz
+
+SUBTITLES = {
+    "1": {"0": {"title": "第一話", "sort": "だいいちわ"}, "1": {"title": "One"}},
+    "2": {"1": {"title": "Two"}},
+    "2.5": {"1": {"title": "Extra"}},
+    "10": {"1": {"title": "Ten"}},
+}
+
+
+def test_round_trip(tmp_path):
+    store = driverbrainz.SubtitleStore(str(tmp_path / "subtitles.sqlite"), "original")
+    store.update(SUBTITLES)
+    assert dict(store.items()) == SUBTITLES
+    assert store["2.5"] == SUBTITLES["2.5"]
+    assert "3" not in store
+    del store["2"]
+    assert len(store) == 3
+
+
+def test_indices_are_ordered_numerically(tmp_path):
+    store = driverbrainz.SubtitleStore(str(tmp_path / "subtitles.sqlite"), "original")
+    store.update({str(i): {} for i in range(1, 2501)})
+    store["2.5"] = {}
+    indices = list(store)
+    assert indices[:4] == ["1", "2", "2.5", "3"]
+    assert indices[-1] == "2500"
+    assert len(indices) == 2501
+
+
+def test_parts_are_kept_apart(tmp_path):
+    path = str(tmp_path / "subtitles.sqlite")
+    driverbrainz.SubtitleStore(path, "original").update({"1": {}})
+    assert len(driverbrainz.SubtitleStore(path, "translation")) == 0
+
+
+def test_invalid_subtitles_of_a_store_match_those_of_a_series_file(tmp_path):
+    subtitles = {
+        **SUBTITLES,
+        "7": {"3": {"title": "Unknown"}, "x": {}, "0": "Not an object"},
+    }
+    store = driverbrainz.SubtitleStore(str(tmp_path / "subtitles.sqlite"), "original")
+    store.update(subtitles)
+    expected = [("7", "3", "title"), ("7", "x", "title"), ("7", "0", "object")]
+    assert driverbrainz.invalid_subtitles(subtitles, 2) == expected
+    assert sorted(store.invalid_subtitles(2)) == sorted(expected)
+
+
+def test_import_and_export_subtitles(tmp_path):
+    series = {
+        "original": {"language": "Japanese", "subtitles": SUBTITLES},
+        "translation": {"language": "English"},
+    }
+    filename = tmp_path / "series.json"
+    filename.write_text(json.dumps(series, ensure_ascii=False), encoding="utf-8")
+    driverbrainz.import_subtitles(str(filename))
+    imported = json.loads(filename.read_text(encoding="utf-8"))
+    assert imported["original"]["subtitles"] == "series.subtitles.sqlite"
+    assert (
+        driverbrainz.load_series(str(filename))["original"]["subtitles"]["10"]
+        == (SUBTITLES["10"])
+    )
+    assert driverbrainz.export_subtitles(str(filename)) == series
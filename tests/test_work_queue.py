@@ -0,0 +1,65 @@
+import driverbrainz
+
+
+def test_enqueue_keeps_the_state_of_queued_indices(tmp_path):
+    work_queue = driverbrainz.WorkQueue(str(tmp_path / "queue.sqlite"))
+    assert work_queue.enqueue("series", {}, ["1", "2"]) == 2
+    work_queue.complete("worker", "series", "1", ("original", "translation"))
+    assert work_queue.enqueue("series", {}, ["1", "2", "3"]) == 1
+    assert work_queue.status()["series"]["counts"] == {"done": 1, "pending": 2}
+
+
+def test_lease_returns_indices_in_order_with_their_entity(tmp_path):
+    work_queue = driverbrainz.WorkQueue(str(tmp_path / "queue.sqlite"))
+    work_queue.enqueue("a", {"name": "a"}, ["2", "1"])
+    work_queue.enqueue("b", {}, ["1"], "musicbrainz_release_group")
+    assert work_queue.lease("worker", 60) == (
+        "a",
+        {"name": "a"},
+        "2",
+        "bookbrainz_work",
+    )
+    assert work_queue.lease("worker", 60)[2] == "1"
+    assert work_queue.lease("worker", 60) == ("b", {}, "1", "musicbrainz_release_group")
+    assert work_queue.lease("worker", 60) is None
+
+
+def test_failed_index_is_retried_until_max_attempts(tmp_path):
+    work_queue = driverbrainz.WorkQueue(str(tmp_path / "queue.sqlite"))
+    work_queue.enqueue("series", {}, ["1"])
+    for _ in range(2):
+        assert work_queue.lease("worker", 60) is not None
+        work_queue.fail("worker", "series", "1", "error", max_attempts=2)
+    assert work_queue.lease("worker", 60) is None
+    item = work_queue.status()["series"]["items"]["1"]
+    assert item["status"] == "failed"
+    assert item["attempts"] == 2
+
+
+def test_expired_lease_is_leased_again_until_max_attempts(tmp_path):
+    work_queue = driverbrainz.WorkQueue(str(tmp_path / "queue.sqlite"))
+    work_queue.enqueue("series", {}, ["1"])
+    # A negative timeout expires the lease immediately, as if the worker crashed.
+    assert work_queue.lease("worker-1", -1, max_attempts=2) is not None
+    assert work_queue.lease("worker-2", -1, max_attempts=2) is not None
+    assert work_queue.lease("worker-3", -1, max_attempts=2) is None
+    assert work_queue.outstanding() == 0
+    item = work_queue.status()["series"]["items"]["1"]
+    assert item["status"] == "failed"
+    assert item["error"] == "The lease expired after 2 attempts"
+
+
+def test_unexpired_lease_is_not_leased_again(tmp_path):
+    work_queue = driverbrainz.WorkQueue(str(tmp_path / "queue.sqlite"))
+    work_queue.enqueue("series", {}, ["1"])
+    assert work_queue.lease("worker-1", 60) is not None
+    assert work_queue.lease("worker-2", 60) is None
+    assert work_queue.outstanding() == 1
+
+
+def test_queued_urls_maps_the_parts_of_an_entity():
+    assert driverbrainz.queued_urls(["original", "translation"], ("o", "t")) == (
+        "o",
+        "t",
+    )
+    assert driverbrainz.queued_urls(["translation"], ("t",)) == (None, "t")
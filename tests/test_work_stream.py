@@ -0,0 +1,102 @@
+import copy
+import io
+import json
+import threading
+
+import driverbrainz
+
+
+def series():
+    part = {
+        "language": "English",
+        "disambiguation": "",
+        "titles": [
+            {
+                "text": "Series |index|: |subtitle|",
+                "sort": "COPY",
+                "language": "English",
+                "script": "Latin",
+            },
+            {
+                "text": "Series |index|",
+                "sort": "COPY",
+                "language": "English",
+                "script": "Latin",
+            },
+        ],
+        "subtitles": {"1": {"0": {"title": "From the file"}}},
+        "bookbrainz_work": {"identifiers": [], "relationships": [], "editions": {}},
+    }
+    return {
+        "original": copy.deepcopy(part),
+        "translation": copy.deepcopy(part),
+        "index_number_format_map": driverbrainz.DEFAULT_INDEX_NUMBER_FORMAT_MAP,
+    }
+
+
+def stream(indices):
+    return io.StringIO(
+        "".join(
+            json.dumps(
+                {
+                    "index": i,
+                    "original": {
+                        "subtitles": {"0": {"title": f"Streamed {i}"}},
+                        "musicbrainz_work_identifiers": {"type": "x", "value": i},
+                    },
+                }
+            )
+            + "\n"
+            for i in indices
+        )
+    )
+
+
+def test_streamed_lines_are_laid_over_a_copy_of_the_series():
+    data = series()
+    original = copy.deepcopy(data)
+    works = list(
+        driverbrainz.read_work_stream_lines(stream(["2", "3"]), "series", data)
+    )
+    assert [i for _, _, i in works] == ["2", "3"]
+    assert data == original
+    _, overlay, i = works[0]
+    assert overlay["original"]["subtitles"] == {"2": {"0": {"title": "Streamed 2"}}}
+    # Parts without streamed tables are shared with the series.
+    assert overlay["translation"] is data["translation"]
+    work = driverbrainz.plan_bookbrainz_original_work(overlay, i)
+    assert work["titles"][0]["subtitle"] == "Streamed 2"
+    assert work["identifiers"] == [{"type": "x", "value": "2"}]
+
+
+def test_lines_are_streamed_while_works_are_planned():
+    data = series()
+    works = driverbrainz.read_work_stream_lines(
+        stream([str(i) for i in range(2, 2002)]), "series", data
+    )
+    _, overlay, i = next(works)
+    errors = []
+    planned = []
+    stop = threading.Event()
+
+    def plan():
+        while not stop.is_set():
+            try:
+                work = driverbrainz.plan_bookbrainz_original_work(overlay, i)
+                driverbrainz.plan_bookbrainz_translation_work(data, "1", work)
+                planned.append(i)
+            except RuntimeError as error:
+                errors.append(error)
+                return
+
+    thread = threading.Thread(target=plan)
+    thread.start()
+    try:
+        assert sum(1 for _ in works) == 1999
+    finally:
+        stop.set()
+        thread.join()
+    assert errors == []
+    assert planned
+    assert list(data["original"]["subtitles"]) == ["1"]
+    assert "musicbrainz_work_identifiers" not in data["original"]